@@ -0,0 +1,61 @@
+import logging
+from typing import Optional, Sequence
+
+
+# Index Class
+class Index:
+    def __init__(self, columns: Sequence[str], name: Optional[str] = None, where: Optional[str] = None, unique=False):
+        self.columns = tuple(columns)
+        self.name = name
+        self.where = where
+        self.unique = unique
+
+    def index_name(self, table_name: str) -> str:
+        if self.name:
+            return self.name
+        suffix = '_partial' if self.where else ''
+        return f"idx_{table_name}_{'_'.join(self.columns)}{suffix}"
+
+    def create_sql(self, table_name: str) -> str:
+        unique = 'UNIQUE ' if self.unique else ''
+        sql = f"CREATE {unique}INDEX {self.index_name(table_name)} ON {table_name} ({', '.join(self.columns)})"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+
+def model_indexes(table_name, columns, indexes):
+    """Collect the indexes a model declares, both per Field(index=True) and in its `indexes` list."""
+    declared = [Index((name,)) for name, field in columns.items() if getattr(field, 'index', False)]
+    declared.extend(indexes)
+    return {index.index_name(table_name): index.create_sql(table_name) for index in declared}
+
+
+def _normalize(sql):
+    return ' '.join(sql.split())
+
+
+def sync_indexes(conn, table_name, desired):
+    """Create missing indexes and rebuild or drop managed ones whose definition changed.
+
+    Only indexes named idx_<table>_* or listed in `desired` are managed, so indexes added
+    by hand under other names are left alone.
+    """
+    existing = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table_name,)
+    ).fetchall())
+    managed_prefix = f"idx_{table_name}_"
+
+    for name, sql in existing.items():
+        if name in desired and _normalize(sql) == _normalize(desired[name]):
+            continue
+        if name in desired or name.startswith(managed_prefix):
+            conn.execute(f"DROP INDEX {name}")
+            logging.info(f"Dropped outdated index {name} on {table_name}.")
+
+    for name, sql in desired.items():
+        if name in existing and _normalize(existing[name]) == _normalize(sql):
+            continue
+        conn.execute(sql)
+        logging.info(f"Created index {name} on {table_name}.")
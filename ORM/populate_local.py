@@ -1,4 +1,4 @@
-import sqlite3
+from db_connection import connect_sqlite
 from datetime import datetime, timedelta
 
 # Database configuration
@@ -6,7 +6,7 @@ LOCAL_DB_NAME = 'employee_tracker.db'
 
 def populate_local_db():
     """Populate the local database with sample data."""
-    conn = sqlite3.connect(LOCAL_DB_NAME)
+    conn = connect_sqlite(LOCAL_DB_NAME)
     cursor = conn.cursor()
 
     # Sample data to be inserted
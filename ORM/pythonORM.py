@@ -2,8 +2,19 @@ import sqlite3
 import psycopg2
 from psycopg2.extras import execute_values
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Iterator, Any
+import time
 import logging
+from sql_builder import build_sql
+from ORM.indexes import Index, model_indexes, sync_indexes
+from sync_ack import acknowledge_rows
+from connectivity import CONNECT_TIMEOUT, get_monitor
+from db_connection import connect_sqlite
+from copy_engine import upsert_clause
+from batch_transform import BatchTransformer
+from quarantine import quarantine_rows
+from global_ids import UID_COLUMN, new_uid, ensure_uid_column, ensure_server_uid_column
+from sync_metrics import REGISTRY as metrics, export_metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,23 +38,58 @@ sqlite3.register_adapter(datetime, lambda ts: ts.isoformat())
 
 # Field Class
 class Field:
-    def __init__(self, column_type: str, primary_key=False, default=None):
+    def __init__(self, column_type: str, primary_key=False, default=None, index=False, nullable=True):
         self.column_type = column_type
         self.primary_key = primary_key
         self.default = default
+        self.index = index
+        # Sync-time rule: rows with NULL in a non-nullable column are quarantined instead of uploaded
+        self.nullable = nullable
+
+# Model metaclass: instances keep their column values in __slots__ rather than a per-instance __dict__
+class ModelMeta(type):
+    def __new__(mcs, name, bases, namespace):
+        if '__slots__' not in namespace:
+            inherited = {slot for base in bases for klass in base.__mro__ for slot in getattr(klass, '__slots__', ())}
+            namespace['__slots__'] = tuple(col for col in namespace.get('columns', ()) if col not in inherited)
+        cls = super().__new__(mcs, name, bases, namespace)
+        # Slot setters in column order, used to build instances straight from result rows
+        cls._setters = tuple(getattr(cls, col).__set__ for col in cls.columns)
+        return cls
 
 # Base ORM Class
-class BaseModel:
+class BaseModel(metaclass=ModelMeta):
     table_name: str = None
     columns: Dict[str, Field] = {}
+    indexes: List[Index] = []
 
     def __init__(self, **kwargs):
-        for column in self.columns:
-            setattr(self, column, kwargs.get(column, self.columns[column].default))
+        for column, field in self.columns.items():
+            if column in kwargs:
+                setattr(self, column, kwargs[column])
+            else:
+                # Callable defaults (e.g. new_uid) produce a fresh value per instance
+                setattr(self, column, field.default() if callable(field.default) else field.default)
+
+    @classmethod
+    def _from_row(cls, row):
+        # Fast path for query results: no kwargs dict and no defaults, one slot store per column
+        record = cls.__new__(cls)
+        for set_value, value in zip(cls._setters, row):
+            set_value(record, value)
+        return record
+
+    @classmethod
+    def _select_sql(cls):
+        # Columns are listed explicitly so result rows line up with _from_row whatever the table's column order
+        return f"SELECT {', '.join(cls.columns)} FROM {cls.table_name}"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {column: getattr(self, column) for column in self.columns}
 
     @classmethod
     def _get_local_connection(cls):
-        return sqlite3.connect(DB_CONFIG['local']['name'])
+        return connect_sqlite(DB_CONFIG['local']['name'])
 
     @classmethod
     def _get_server_connection(cls):
@@ -52,7 +98,8 @@ class BaseModel:
             user=DB_CONFIG['server']['user'],
             password=DB_CONFIG['server']['password'],
             host=DB_CONFIG['server']['host'],
-            port=DB_CONFIG['server']['port']
+            port=DB_CONFIG['server']['port'],
+            connect_timeout=CONNECT_TIMEOUT
         )
 
     @classmethod
@@ -66,16 +113,17 @@ class BaseModel:
         conn = cls._get_local_connection()
         cursor = conn.cursor()
         cursor.execute(sql)
+        if UID_COLUMN in cls.columns:
+            # Tables created before the uid column existed are migrated in place
+            ensure_uid_column(conn, cls.table_name)
+        sync_indexes(conn, cls.table_name, model_indexes(cls.table_name, cls.columns, cls.indexes))
         conn.commit()
         conn.close()
         logging.info(f"Table {cls.table_name} created (if not exists).")
 
     def save(self):
-        columns = ", ".join(self.columns.keys())
-        placeholders = ", ".join(["?" for _ in self.columns])
         values = tuple(getattr(self, col) for col in self.columns)
-
-        sql = f"INSERT INTO {self.table_name} ({columns}) VALUES ({placeholders})"
+        sql = build_sql('insert', self.table_name, tuple(self.columns))
         
         conn = self._get_local_connection()
         cursor = conn.cursor()
@@ -91,7 +139,7 @@ class BaseModel:
 
     @classmethod
     def fetch_all(cls) -> List['BaseModel']:
-        sql = f"SELECT * FROM {cls.table_name}"
+        sql = cls._select_sql()
         
         conn = cls._get_local_connection()
         cursor = conn.cursor()
@@ -99,56 +147,96 @@ class BaseModel:
         rows = cursor.fetchall()
         conn.close()
 
-        records = [cls(**dict(zip(cls.columns.keys(), row))) for row in rows]
+        records = [cls._from_row(row) for row in rows]
         logging.info(f"Fetched {len(records)} records from {cls.table_name}.")
         return records
 
+    @classmethod
+    def iter_all(cls, chunk_size=500) -> Iterator['BaseModel']:
+        """Yield every record lazily, reading `chunk_size` rows at a time.
+
+        The connection stays open until the iterator is exhausted or closed.
+        """
+        conn = cls._get_local_connection()
+        try:
+            cursor = conn.execute(cls._select_sql())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield cls._from_row(row)
+        finally:
+            conn.close()
+
     @classmethod
     def sync_data_to_postgres(cls, batch_size=100):
         if not cls.is_server_reachable():
             logging.warning("Server not reachable, sync aborted.")
+            metrics.inc('sync_errors_total', table=cls.table_name)
+            export_metrics()
             return
 
         conn_local = cls._get_local_connection()
         cursor_local = conn_local.cursor()
+        started = time.perf_counter()
+        backlog = conn_local.execute(f"SELECT COUNT(*) FROM {cls.table_name} WHERE synced = 0").fetchone()[0]
+        metrics.set_gauge('sync_backlog_rows', backlog, table=cls.table_name)
 
         # Fetch unsynced records from SQLite in batches
-        cursor_local.execute(f"SELECT * FROM {cls.table_name} WHERE synced = 0 LIMIT ?", (batch_size,))
-        unsynced_data = cursor_local.fetchall()
+        select_columns = list(cls.columns)
+        with metrics.stage('fetch', cls.table_name):
+            cursor_local.execute(f"SELECT {', '.join(select_columns)} FROM {cls.table_name} WHERE synced = 0 LIMIT ?", (batch_size,))
+            unsynced_data = cursor_local.fetchall()
 
         if not unsynced_data:
             logging.info("All data is already migrated to the server.")
+            cursor_local.close()
+            conn_local.close()
+            export_metrics()
             return
 
         conn_server = cls._get_server_connection()
         cursor_server = conn_server.cursor()
 
         columns = [col for col in cls.columns if col not in ('id', 'synced')]
-        insert_sql = f"INSERT INTO {cls.table_name} ({', '.join(columns)}) VALUES %s"
+        positions = [select_columns.index(col) for col in columns]
+        # Upserting on the client-generated uid makes resending an unacknowledged batch harmless
+        conflict_key = UID_COLUMN if UID_COLUMN in cls.columns else None
+        insert_sql = f"INSERT INTO {cls.table_name} ({', '.join(columns)}) VALUES %s" + upsert_clause(columns, conflict_key)
 
         try:
-            formatted_data = []
-            for record in unsynced_data:
-                # Filter out null values
-                filtered_record = [value for value in record[1:-1] if value is not None]  # Exclude 'id' and 'synced'
-                
-                # Skip if any column value is None
-                if len(filtered_record) != len(columns):
-                    logging.info(f"Skipping record due to null values: {record}")
-                    continue
-
-                formatted_data.append(tuple(filtered_record))
+            if conflict_key:
+                ensure_server_uid_column(conn_server, cls.table_name)
+            with metrics.stage('transform', cls.table_name):
+                # One column-wise pass yields the upload tuples and the ids to acknowledge. NULLs are
+                # uploaded as NULLs unless the Field is declared non-nullable (the conflict key never is).
+                required = [col for col in columns if not cls.columns[col].nullable or col == conflict_key]
+                transformer = BatchTransformer(columns, positions, required=required,
+                                               id_position=select_columns.index('id'))
+                batch = transformer.transform(unsynced_data)
+                formatted_data, synced_ids = batch.rows, batch.ids
+            if batch.rejected:
+                # Invalid rows leave the pending set so later batches do not fetch them again
+                quarantine_rows(conn_local, cls.table_name, select_columns, batch.rejected,
+                                id_position=select_columns.index('id'))
+                metrics.inc('sync_rows_quarantined_total', len(batch.rejected), table=cls.table_name)
 
             if formatted_data:
-                # Use execute_values for bulk insert
-                execute_values(cursor_server, insert_sql, formatted_data)
-                conn_server.commit()
+                # Use execute_values for bulk upsert
+                with metrics.stage('upload', cls.table_name):
+                    execute_values(cursor_server, insert_sql, formatted_data)
+                with metrics.stage('commit', cls.table_name):
+                    conn_server.commit()
+
+                # Mark synced records in SQLite with one set-based update
+                with metrics.stage('ack', cls.table_name):
+                    acknowledge_rows(conn_local, cls.table_name, synced_ids)
 
-                # Mark synced records in SQLite
-                for record in unsynced_data:
-                    if all(value is not None for value in record[1:-1]):
-                        cursor_local.execute(f"UPDATE {cls.table_name} SET synced = 1 WHERE id = ?", (record[0],))
-                conn_local.commit()
+                metrics.observe('sync_batch_seconds', time.perf_counter() - started, table=cls.table_name)
+                metrics.inc('sync_batches_total', table=cls.table_name)
+                metrics.inc('sync_rows_total', len(formatted_data), table=cls.table_name)
+                metrics.set_gauge('sync_backlog_rows', max(0, backlog - len(formatted_data)), table=cls.table_name)
 
                 logging.info(f"Synced {len(formatted_data)} records to server and updated locally.")
             else:
@@ -157,32 +245,36 @@ class BaseModel:
         except Exception as e:
             conn_server.rollback()
             conn_local.rollback()
+            metrics.inc('sync_errors_total', table=cls.table_name)
             logging.error(f"Failed to sync data to server: {e}")
         finally:
             cursor_server.close()
             conn_server.close()
             cursor_local.close()
             conn_local.close()
+            export_metrics()
 
     @staticmethod
     def is_server_reachable() -> bool:
-        try:
-            conn = BaseModel._get_server_connection()
-            conn.close()
-            return True
-        except psycopg2.OperationalError:
-            return False
+        return get_monitor(DB_CONFIG['server']).is_reachable()
 
 # Example Model Definition
 class ClockInOut(BaseModel):
     table_name = 'clock_in_out'
     columns = {
         'id': Field('INTEGER', primary_key=True),
-        'employee_id': Field('INTEGER'),
-        'clock_in': Field('TIMESTAMP'),
+        'employee_id': Field('INTEGER', nullable=False),
+        'clock_in': Field('TIMESTAMP', index=True, nullable=False),
         'clock_out': Field('TIMESTAMP'),
-        'synced': Field('BOOLEAN', default=0)
+        'synced': Field('BOOLEAN', default=0),
+        # Global row id; last so SELECT * order matches tables that gained the column by migration
+        'uid': Field('TEXT', default=new_uid, nullable=False),
     }
+    indexes = [
+        # Partial index covering only rows still waiting for sync
+        Index(('id',), name='idx_clock_in_out_unsynced', where='synced = 0'),
+        Index(('employee_id', 'clock_in')),
+    ]
 
 # Initialize tables
 ClockInOut.create_table()
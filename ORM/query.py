@@ -0,0 +1,134 @@
+import copy
+from typing import Any, Iterator, List, Optional, Tuple
+
+# Comparison suffixes accepted by Query.where, e.g. where(clock_in__gte=start)
+OPERATORS = {
+    'eq': '=',
+    'ne': '!=',
+    'lt': '<',
+    'lte': '<=',
+    'gt': '>',
+    'gte': '>=',
+    'like': 'LIKE',
+}
+
+
+# Query Class
+class Query:
+    """Chainable, lazily executed SELECT over one model.
+
+    Every method returns a new Query, so a partial query can be kept and refined. Nothing
+    runs until the query is iterated (streamed in chunks), or all(), first() or count() is
+    called. Column names are checked against the model's columns and values are always
+    bound as parameters.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._conditions: List[str] = []
+        self._params: List[Any] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    def _clone(self) -> 'Query':
+        clone = copy.copy(self)
+        clone._conditions = list(self._conditions)
+        clone._params = list(self._params)
+        clone._order = list(self._order)
+        return clone
+
+    def _column(self, name: str) -> str:
+        if name not in self.model.columns:
+            raise ValueError(f"Unknown column '{name}' for table {self.model.table_name}")
+        return name
+
+    def _add(self, condition: str, *params) -> 'Query':
+        clone = self._clone()
+        clone._conditions.append(condition)
+        clone._params.extend(params)
+        return clone
+
+    def where(self, **conditions) -> 'Query':
+        """Filter by column=value (None means IS NULL, a list or tuple means IN), or column__op=value."""
+        query = self
+        for key, value in conditions.items():
+            name, _, op = key.partition('__')
+            column = self._column(name)
+            if op == 'in' or (not op and isinstance(value, (list, tuple, set))):
+                values = list(value)
+                if not values:
+                    query = query._add('0 = 1')
+                else:
+                    query = query._add(f"{column} IN ({', '.join('?' * len(values))})", *values)
+            elif op == 'isnull' or (not op and value is None):
+                negate = op == 'isnull' and not value
+                query = query._add(f"{column} IS {'NOT ' if negate else ''}NULL")
+            elif op in OPERATORS or not op:
+                query = query._add(f"{column} {OPERATORS[op or 'eq']} ?", value)
+            else:
+                raise ValueError(f"Unsupported lookup '{op}' in '{key}'")
+        return query
+
+    def between(self, column: str, start: Any, end: Any) -> 'Query':
+        return self._add(f"{self._column(column)} BETWEEN ? AND ?", start, end)
+
+    def contains(self, column: str, value: Any) -> 'Query':
+        return self._add(f"{self._column(column)} LIKE ?", f"%{value}%")
+
+    def order_by(self, *columns: str) -> 'Query':
+        """Order by the given columns; a leading '-' sorts that column descending."""
+        clone = self._clone()
+        for name in columns:
+            descending = name.startswith('-')
+            clone._order.append(f"{self._column(name.lstrip('-'))} {'DESC' if descending else 'ASC'}")
+        return clone
+
+    def limit(self, count: int) -> 'Query':
+        clone = self._clone()
+        clone._limit = int(count)
+        return clone
+
+    def offset(self, count: int) -> 'Query':
+        clone = self._clone()
+        clone._offset = int(count)
+        return clone
+
+    def _compile(self, select: str) -> Tuple[str, tuple]:
+        sql = select
+        if self._conditions:
+            sql += " WHERE " + " AND ".join(self._conditions)
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None or self._offset is not None:
+            sql += f" LIMIT {self._limit if self._limit is not None else -1}"
+            if self._offset is not None:
+                sql += f" OFFSET {self._offset}"
+        return sql, tuple(self._params)
+
+    def sql(self) -> Tuple[str, tuple]:
+        """The statement and parameters this query runs."""
+        return self._compile(self.model._select_sql())
+
+    def __iter__(self) -> Iterator[Any]:
+        sql, params = self.sql()
+        return self.model._execute_iter(sql, params)
+
+    def all(self) -> List[Any]:
+        sql, params = self.sql()
+        return self.model._execute_fetch(sql, params)
+
+    def first(self) -> Optional[Any]:
+        records = self.limit(1).all()
+        return records[0] if records else None
+
+    def count(self) -> int:
+        # Ordering and paging do not change the number of matching rows
+        unpaged = self._clone()
+        unpaged._order, unpaged._limit, unpaged._offset = [], None, None
+        sql, params = unpaged._compile(f"SELECT COUNT(*) FROM {self.model.table_name}")
+        conn = self.model._get_local_connection()
+        try:
+            return conn.execute(sql, params).fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,256 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+# Importing the ORM modules runs ClockInOut.create_table() against ./employee_tracker.db;
+# do that in a scratch directory so these tests never touch the tracked database
+_import_dir = tempfile.TemporaryDirectory()
+_cwd = os.getcwd()
+os.chdir(_import_dir.name)
+try:
+    from ORM import pythonORM
+    from ORM import updatedormwithallfunctionalities as full_orm
+    from ORM.pythonORM import ClockInOut
+finally:
+    os.chdir(_cwd)
+
+
+class TestIndexes(unittest.TestCase):
+
+    def setUp(self):
+        """Point the ORM at a scratch SQLite database."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'indexes.db')
+        self.config = mock.patch.dict(pythonORM.DB_CONFIG['local'], {'name': self.db_name})
+        self.config.start()
+        ClockInOut.create_table()
+        self.conn = sqlite3.connect(self.db_name)
+
+    def tearDown(self):
+        self.conn.close()
+        self.config.stop()
+        self.tmpdir.cleanup()
+
+    def _query_plan(self, sql, params=()):
+        return ' '.join(row[-1] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+    def test_declared_indexes_are_created(self):
+        """create_table creates the Field(index=True) and Index declarations."""
+        names = {row[0] for row in self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'clock_in_out'")}
+        self.assertTrue({'idx_clock_in_out_unsynced', 'idx_clock_in_out_clock_in',
+                         'idx_clock_in_out_employee_id_clock_in'} <= names)
+
+    def test_unsynced_query_uses_partial_index(self):
+        """The sync batch query is served by the partial index on pending rows."""
+        plan = self._query_plan("SELECT * FROM clock_in_out WHERE synced = 0 LIMIT ?", (100,))
+        self.assertIn('idx_clock_in_out_unsynced', plan)
+
+        plan = self._query_plan("SELECT * FROM clock_in_out WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?", (0, 100))
+        self.assertIn('idx_clock_in_out_unsynced', plan)
+
+    def test_date_range_queries_use_indexes(self):
+        """Date range filters seek an index instead of scanning the table."""
+        plan = self._query_plan("SELECT * FROM clock_in_out WHERE clock_in BETWEEN ? AND ?", ('a', 'b'))
+        self.assertIn('idx_clock_in_out_clock_in', plan)
+
+        plan = self._query_plan(
+            "SELECT * FROM clock_in_out WHERE employee_id = ? AND clock_in BETWEEN ? AND ?", (1, 'a', 'b'))
+        self.assertIn('idx_clock_in_out_employee_id_clock_in', plan)
+
+    def test_changed_index_is_migrated(self):
+        """An index whose definition no longer matches the model is rebuilt."""
+        self.conn.execute("DROP INDEX idx_clock_in_out_unsynced")
+        self.conn.execute("CREATE INDEX idx_clock_in_out_unsynced ON clock_in_out (synced)")
+        self.conn.execute("CREATE INDEX idx_clock_in_out_clock_out ON clock_in_out (clock_out)")
+        self.conn.commit()
+
+        ClockInOut.create_table()
+
+        indexes = dict(self.conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'clock_in_out'"))
+        self.assertIn('WHERE synced = 0', indexes['idx_clock_in_out_unsynced'])
+        self.assertNotIn('idx_clock_in_out_clock_out', indexes)
+
+class TestModelInstances(unittest.TestCase):
+
+    def setUp(self):
+        """Point the ORM at a scratch SQLite database with a few records."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config = mock.patch.dict(pythonORM.DB_CONFIG['local'], {'name': os.path.join(self.tmpdir.name, 'models.db')})
+        self.config.start()
+        ClockInOut.create_table()
+        for employee_id in (1, 2, 3):
+            ClockInOut(employee_id=employee_id, clock_in=datetime(2024, 1, employee_id, 8)).save()
+
+    def tearDown(self):
+        self.config.stop()
+        self.tmpdir.cleanup()
+
+    def test_instances_use_slots(self):
+        """Model instances store columns in slots and have no per-instance __dict__."""
+        record = ClockInOut(employee_id=1)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(set(ClockInOut.__slots__), set(ClockInOut.columns))
+        self.assertEqual(record.synced, 0)
+        self.assertEqual(len(record.uid), 32)
+
+    def test_fetched_rows_become_models(self):
+        """Fetched records carry every column value in model order."""
+        record = ClockInOut.fetch_all()[0]
+        self.assertEqual(record.as_dict()['employee_id'], 1)
+        self.assertEqual(record.clock_in, '2024-01-01T08:00:00')
+        self.assertIsNone(record.clock_out)
+
+    def test_iter_all_is_lazy(self):
+        """iter_all yields models one by one in chunks instead of building a list."""
+        records = ClockInOut.iter_all(chunk_size=2)
+        self.assertEqual(next(records).employee_id, 1)
+        self.assertEqual([record.employee_id for record in records], [2, 3])
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        """Point the full ORM at a scratch SQLite database with a few records."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config = mock.patch.dict(full_orm.DB_CONFIG['local'], {'name': os.path.join(self.tmpdir.name, 'query.db')})
+        self.config.start()
+        self.model = full_orm.ClockInOut
+        self.model.create_table()
+        for employee_id, day in ((1, 1), (1, 2), (1, 3), (2, 2), (12, 2)):
+            self.model(employee_id=employee_id, clock_in=datetime(2024, 1, day, 8)).save()
+
+    def tearDown(self):
+        self.config.stop()
+        self.tmpdir.cleanup()
+
+    def test_chained_query_compiles_to_one_statement(self):
+        """Conditions, ordering and limit compile to a single parameterized statement."""
+        query = (self.model.query().where(employee_id=1).between('clock_in', 'a', 'b')
+                 .order_by('-clock_in').limit(100))
+
+        sql, params = query.sql()
+
+        self.assertTrue(sql.endswith("WHERE employee_id = ? AND clock_in BETWEEN ? AND ? "
+                                     "ORDER BY clock_in DESC LIMIT 100"))
+        self.assertEqual(params, (1, 'a', 'b'))
+
+    def test_query_filters_on_the_server_side(self):
+        """Only matching records come back, in the requested order."""
+        query = (self.model.query().where(employee_id=1)
+                 .between('clock_in', datetime(2024, 1, 2), datetime(2024, 1, 4)).order_by('-clock_in'))
+
+        self.assertEqual([record.clock_in for record in query], ['2024-01-03T08:00:00', '2024-01-02T08:00:00'])
+        self.assertEqual(query.count(), 2)
+        self.assertEqual(query.limit(1).all()[0].clock_in, '2024-01-03T08:00:00')
+        self.assertEqual(self.model.query().where(employee_id__in=[2, 12], clock_out=None).count(), 2)
+
+    def test_queries_are_immutable_and_whitelisted(self):
+        """Refining a query leaves the original alone, and unknown columns are refused."""
+        base = self.model.query().where(employee_id=1)
+        base.limit(1)
+        self.assertEqual(base.count(), 3)
+
+        with self.assertRaises(ValueError):
+            self.model.query().where(**{'employee_id; DROP TABLE clock_in_out': 1})
+        with self.assertRaises(ValueError):
+            self.model.query().order_by('-clock_in DESC, id')
+
+    def test_search_matches_integers_exactly(self):
+        """search compares integer columns by value instead of substring."""
+        self.assertEqual(len(self.model.search('employee_id', 1)), 3)
+
+class SyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Point the ORM at a scratch SQLite database and a stand-in server."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'sync.db')
+        self.uploaded = []
+        self.patches = [
+            mock.patch.dict(pythonORM.DB_CONFIG['local'], {'name': self.db_name}),
+            mock.patch.object(ClockInOut, 'is_server_reachable', return_value=True),
+            mock.patch.object(ClockInOut, '_get_server_connection', return_value=mock.MagicMock()),
+            mock.patch.object(pythonORM, 'ensure_server_uid_column'),
+            mock.patch.object(pythonORM, 'execute_values', lambda cursor, sql, rows: self.uploaded.extend(rows)),
+        ]
+        for patch in self.patches:
+            patch.start()
+        ClockInOut.create_table()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.tmpdir.cleanup()
+
+
+class TestNullableSync(SyncTestCase):
+
+    def test_null_in_nullable_column_is_uploaded(self):
+        """A row whose clock_out is still open is synced with a NULL clock_out."""
+        ClockInOut(employee_id=1, clock_in=datetime(2024, 1, 1, 8)).save()
+
+        ClockInOut.sync_data_to_postgres(batch_size=100)
+
+        self.assertEqual(len(self.uploaded), 1)
+        self.assertIsNone(self.uploaded[0][2])
+        self.assertEqual(ClockInOut.fetch_all()[0].synced, 1)
+
+    def test_invalid_rows_are_quarantined(self):
+        """Rows with NULL in a non-nullable column are moved to quarantine and not fetched again."""
+        ClockInOut(employee_id=1, clock_in=datetime(2024, 1, 1, 8)).save()
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("INSERT INTO clock_in_out (employee_id, clock_in, synced) VALUES (NULL, '2024-01-01', 0)")
+        conn.commit()
+
+        ClockInOut.sync_data_to_postgres(batch_size=100)
+
+        self.assertEqual(len(self.uploaded), 1)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM clock_in_out WHERE synced = 0").fetchone()[0], 0)
+        self.assertIn("'employee_id'", conn.execute("SELECT reason FROM sync_quarantine").fetchone()[0])
+        conn.close()
+
+
+
+class TestSyncAcknowledgement(SyncTestCase):
+
+    def _synced(self):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            return dict(conn.execute("SELECT employee_id, synced FROM clock_in_out"))
+        finally:
+            conn.close()
+
+    def test_batch_is_acknowledged_in_one_call(self):
+        """The uploaded ids are marked with a single acknowledge_rows call; rows past the batch stay pending."""
+        for employee_id in (1, 2, 3):
+            ClockInOut(employee_id=employee_id, clock_in=datetime(2024, 1, 1, 8)).save()
+
+        with mock.patch.object(pythonORM, 'acknowledge_rows', wraps=pythonORM.acknowledge_rows) as acknowledge:
+            ClockInOut.sync_data_to_postgres(batch_size=2)
+
+        acknowledge.assert_called_once()
+        self.assertEqual(sorted(acknowledge.call_args[0][2]), [1, 2])
+        self.assertEqual(self._synced(), {1: 1, 2: 1, 3: 0})
+
+    def test_quarantined_rows_are_not_acknowledged(self):
+        """Ids around a rejected row are marked synced without touching the rejected one."""
+        ClockInOut(employee_id=1, clock_in=datetime(2024, 1, 1, 8)).save()
+        conn = sqlite3.connect(self.db_name)
+        conn.execute("INSERT INTO clock_in_out (employee_id, clock_in, synced) VALUES (NULL, '2024-01-01', 0)")
+        conn.commit()
+        conn.close()
+        ClockInOut(employee_id=3, clock_in=datetime(2024, 1, 1, 8)).save()
+
+        with mock.patch.object(pythonORM, 'acknowledge_rows', wraps=pythonORM.acknowledge_rows) as acknowledge:
+            ClockInOut.sync_data_to_postgres(batch_size=100)
+
+        self.assertEqual(sorted(acknowledge.call_args[0][2]), [1, 3])
+        self.assertEqual(self._synced(), {1: 1, 3: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,113 +1,37 @@
 import sys
-import sqlite3
-import psycopg2
 import logging
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QPushButton, QLineEdit, QMessageBox
 )
-from PyQt5.QtCore import QTimer
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+from write_behind import WriteBehindFlusher
+from db_connection import connect_sqlite
+from global_ids import new_uid
+from clock_sync import SyncRequests, initialize_local_db, initialize_server_db, sync_local_to_server
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(asctime)s - %(message)s')
 
 # Connect to local SQLite database
-local_conn = sqlite3.connect('employee_tracker.db')
+# The shared profile (WAL, synchronous=NORMAL, busy timeout) lets the background flusher read
+# and delete queued clock-ins while new ones are appended
+local_conn = connect_sqlite('employee_tracker.db')
 local_cursor = local_conn.cursor()
 
 # Create local tables if not already present
-def initialize_local_db():
-    local_cursor.execute('''
-        CREATE TABLE IF NOT EXISTS clock_in_out (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            employee_id INTEGER,
-            clock_in TIMESTAMP,
-            clock_out TIMESTAMP,
-            synced BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP,
-            modified_at TIMESTAMP
-        )
-    ''')
-    local_conn.commit()
-
-initialize_local_db()
-
-# PostgreSQL server connection configuration
-SERVER_DB_CONFIG = {
-    'dbname': 'employee_tracker',
-    'user': 'postgres',
-    'password': 'md',
-    'host': 'localhost',
-    'port': '5432'
-}
-
-# Function to create tables in PostgreSQL
-def initialize_server_db():
-    try:
-        server_conn = psycopg2.connect(**SERVER_DB_CONFIG)
-        server_cursor = server_conn.cursor()
-
-        # Create the clock_in_out table if it doesn't exist
-        server_cursor.execute('''
-            CREATE TABLE IF NOT EXISTS clock_in_out (
-                id SERIAL PRIMARY KEY,
-                employee_id INTEGER,
-                clock_in TIMESTAMP,
-                clock_out TIMESTAMP,
-                created_at TIMESTAMP,
-                modified_at TIMESTAMP
-            );
-        ''')
-        server_conn.commit()
-        logging.info("Initialized clock_in_out table in PostgreSQL.")
-
-        server_cursor.close()
-        server_conn.close()
-
-    except psycopg2.Error as e:
-        logging.error(f"Error initializing PostgreSQL tables: {e}")
-
-# Initialize the PostgreSQL tables
-initialize_server_db()
-
-# Function to check server connectivity
-def is_server_reachable():
-    try:
-        server_conn = psycopg2.connect(**SERVER_DB_CONFIG)
-        server_conn.close()
-        return True
-    except psycopg2.Error:
-        return False
-
-# Function to save data directly to the PostgreSQL server
-def save_data_to_server(employee_id, clock_in):
-    try:
-        server_conn = psycopg2.connect(**SERVER_DB_CONFIG)
-        server_cursor = server_conn.cursor()
-
-        server_cursor.execute('''
-            INSERT INTO clock_in_out (employee_id, clock_in, created_at, modified_at)
-            VALUES (%s, %s, %s, %s)
-        ''', (employee_id, clock_in, datetime.now(), datetime.now()))
-        
-        server_conn.commit()
-        logging.info(f"Data saved to PostgreSQL for employee ID {employee_id}")
-
-        server_cursor.close()
-        server_conn.close()
-        return True
+initialize_local_db(local_conn)
 
-    except psycopg2.Error as e:
-        logging.error(f"Failed to save data to server: {e}")
-        return False
+# Create the PostgreSQL tables if the server is reachable
+initialize_server_db()
 
 # Function to save data locally in SQLite
 def save_data_locally(employee_id, clock_in):
     try:
         local_cursor.execute('''
-            INSERT INTO clock_in_out (employee_id, clock_in, synced, created_at, modified_at)
-            VALUES (?, ?, FALSE, ?, ?)
-        ''', (employee_id, clock_in, datetime.now(), datetime.now()))
+            INSERT INTO clock_in_out (employee_id, clock_in, synced, created_at, modified_at, uid)
+            VALUES (?, ?, FALSE, ?, ?, ?)
+        ''', (employee_id, clock_in, datetime.now(), datetime.now(), new_uid()))
         local_conn.commit()
         logging.info(f"Saved data locally for employee ID {employee_id}")
         return True
@@ -116,64 +40,72 @@ def save_data_locally(employee_id, clock_in):
         logging.error(f"Failed to save data locally: {e}")
         return False
 
-# Main function to save data based on connectivity
+# Main function to save data: write-behind through the local queue
 def save_data(employee_id, clock_in):
-    if is_server_reachable():
-        success = save_data_to_server(employee_id, clock_in)
-        if success:
-            return True
-        else:
-            logging.error("Failed to save to server. Attempting to save locally.")
-    
-    save_data_locally(employee_id, clock_in)
+    # The clock-in is acknowledged once it is committed locally; the flusher uploads it in a batch
+    if not save_data_locally(employee_id, clock_in):
+        return False
+    clock_in_flusher.notify()
     return True
 
-# Function to sync data from SQLite to PostgreSQL when online
-def sync_local_to_server():
-    if not is_server_reachable():
-        return  # Exit if the server is not reachable
+# Connection used only by the flusher thread to drain queued clock-ins
+flush_conn = connect_sqlite('employee_tracker.db', check_same_thread=False)
 
-    try:
-        # Fetch unsynced data from local SQLite
-        local_cursor.execute("SELECT id, employee_id, clock_in, clock_out, created_at, modified_at FROM clock_in_out WHERE synced = FALSE")
-        unsynced_data = local_cursor.fetchall()
+# Uploads queued clock-ins once enough have accumulated or the oldest has waited long enough
+clock_in_flusher = WriteBehindFlusher(lambda: sync_local_to_server(flush_conn), name='clock-in-flusher')
 
-        if not unsynced_data:
-            logging.info("No unsynced data found.")
-            return
-
-        server_conn = psycopg2.connect(**SERVER_DB_CONFIG)
-        server_cursor = server_conn.cursor()
-
-        # Insert data to PostgreSQL, excluding the ID column (ID will be auto-generated)
-        for record in unsynced_data:
-            server_cursor.execute('''
-                INSERT INTO clock_in_out (employee_id, clock_in, clock_out, created_at, modified_at)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (record[1], record[2], record[3], record[4], record[5]))
-            
-            # Commit after each record is successfully inserted
-            server_conn.commit()
-
-            # Delete the synced record from SQLite
-            local_cursor.execute("DELETE FROM clock_in_out WHERE id = ?", (record[0],))
-            local_conn.commit()
-            logging.info(f"Deleted synced record with ID {record[0]} from local SQLite.")
 
-        logging.info("All unsynced data successfully synced to PostgreSQL and deleted locally.")
+# Runs sync_local_to_server on a background thread with its own SQLite connection
+class SyncWorker(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(str)
 
-        server_cursor.close()
-        server_conn.close()
+    def __init__(self):
+        super().__init__()
+        self.conn = None
+
+    @pyqtSlot()
+    def run(self):
+        if self.conn is None:
+            # Opened on first use so it is created in the worker thread; closed by the app on exit
+            self.conn = connect_sqlite('employee_tracker.db', check_same_thread=False)
+        try:
+            synced = sync_local_to_server(self.conn, progress=self.progress.emit)
+        except Exception as e:
+            logging.error(f"Unexpected error during background sync: {e}")
+            synced = None
+
+        if synced is None:
+            self.finished.emit('Sync skipped: server unreachable or sync already running.')
+        else:
+            self.finished.emit(f'Last sync: {synced} records at {datetime.now():%H:%M:%S}')
 
-    except psycopg2.Error as e:
-        logging.error(f"Error syncing local data to server: {e}")
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
 
 
 # PyQt5 Application
 class EmployeeTrackerApp(QMainWindow):
+    start_sync = pyqtSignal()
+
     def __init__(self):
         super().__init__()
+        self.sync_requests = SyncRequests(self.start_sync_worker)
+        self.initSyncWorker()
         self.initUI()
+        clock_in_flusher.start()
+
+    def initSyncWorker(self):
+        # Sync runs off the GUI thread so slow or unreachable servers never freeze the window
+        self.sync_thread = QThread(self)
+        self.sync_worker = SyncWorker()
+        self.sync_worker.moveToThread(self.sync_thread)
+        self.start_sync.connect(self.sync_worker.run)
+        self.sync_worker.progress.connect(self.on_sync_progress)
+        self.sync_worker.finished.connect(self.on_sync_finished)
+        self.sync_thread.start()
 
     def initUI(self):
         self.setWindowTitle('Employee Tracker App')
@@ -195,7 +127,7 @@ class EmployeeTrackerApp(QMainWindow):
 
         # Sync Button
         sync_button = QPushButton('Sync Local Data', self)
-        sync_button.clicked.connect(sync_local_to_server)
+        sync_button.clicked.connect(self.request_sync)
         main_layout.addWidget(sync_button)
 
         # Status Label
@@ -209,7 +141,7 @@ class EmployeeTrackerApp(QMainWindow):
 
         # Timer for periodic sync (every 10 seconds)
         self.sync_timer = QTimer(self)
-        self.sync_timer.timeout.connect(sync_local_to_server)
+        self.sync_timer.timeout.connect(self.request_sync)
         self.sync_timer.start(10000)
 
     def handle_clock_in(self):
@@ -228,6 +160,29 @@ class EmployeeTrackerApp(QMainWindow):
         else:
             self.show_message('Error', 'Failed to save data.')
 
+    def request_sync(self):
+        # Triggers that arrive while a sync is running collapse into one follow-up sync
+        self.sync_requests.request()
+
+    def start_sync_worker(self):
+        self.status_label.setText('Syncing...')
+        self.start_sync.emit()
+
+    def on_sync_progress(self, synced, total):
+        self.status_label.setText(f'Syncing... {synced}/{total}')
+
+    def on_sync_finished(self, status):
+        self.status_label.setText(status)
+        self.sync_requests.finished()
+
+    def closeEvent(self, event):
+        self.sync_timer.stop()
+        clock_in_flusher.stop()
+        self.sync_thread.quit()
+        self.sync_thread.wait()
+        self.sync_worker.close()
+        super().closeEvent(event)
+
     def show_message(self, title, message):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Information)
@@ -1,8 +1,19 @@
+import os
 import sys
-import sqlite3
+import time
 import psycopg2
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from copy_engine import upload_rows
+from outbox import install_outbox, sync_changes
+from sync_ack import acknowledge_rows
+from chunk_transport import CHUNK_ROWS, export_chunks, upload_chunks
+from pull_sync import ensure_local_modified_at, ensure_server_modified_at, pull_changes
+from global_ids import UID_COLUMN, ensure_uid_column, ensure_server_uid_column
+from db_connection import connect_sqlite
+from schema_cache import get_table_schema, invalidate as invalidate_schema
+from sync_metrics import REGISTRY as metrics, configure_from_env as configure_metrics, export_metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -26,7 +37,7 @@ def connect_postgres():
 
 # Fetch unsynced data from SQLite
 def fetch_unsynced_data(db_name, table_name, batch_size=100):
-    local_conn = sqlite3.connect(f'{db_name}.db')
+    local_conn = connect_sqlite(f'{db_name}.db')
     local_cursor = local_conn.cursor()
     
     try:
@@ -40,55 +51,81 @@ def fetch_unsynced_data(db_name, table_name, batch_size=100):
     finally:
         local_conn.close()
 
+# Count the rows still waiting for sync and publish it as the backlog gauge
+def record_backlog(local_conn, table_name):
+    backlog = local_conn.execute(f"SELECT COUNT(*) FROM {table_name} WHERE synced = 0").fetchone()[0]
+    metrics.set_gauge('sync_backlog_rows', backlog, table=table_name)
+    return backlog
+
 def sync_data_to_postgres(db_name, table_name, batch_size=100):
-    unsynced_data = fetch_unsynced_data(db_name, table_name, batch_size)
+    # Rows carry a client-generated uid so an upload that is retried after a crash updates instead of duplicating
+    local_conn = connect_sqlite(f'{db_name}.db')
+    try:
+        ensure_uid_column(local_conn, table_name)
+        backlog = record_backlog(local_conn, table_name)
+    finally:
+        local_conn.close()
+
+    started = time.perf_counter()
+    with metrics.stage('fetch', table_name):
+        unsynced_data = fetch_unsynced_data(db_name, table_name, batch_size)
     if not unsynced_data:
         logging.info(f"No unsynced data found in '{table_name}'.")
+        export_metrics()
         return
 
-    # Extract column names from the SQLite table
-    columns = [desc[1].lower() for desc in sqlite3.connect(f'{db_name}.db').execute(f'PRAGMA table_info({table_name})')]
-    if 'id' in columns:
-        columns.remove('id')  # Exclude 'id' from column list
-
-    # Prepare data for insertion and convert 'synced' to boolean
-    data_to_insert = []
-    for row in unsynced_data:
-        row = list(row[1:])  # Exclude 'id'
-        # Convert the 'synced' field to a boolean
-        if isinstance(row[3], int):
-            row[3] = bool(row[3])
-        data_to_insert.append(tuple(row))
-
-    logging.info(f"Columns for insert: {columns}")
-    logging.info(f"Data to insert into PostgreSQL: {data_to_insert}")
-
     # Connect to PostgreSQL
     conn = connect_postgres()
     if not conn:
         logging.error("Failed to connect to PostgreSQL for syncing.")
+        metrics.inc('sync_errors_total', table=table_name)
+        export_metrics()
         return
 
+    local_conn = connect_sqlite(f'{db_name}.db')
     try:
-        with conn.cursor() as cursor:
-            quoted_columns = ', '.join([f'"{col}"' for col in columns])
-            placeholders = ', '.join(['%s' for _ in columns])
-            insert_query = f'INSERT INTO "{table_name}" ({quoted_columns}) VALUES ({placeholders})'
+        ensure_server_uid_column(conn, table_name)
+        with metrics.stage('transform', table_name):
+            # Column layout and per-column converters come from the cache, not from fresh metadata queries
+            schema = get_table_schema(local_conn, table_name, conn)
+            batch = prepare_rows(unsynced_data, schema)
+            data_to_insert = batch.rows
 
-            # Insert data into PostgreSQL
-            cursor.executemany(insert_query, data_to_insert)
+        # The payload is only formatted when DEBUG logging is on
+        logging.debug("Columns for insert: %s", schema.upload_columns)
+        logging.debug("Data to insert into PostgreSQL: %s", data_to_insert)
+
+        # Upsert data into PostgreSQL with the table's transfer engine (COPY or INSERT)
+        with metrics.stage('upload', table_name):
+            upload_rows(conn, table_name, schema.upload_columns, lambda: data_to_insert, conflict_key=UID_COLUMN)
+        with metrics.stage('commit', table_name):
             conn.commit()
 
-            # After successful insertion, delete the synced records
-            ids_to_delete = [row[0] for row in unsynced_data]
-            delete_synced_data(db_name, table_name, ids_to_delete)
-            logging.info(f"Synced and deleted {len(data_to_insert)} records from '{table_name}'.")
+        # After successful insertion, delete the synced records
+        with metrics.stage('ack', table_name):
+            delete_synced_data(db_name, table_name, batch.ids)
+        logging.info(f"Synced and deleted {len(data_to_insert)} records from '{table_name}'.")
+
+        metrics.observe('sync_batch_seconds', time.perf_counter() - started, table=table_name)
+        metrics.inc('sync_batches_total', table=table_name)
+        metrics.inc('sync_rows_total', len(data_to_insert), table=table_name)
+        metrics.set_gauge('sync_backlog_rows', max(0, backlog - len(data_to_insert)), table=table_name)
 
     except Exception as e:
         logging.error(f"Error during data sync to PostgreSQL: {e}")
         conn.rollback()
+        metrics.inc('sync_errors_total', table=table_name)
+        _invalidate_on_schema_error(e, table_name)
     finally:
+        local_conn.close()
         conn.close()
+        export_metrics()
+
+
+# A rejected column or type means the cached schema is stale; re-introspect on the next sync
+def _invalidate_on_schema_error(error, table_name):
+    if isinstance(error, (psycopg2.ProgrammingError, psycopg2.DataError)):
+        invalidate_schema(table_name)
 
 
 # Delete synced data from SQLite
@@ -96,22 +133,200 @@ def delete_synced_data(db_name, table_name, ids_to_delete):
     if not ids_to_delete:
         return  # No records to delete
 
-    local_conn = sqlite3.connect(f'{db_name}.db')
-    local_cursor = local_conn.cursor()
+    local_conn = connect_sqlite(f'{db_name}.db')
 
     try:
-        placeholders = ', '.join(['?' for _ in ids_to_delete])
-        delete_query = f"DELETE FROM {table_name} WHERE id IN ({placeholders})"
-        local_cursor.execute(delete_query, ids_to_delete)
-        local_conn.commit()
-        logging.info(f"Deleted {len(ids_to_delete)} synced records from '{table_name}'.")
+        return delete_rows(local_conn, table_name, ids_to_delete)
+    finally:
+        local_conn.close()
+
+# A failed acknowledgement is re-raised: the rows are still pending locally, so the batch must not count as synced
+def delete_rows(local_conn, table_name, ids_to_delete):
+    try:
+        deleted = acknowledge_rows(local_conn, table_name, ids_to_delete, action='delete')
     except Exception as e:
         logging.error(f"Error deleting synced data from '{table_name}': {e}")
+        raise
+    logging.info(f"Deleted {deleted} synced records from '{table_name}'.")
+    return deleted
+
+# Fetch the next batch of unsynced rows after a given id (and up to `last_id`, if given) on an open SQLite connection
+def fetch_unsynced_batch(local_conn, table_name, batch_size, after_id=0, last_id=None):
+    if last_id is None:
+        cursor = local_conn.execute(
+            f"SELECT * FROM {table_name} WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?",
+            (after_id, batch_size)
+        )
+    else:
+        cursor = local_conn.execute(
+            f"SELECT * FROM {table_name} WHERE synced = 0 AND id > ? AND id <= ? ORDER BY id LIMIT ?",
+            (after_id, last_id, batch_size)
+        )
+    try:
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+# Shape a batch in one column-wise pass: upload tuples (without 'id', per-column converters applied) and their ids
+def prepare_rows(rows, schema):
+    return schema.transform(rows)
+
+# Sync the whole backlog of a table, one transaction per batch, over a single pair of connections.
+# Returns the number of rows synced, or None when PostgreSQL could not be reached.
+def drain_data_to_postgres(db_name, table_name, batch_size=1000):
+    conn = connect_postgres()
+    if not conn:
+        logging.error("Failed to connect to PostgreSQL for syncing.")
+        metrics.inc('sync_errors_total', table=table_name)
+        export_metrics()
+        return None
+
+    # The prefetch thread and this one take turns on the connection, never using it at the same time
+    local_conn = connect_sqlite(f'{db_name}.db', check_same_thread=False)
+    synced = 0
+    started = time.perf_counter()
+
+    def fetch(after_id=0):
+        with metrics.stage('fetch', table_name):
+            return fetch_unsynced_batch(local_conn, table_name, batch_size, after_id)
+
+    try:
+        ensure_uid_column(local_conn, table_name)
+        ensure_server_uid_column(conn, table_name)
+        schema = get_table_schema(local_conn, table_name, conn)
+        backlog = record_backlog(local_conn, table_name)
+
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            batch = fetch()
+            while batch:
+                batch_started = time.perf_counter()
+                # Read batch N+1 from SQLite while batch N is written to PostgreSQL
+                next_batch = prefetcher.submit(fetch, batch[-1][0])
+                try:
+                    with metrics.stage('transform', table_name):
+                        prepared = prepare_rows(batch, schema)
+                    with metrics.stage('upload', table_name):
+                        upload_rows(conn, table_name, schema.upload_columns, lambda: prepared.rows, conflict_key=UID_COLUMN)
+                    with metrics.stage('commit', table_name):
+                        conn.commit()
+                except Exception as e:
+                    logging.error(f"Error during data sync to PostgreSQL: {e}")
+                    conn.rollback()
+                    metrics.inc('sync_errors_total', table=table_name)
+                    _invalidate_on_schema_error(e, table_name)
+                    next_batch.result()
+                    break
+
+                ids_to_delete = prepared.ids
+                batch = next_batch.result()
+                try:
+                    with metrics.stage('ack', table_name):
+                        delete_rows(local_conn, table_name, ids_to_delete)
+                except Exception:
+                    # Uploaded but still pending locally; the next run resends them (upserts on uid)
+                    metrics.inc('sync_errors_total', table=table_name)
+                    break
+                synced += len(ids_to_delete)
+
+                metrics.observe('sync_batch_seconds', time.perf_counter() - batch_started, table=table_name)
+                metrics.inc('sync_batches_total', table=table_name)
+                metrics.inc('sync_rows_total', len(ids_to_delete), table=table_name)
+                metrics.set_gauge('sync_backlog_rows', max(0, backlog - synced), table=table_name)
+                logging.info(f"Synced {synced} records from '{table_name}' so far.")
     finally:
         local_conn.close()
+        conn.close()
+        export_metrics()
+
+    elapsed = time.perf_counter() - started
+    rate = synced / elapsed if elapsed > 0 else 0.0
+    logging.info(f"Drained {synced} records from '{table_name}' in {elapsed:.2f}s ({rate:.0f} rows/sec).")
+    return synced
+
+# Columns the change-log sync never sends: the local acknowledgement flag and the device-local id
+OUTBOX_IGNORE_COLUMNS = ('synced', 'id')
+
+# Sync only what changed since the last run, using the trigger-fed change log
+def sync_outbox_to_postgres(db_name, table_name, batch_size=1000):
+    conn = connect_postgres()
+    if not conn:
+        logging.error("Failed to connect to PostgreSQL for syncing.")
+        return 0
+
+    local_conn = connect_sqlite(f'{db_name}.db')
+    applied = 0
+    try:
+        # Changes are keyed by uid: local ids are per device and mean nothing on the server
+        ensure_uid_column(local_conn, table_name)
+        ensure_server_uid_column(conn, table_name)
+        install_outbox(local_conn, table_name, key_column=UID_COLUMN, ignore_columns=OUTBOX_IGNORE_COLUMNS)
+        while True:
+            count = sync_changes(local_conn, conn, table_name, batch_size, key_column=UID_COLUMN,
+                                 ignore_columns=OUTBOX_IGNORE_COLUMNS)
+            if not count:
+                break
+            applied += count
+    except Exception as e:
+        logging.error(f"Error during change-log sync of '{table_name}': {e}")
+    finally:
+        local_conn.close()
+        conn.close()
+
+    logging.info(f"Applied {applied} change events for '{table_name}'.")
+    return applied
+
+# Ship pending rows through compressed chunk files: export works offline, and an interrupted
+# upload resumes at the first chunk the server has not recorded as applied.
+# Returns the number of rows uploaded, or None when PostgreSQL could not be reached or the upload failed.
+def ship_data_to_postgres(db_name, table_name, chunk_dir=None, chunk_rows=CHUNK_ROWS):
+    chunk_dir = chunk_dir or os.path.join(f'{db_name}_chunks', table_name)
+    local_conn = connect_sqlite(f'{db_name}.db')
+    try:
+        ensure_uid_column(local_conn, table_name)
+        export_chunks(local_conn, table_name, chunk_dir, chunk_rows)
+
+        conn = connect_postgres()
+        if not conn:
+            logging.error("Failed to connect to PostgreSQL; chunks stay queued for the next run.")
+            return None
+        try:
+            ensure_server_uid_column(conn, table_name)
+            uploaded = upload_chunks(conn, local_conn, chunk_dir, conflict_key=UID_COLUMN)
+            logging.info(f"Shipped {uploaded} records from '{table_name}'.")
+            return uploaded
+        except Exception as e:
+            logging.error(f"Error uploading chunks of '{table_name}': {e}")
+            return None
+        finally:
+            conn.close()
+    finally:
+        local_conn.close()
+
+# Pull server rows changed since the last pull into the local table (e.g. employees for offline lookup).
+# Returns the number of rows pulled, or None when PostgreSQL could not be reached.
+def pull_data_from_postgres(db_name, table_name, batch_size=1000, conflict='last_writer_wins'):
+    conn = connect_postgres()
+    if not conn:
+        logging.error("Failed to connect to PostgreSQL for pulling.")
+        return None
+
+    local_conn = connect_sqlite(f'{db_name}.db')
+    pulled = 0
+    try:
+        ensure_server_modified_at(conn, table_name)
+        ensure_local_modified_at(local_conn, table_name)
+        pulled = pull_changes(local_conn, conn, table_name, batch_size, conflict)
+    except Exception as e:
+        logging.error(f"Error pulling '{table_name}' from PostgreSQL: {e}")
+    finally:
+        local_conn.close()
+        conn.close()
+    return pulled
 
 # Main function to handle command-line arguments
 def main():
+    # SYNC_METRICS_FILE=/path/sync.prom (or .json) writes the sync metrics after every run
+    configure_metrics()
     if len(sys.argv) >= 2:
         command = sys.argv[1]
 
@@ -120,12 +335,43 @@ def main():
             table_name = sys.argv[3]
             sync_data_to_postgres(db_name, table_name)
 
+        elif command == 'drain' and len(sys.argv) in (4, 5):
+            db_name = sys.argv[2]
+            table_name = sys.argv[3]
+            batch_size = int(sys.argv[4]) if len(sys.argv) == 5 else 1000
+            drain_data_to_postgres(db_name, table_name, batch_size)
+
+        elif command == 'outbox' and len(sys.argv) == 4:
+            db_name = sys.argv[2]
+            table_name = sys.argv[3]
+            sync_outbox_to_postgres(db_name, table_name)
+
+        elif command == 'ship' and len(sys.argv) in (4, 5):
+            db_name = sys.argv[2]
+            table_name = sys.argv[3]
+            chunk_dir = sys.argv[4] if len(sys.argv) == 5 else None
+            ship_data_to_postgres(db_name, table_name, chunk_dir)
+
+        elif command == 'pull' and len(sys.argv) in (4, 5):
+            db_name = sys.argv[2]
+            table_name = sys.argv[3]
+            conflict = sys.argv[4] if len(sys.argv) == 5 else 'last_writer_wins'
+            pull_data_from_postgres(db_name, table_name, conflict=conflict)
+
         else:
             print("Usage:")
             print("  python automatedsync.py sync <db_name> <table_name>")
+            print("  python automatedsync.py drain <db_name> <table_name> [batch_size]")
+            print("  python automatedsync.py outbox <db_name> <table_name>")
+            print("  python automatedsync.py ship <db_name> <table_name> [chunk_dir]")
+            print("  python automatedsync.py pull <db_name> <table_name> [last_writer_wins|server_wins|local_wins]")
             sys.exit(1)
 
 if __name__ == '__main__':
     main()
 
 # python automatedsync.py sync employee_tracker clock_in_out
+# python automatedsync.py drain employee_tracker clock_in_out 5000
+# python automatedsync.py outbox employee_tracker clock_in_out
+# python automatedsync.py ship employee_tracker clock_in_out
+# python automatedsync.py pull employee_tracker employees
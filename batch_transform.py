@@ -0,0 +1,53 @@
+from collections import namedtuple
+
+# Result of shaping one batch: upload tuples, the local ids they came from (same order),
+# and (row, reason) pairs for rows that failed validation
+TransformedBatch = namedtuple('TransformedBatch', ['rows', 'ids', 'rejected'])
+
+
+class BatchTransformer:
+    """Shapes a batch of local rows for upload: validates NULLs, converts and projects columns.
+
+    The batch is transposed once into column arrays and every step then works on a whole
+    column (one containment test per required column, one map() per converter) instead of
+    running Python code per row and value. Build one per table layout and reuse it.
+    """
+
+    def __init__(self, columns, positions, converters=None, required=(), id_position=0):
+        self.columns = list(columns)
+        self.positions = list(positions)
+        self.converters = list(converters) if converters else [None] * len(self.positions)
+        # Upload columns that must not be NULL, as (name, position in the local row)
+        self.required = [(name, position) for name, position in zip(self.columns, self.positions) if name in required]
+        self.id_position = id_position
+
+    def _reject_nulls(self, arrays):
+        reasons = {}
+        for name, position in self.required:
+            column = arrays[position]
+            if None not in column:
+                continue
+            for index, value in enumerate(column):
+                if value is None and index not in reasons:
+                    reasons[index] = f"NULL in non-nullable column '{name}'"
+        return reasons
+
+    def transform(self, rows):
+        if not rows:
+            return TransformedBatch([], [], [])
+
+        arrays = list(zip(*rows))
+        rejected = []
+        if self.required:
+            reasons = self._reject_nulls(arrays)
+            if reasons:
+                rejected = [(rows[index], reason) for index, reason in sorted(reasons.items())]
+                rows = [row for index, row in enumerate(rows) if index not in reasons]
+                if not rows:
+                    return TransformedBatch([], [], rejected)
+                arrays = list(zip(*rows))
+
+        ids = list(arrays[self.id_position]) if self.id_position is not None else []
+        columns = [arrays[position] if convert is None else map(convert, arrays[position])
+                   for position, convert in zip(self.positions, self.converters)]
+        return TransformedBatch(list(zip(*columns)), ids, rejected)
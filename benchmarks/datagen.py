@@ -0,0 +1,58 @@
+"""Synthetic `clock_in_out` and `employees` rows for benchmarks.
+
+Generation is deterministic for a given seed so runs can be compared with each other.
+"""
+import random
+from datetime import datetime, timedelta
+
+DEPARTMENTS = ['IT', 'HR', 'Finance', 'Operations', 'Sales', 'Support']
+POSITIONS = ['Developer', 'Manager', 'Analyst', 'Technician', 'Associate']
+
+
+def generate_clock_in_out(rows, seed=0, employees=500, employee_skew=0.0, shift_hours=8.0, shift_jitter=1.5,
+                          null_clock_out_rate=0.1, start=datetime(2024, 1, 1, 6, 0), span_days=365):
+    """Yield (employee_id, clock_in, clock_out, created_at, modified_at) tuples.
+
+    employee_skew > 0 draws employee ids from a power law so a few employees own most rows;
+    null_clock_out_rate is the share of rows still clocked in (clock_out is NULL).
+    """
+    rng = random.Random(seed)
+    span_seconds = span_days * 24 * 3600
+    for _ in range(rows):
+        if employee_skew > 0:
+            employee_id = min(int(rng.paretovariate(employee_skew)), employees)
+        else:
+            employee_id = rng.randint(1, employees)
+        clock_in = start + timedelta(seconds=rng.randrange(span_seconds))
+        if rng.random() < null_clock_out_rate:
+            clock_out = None
+        else:
+            clock_out = clock_in + timedelta(hours=max(0.5, rng.gauss(shift_hours, shift_jitter)))
+        modified_at = clock_out or clock_in
+        yield employee_id, clock_in, clock_out, clock_in, modified_at
+
+
+def generate_employees(rows, seed=0, null_rate=0.05):
+    """Yield employee dicts shaped for crud_operations.store / store_many."""
+    rng = random.Random(seed)
+    for i in range(rows):
+        yield {
+            'first_name': f'First{i}',
+            'last_name': f'Last{rng.randrange(rows)}',
+            'email': f'employee{i}@example.com',
+            'department': None if rng.random() < null_rate else rng.choice(DEPARTMENTS),
+            'position': None if rng.random() < null_rate else rng.choice(POSITIONS),
+            'is_synced': False,
+            'is_active': rng.random() > 0.05,
+        }
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
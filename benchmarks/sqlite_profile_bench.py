@@ -0,0 +1,115 @@
+"""Write throughput of SQLite with default settings versus the shared connection profile.
+
+    python -m benchmarks.sqlite_profile_bench --rows 5000
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from db_connection import SQLITE_PROFILE, connect_sqlite
+
+CREATE_SQL = '''
+    CREATE TABLE clock_in_out (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id INTEGER,
+        clock_in TIMESTAMP,
+        clock_out TIMESTAMP,
+        synced BOOLEAN DEFAULT 0
+    )
+'''
+INSERT_SQL = "INSERT INTO clock_in_out (employee_id, clock_in, synced) VALUES (?, ?, 0)"
+
+# Lock wait of both connections in the concurrent-reader run, the same with and without the profile
+# so that run compares WAL and synchronous=NORMAL rather than two different busy timeouts
+CONCURRENT_BUSY_TIMEOUT_MS = 1
+
+
+def _open(path, profiled, busy_timeout_ms=None, **kwargs):
+    if profiled:
+        profile = SQLITE_PROFILE if busy_timeout_ms is None else {**SQLITE_PROFILE, 'busy_timeout': busy_timeout_ms}
+        return connect_sqlite(path, profile=profile, **kwargs)
+    if busy_timeout_ms is not None:
+        kwargs['timeout'] = busy_timeout_ms / 1000
+    return sqlite3.connect(path, **kwargs)
+
+
+def bench_single_row_commits(path, profiled, rows):
+    # One transaction per clock-in, as the app writes them
+    conn = _open(path, profiled)
+    started = time.perf_counter()
+    for i in range(rows):
+        conn.execute(INSERT_SQL, (i, datetime.now().isoformat()))
+        conn.commit()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return rows / elapsed
+
+
+def bench_with_concurrent_reader(path, profiled, rows, busy_timeout_ms=CONCURRENT_BUSY_TIMEOUT_MS):
+    # The sync process scanning pending rows while the UI keeps writing
+    stop = threading.Event()
+    lock_errors = [0]
+
+    def reader():
+        conn = _open(path, profiled, busy_timeout_ms, check_same_thread=False)
+        while not stop.is_set():
+            try:
+                conn.execute("SELECT COUNT(*) FROM clock_in_out WHERE synced = 0").fetchone()
+            except sqlite3.OperationalError:
+                lock_errors[0] += 1
+        conn.close()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    conn = _open(path, profiled, busy_timeout_ms)
+    written = 0
+    started = time.perf_counter()
+    for i in range(rows):
+        try:
+            conn.execute(INSERT_SQL, (i, datetime.now().isoformat()))
+            conn.commit()
+            written += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            lock_errors[0] += 1
+    elapsed = time.perf_counter() - started
+    stop.set()
+    thread.join()
+    conn.close()
+    return written / elapsed, lock_errors[0]
+
+
+def run(rows, busy_timeout_ms=CONCURRENT_BUSY_TIMEOUT_MS):
+    results = {}
+    for label, profiled in (('default', False), ('profile', True)):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'bench.db')
+            conn = _open(path, profiled)
+            conn.execute(CREATE_SQL)
+            conn.commit()
+            conn.close()
+
+            single = bench_single_row_commits(path, profiled, rows)
+            concurrent, errors = bench_with_concurrent_reader(path, profiled, rows, busy_timeout_ms)
+            results[label] = {'single_row_commits_per_sec': single,
+                              'commits_per_sec_with_reader': concurrent,
+                              'lock_errors_with_reader': errors}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark SQLite write throughput with and without the connection profile.')
+    parser.add_argument('--rows', type=int, default=5000, help='Rows written per scenario')
+    parser.add_argument('--busy-timeout-ms', type=int, default=CONCURRENT_BUSY_TIMEOUT_MS,
+                        help='Lock wait of both connections in the concurrent-reader run, for both settings')
+    args = parser.parse_args()
+
+    print(f"Profile: {SQLITE_PROFILE}")
+    print(f"Concurrent-reader run: busy timeout {args.busy_timeout_ms} ms with and without the profile")
+    for label, result in run(args.rows, args.busy_timeout_ms).items():
+        print(f"{label:>8}: {result['single_row_commits_per_sec']:>10.0f} commits/s alone, "
+              f"{result['commits_per_sec_with_reader']:>10.0f} commits/s with a concurrent reader, "
+              f"{result['lock_errors_with_reader']} lock errors")
@@ -0,0 +1,334 @@
+"""Sync benchmark: local inserts and the three sync paths against a stand-in PostgreSQL server.
+
+The server is a scratch PostgreSQL database (e.g. a local or docker instance) given by
+--dsn or BENCH_PG_DSN; its clock_in_out (or employees) table is dropped and recreated for every scenario.
+Each scenario runs in a fresh process and working directory so peak RSS is per scenario.
+
+    python -m benchmarks.sync_bench --rows 100000 --batch-size 1000 --output bench.json
+    python -m benchmarks.sync_bench --rows 100000 --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.datagen import batched, generate_clock_in_out, generate_employees
+
+DEFAULT_DSN = 'dbname=sync_bench user=postgres host=localhost'
+SCENARIOS = ('local_insert', 'automatedsync', 'parallel', 'orm', 'qt', 'employees')
+
+SERVER_TABLE_SQL = '''
+    CREATE TABLE clock_in_out (
+        id SERIAL PRIMARY KEY,
+        employee_id INTEGER,
+        clock_in TIMESTAMP,
+        clock_out TIMESTAMP,
+        synced BOOLEAN,
+        created_at TIMESTAMP,
+        modified_at TIMESTAMP
+    )
+'''
+# Schema used by the ORM model and automatedsync
+ORM_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS clock_in_out (
+        id INTEGER PRIMARY KEY,
+        employee_id INTEGER,
+        clock_in TIMESTAMP,
+        clock_out TIMESTAMP,
+        synced BOOLEAN
+    )
+'''
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def server_params(dsn):
+    from psycopg2.extensions import parse_dsn
+    params = {'dbname': None, 'user': None, 'password': None, 'host': None, 'port': None}
+    params.update(parse_dsn(dsn))
+    return params
+
+
+def reset_server_table(params):
+    import psycopg2
+    conn = psycopg2.connect(**params)
+    with conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS clock_in_out")
+        cursor.execute(SERVER_TABLE_SQL)
+    conn.commit()
+    conn.close()
+
+
+def populate_orm_table(path, config):
+    from db_connection import connect_sqlite
+    conn = connect_sqlite(path)
+    conn.execute(ORM_TABLE_SQL)
+    for batch in batched(generate_clock_in_out(**config), 5000):
+        conn.executemany("INSERT INTO clock_in_out (employee_id, clock_in, clock_out, synced) VALUES (?, ?, ?, 0)",
+                         [row[:3] for row in batch])
+    conn.commit()
+    conn.close()
+
+
+def count_unsynced(path):
+    from db_connection import connect_sqlite
+    conn = connect_sqlite(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM clock_in_out WHERE synced = 0").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def bench_local_insert(config, batch_size, params):
+    from db_connection import connect_sqlite
+    conn = connect_sqlite('bench.db')
+    conn.execute(ORM_TABLE_SQL)
+    latencies = []
+    for batch in batched(generate_clock_in_out(**config), batch_size):
+        started = time.perf_counter()
+        conn.executemany("INSERT INTO clock_in_out (employee_id, clock_in, clock_out, synced) VALUES (?, ?, ?, 0)",
+                         [row[:3] for row in batch])
+        conn.commit()
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    return config['rows'], latencies
+
+
+def bench_automatedsync(config, batch_size, params):
+    import automatedsync
+    automatedsync.POSTGRES_CONFIG.clear()
+    automatedsync.POSTGRES_CONFIG.update({key: value for key, value in params.items() if value is not None})
+    reset_server_table(params)
+    populate_orm_table('automated.db', config)
+
+    latencies = []
+    remaining = count_unsynced('automated.db')
+    while remaining:
+        started = time.perf_counter()
+        automatedsync.sync_data_to_postgres('automated', 'clock_in_out', batch_size)
+        latencies.append(time.perf_counter() - started)
+        now_remaining = count_unsynced('automated.db')
+        if now_remaining == remaining:
+            break  # no progress: the rest cannot be synced by this path
+        remaining = now_remaining
+    return config['rows'] - remaining, latencies
+
+
+def bench_parallel(config, batch_size, params):
+    import automatedsync
+    import parallel_sync
+    automatedsync.POSTGRES_CONFIG.clear()
+    automatedsync.POSTGRES_CONFIG.update({key: value for key, value in params.items() if value is not None})
+    reset_server_table(params)
+    populate_orm_table('parallel.db', config)
+
+    workers = os.cpu_count() or 1
+    partition_rows = max(batch_size, config['rows'] // (workers * 4))
+    started = time.perf_counter()
+    synced = parallel_sync.parallel_sync('parallel', ['clock_in_out'], workers, partition_rows, batch_size)
+    # One timed run: per-batch latencies are not visible across the worker processes
+    return (synced or {}).get('clock_in_out', 0), [time.perf_counter() - started]
+
+
+def bench_orm(config, batch_size, params):
+    from ORM import pythonORM
+    pythonORM.DB_CONFIG['local']['name'] = 'orm.db'
+    pythonORM.DB_CONFIG['server'].update(params)
+    reset_server_table(params)
+    pythonORM.ClockInOut.create_table()
+    populate_orm_table('orm.db', config)
+
+    latencies = []
+    remaining = count_unsynced('orm.db')
+    while remaining:
+        started = time.perf_counter()
+        pythonORM.ClockInOut.sync_data_to_postgres(batch_size=batch_size)
+        latencies.append(time.perf_counter() - started)
+        now_remaining = count_unsynced('orm.db')
+        if now_remaining == remaining:
+            break  # the ORM path skips rows it cannot sync and leaves them pending
+        remaining = now_remaining
+    return config['rows'] - remaining, latencies
+
+
+def bench_qt(config, batch_size, params):
+    # The Qt app's sync lives in clock_sync, which runs without Qt
+    import clock_sync
+    from connectivity import get_monitor
+    from db_connection import connect_sqlite
+    clock_sync.SERVER_DB_CONFIG.update(params)
+    clock_sync.server_monitor = get_monitor(clock_sync.SERVER_DB_CONFIG)
+    clock_sync.SYNC_BATCH_SIZE = batch_size
+    reset_server_table(params)
+
+    conn = connect_sqlite('employee_tracker.db')
+    clock_sync.initialize_local_db(conn)
+    for batch in batched(generate_clock_in_out(**config), 5000):
+        conn.executemany("INSERT INTO clock_in_out (employee_id, clock_in, clock_out, synced, created_at, modified_at) "
+                         "VALUES (?, ?, ?, 0, ?, ?)", batch)
+    conn.commit()
+
+    latencies = []
+    last = [time.perf_counter()]
+
+    def progress(synced, total):
+        now = time.perf_counter()
+        latencies.append(now - last[0])
+        last[0] = now
+
+    synced = clock_sync.sync_local_to_server(conn, progress=progress) or 0
+    conn.close()
+    return synced, latencies
+
+
+# Employee columns sent to the server, in local table order after id; the server assigns its own ids
+EMPLOYEE_COLUMNS = ('first_name', 'last_name', 'email', 'department', 'position', 'is_synced', 'is_active')
+
+
+def employee_for_server(row):
+    employee = dict(zip(EMPLOYEE_COLUMNS, row[1:1 + len(EMPLOYEE_COLUMNS)]))
+    # SQLite hands booleans back as 0/1, which PostgreSQL will not store in a BOOLEAN column
+    for column in ('is_synced', 'is_active'):
+        if employee[column] is not None:
+            employee[column] = bool(employee[column])
+    return employee
+
+
+def bench_employees(config, batch_size, params):
+    # Employees go through crud_operations: store_many into SQLite, then read back with iter_rows
+    # and store_many'd to the server. Both phases are timed per batch.
+    import psycopg2
+    from connection_pool import close_all_pools
+    from crud_operations import create_employees_table, iter_rows, store_many
+    conn = psycopg2.connect(**params)
+    with conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS employees")
+    conn.commit()
+    conn.close()
+    create_employees_table('postgres', db_params=params)
+    create_employees_table('sqlite', 'employees.db')
+
+    latencies = []
+    for batch in batched(generate_employees(config['rows'], seed=config['seed']), batch_size):
+        started = time.perf_counter()
+        store_many('employees', batch, chunk_size=batch_size, db_name='employees.db')
+        latencies.append(time.perf_counter() - started)
+
+    synced = 0
+    rows = iter_rows('employees', chunk=batch_size, db_name='employees.db')
+    while True:
+        started = time.perf_counter()
+        batch = [employee_for_server(row) for row in islice(rows, batch_size)]
+        if not batch:
+            break
+        synced += store_many('employees', batch, chunk_size=batch_size, db_type='postgres', db_params=params)
+        latencies.append(time.perf_counter() - started)
+    close_all_pools()
+    return synced, latencies
+
+
+def run_scenario(name, config, batch_size, params, workdir):
+    # Runs in a child process: modules that touch files at import time do so inside workdir
+    os.chdir(workdir)
+    logging.getLogger().setLevel(logging.WARNING)
+    bench = {'local_insert': bench_local_insert, 'automatedsync': bench_automatedsync,
+             'parallel': bench_parallel, 'orm': bench_orm, 'qt': bench_qt,
+             'employees': bench_employees}[name]
+
+    import psycopg2
+    try:
+        rows, latencies = bench(config, batch_size, params)
+    except ImportError as e:
+        return {'skipped': f'missing dependency: {e}'}
+    except psycopg2.OperationalError as e:
+        return {'skipped': f'stand-in server unreachable: {str(e).splitlines()[0]}'}
+    # Only the timed batches count; table setup and data generation are excluded
+    elapsed = sum(latencies)
+    p50, p99 = percentile(latencies, 0.50), percentile(latencies, 0.99)
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed else None,
+        'batches': len(latencies),
+        'batch_p50_ms': p50 * 1000 if p50 is not None else None,
+        'batch_p99_ms': p99 * 1000 if p99 is not None else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run(config, batch_size, dsn, scenarios=SCENARIOS):
+    params = server_params(dsn)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in scenarios:
+        # Executor workers are not daemonic, so the parallel scenario can start its own process pool
+        with tempfile.TemporaryDirectory() as workdir, ProcessPoolExecutor(1, mp_context=context) as pool:
+            results[name] = pool.submit(run_scenario, name, config, batch_size, params, workdir).result()
+    return results
+
+
+def compare(results, baseline):
+    for name, result in results.items():
+        before = baseline.get('scenarios', {}).get(name, {})
+        if result.get('rows_per_sec') and before.get('rows_per_sec'):
+            change = (result['rows_per_sec'] / before['rows_per_sec'] - 1) * 100
+            print(f"{name:>14}: {before['rows_per_sec']:>10.0f} -> {result['rows_per_sec']:>10.0f} rows/s ({change:+.1f}%)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark local inserts and sync paths with synthetic data.')
+    parser.add_argument('--rows', type=int, default=10000, help='Synthetic clock_in_out (or employees) rows per scenario')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per insert/sync batch')
+    parser.add_argument('--employees', type=int, default=500, help='Distinct employee ids')
+    parser.add_argument('--employee-skew', type=float, default=0.0, help='Power-law skew of employee ids (0 = uniform)')
+    parser.add_argument('--null-rate', type=float, default=0.1, help='Share of rows with a NULL clock_out')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for data generation')
+    parser.add_argument('--dsn', default=os.getenv('BENCH_PG_DSN', DEFAULT_DSN), help='Scratch PostgreSQL DSN')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    args = parser.parse_args()
+
+    config = {'rows': args.rows, 'seed': args.seed, 'employees': args.employees,
+              'employee_skew': args.employee_skew, 'null_clock_out_rate': args.null_rate}
+    results = run(config, args.batch_size, args.dsn, args.scenarios)
+
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:>14}: skipped ({result['skipped']})")
+            continue
+        print(f"{name:>14}: {result['rows']:>8} rows {result['rows_per_sec']:>10.0f} rows/s "
+              f"p50 {result['batch_p50_ms'] or 0:>8.1f} ms p99 {result['batch_p99_ms'] or 0:>8.1f} ms "
+              f"peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    report = {'generated_at': datetime.now().isoformat(), 'batch_size': args.batch_size, 'data': config,
+              'scenarios': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
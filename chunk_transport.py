@@ -0,0 +1,188 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+from copy_engine import upload_rows
+from sync_ack import acknowledge_rows
+
+# Pending rows are written to compressed chunk files before they are uploaded, so a dropped
+# connection only costs the chunk in flight: completed chunks are recorded on the server in
+# the same transaction as their rows and are never sent twice.
+MANIFEST_NAME = 'manifest.json'
+APPLIED_TABLE = 'sync_applied_chunks'
+CHUNK_ROWS = 5000
+
+
+def _manifest_path(chunk_dir):
+    return os.path.join(chunk_dir, MANIFEST_NAME)
+
+
+def load_manifest(chunk_dir):
+    try:
+        with open(_manifest_path(chunk_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'chunks': []}
+
+
+def save_manifest(chunk_dir, manifest):
+    # Write-then-rename so a crash never leaves a half-written manifest behind
+    path = _manifest_path(chunk_dir)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def encode_chunk(table_name, columns, rows):
+    """Column-oriented, gzip-compressed JSON; returns (payload bytes, sha256 hex digest)."""
+    data = {col: [row[index] for row in rows] for index, col in enumerate(columns)}
+    body = json.dumps({'table': table_name, 'columns': columns, 'data': data}, separators=(',', ':'), default=str)
+    payload = gzip.compress(body.encode('utf-8'), compresslevel=6)
+    return payload, hashlib.sha256(payload).hexdigest()
+
+
+def decode_chunk(payload, checksum):
+    if hashlib.sha256(payload).hexdigest() != checksum:
+        raise ValueError("Chunk checksum mismatch")
+    chunk = json.loads(gzip.decompress(payload))
+    columns = chunk['columns']
+    return chunk['table'], columns, list(zip(*[chunk['data'][col] for col in columns]))
+
+
+def _write_chunk(chunk_dir, table_name, columns, rows):
+    first_id, last_id = rows[0][0], rows[-1][0]
+    payload, checksum = encode_chunk(table_name, columns, rows)
+    # The checksum keeps ids unique even if SQLite reuses row ids once earlier chunks were acknowledged
+    chunk_id = f"{table_name}-{first_id:012d}-{last_id:012d}-{checksum[:12]}"
+    with open(os.path.join(chunk_dir, f"{chunk_id}.json.gz"), 'wb') as f:
+        f.write(payload)
+    return {'id': chunk_id, 'table': table_name, 'file': f"{chunk_id}.json.gz", 'rows': len(rows),
+            'first_id': first_id, 'last_id': last_id, 'sha256': checksum, 'done': False}
+
+
+# Write the pending rows of a table that are not in a chunk yet. Returns the number of chunks written.
+def export_chunks(local_conn, table_name, chunk_dir, chunk_rows=CHUNK_ROWS):
+    os.makedirs(chunk_dir, exist_ok=True)
+    manifest = load_manifest(chunk_dir)
+    exported = [chunk['last_id'] for chunk in manifest['chunks'] if chunk['table'] == table_name]
+    after_id = max(exported) if exported else 0
+    columns = [desc[1] for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]
+
+    written = 0
+    while True:
+        rows = local_conn.execute(
+            f"SELECT * FROM {table_name} WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?", (after_id, chunk_rows)
+        ).fetchall()
+        if not rows:
+            break
+        manifest['chunks'].append(_write_chunk(chunk_dir, table_name, columns, rows))
+        after_id = rows[-1][0]
+        # Record each chunk as soon as its file exists, so an interrupted export resumes after it
+        save_manifest(chunk_dir, manifest)
+        written += 1
+
+    logging.info(f"Exported {written} chunks of pending '{table_name}' rows to {chunk_dir}.")
+    return written
+
+
+def _ensure_applied_table(server_conn):
+    with server_conn.cursor() as cursor:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {APPLIED_TABLE} (
+                chunk_id TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        ''')
+    server_conn.commit()
+
+
+def _already_applied(server_conn, chunk_id):
+    with server_conn.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {APPLIED_TABLE} WHERE chunk_id = %s", (chunk_id,))
+        return cursor.fetchone() is not None
+
+
+def apply_chunk(server_conn, payload, checksum, chunk_id, conflict_key=None, ignore_columns=('id',)):
+    """Upload one chunk and record it as applied in a single server transaction. Returns the local ids it held."""
+    table_name, columns, rows = decode_chunk(payload, checksum)
+    id_index = columns.index('id')
+    positions = [index for index, col in enumerate(columns) if col not in ignore_columns]
+    upload_columns = [columns[index] for index in positions]
+    synced_index = upload_columns.index('synced') if 'synced' in upload_columns else None
+
+    def prepared():
+        for row in rows:
+            values = [row[index] for index in positions]
+            if synced_index is not None and isinstance(values[synced_index], int):
+                values[synced_index] = bool(values[synced_index])
+            yield tuple(values)
+
+    try:
+        if not _already_applied(server_conn, chunk_id):
+            upload_rows(server_conn, table_name, upload_columns, prepared, conflict_key=conflict_key)
+            with server_conn.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {APPLIED_TABLE} (chunk_id) VALUES (%s)", (chunk_id,))
+        server_conn.commit()
+    except Exception:
+        server_conn.rollback()
+        raise
+    return [row[id_index] for row in rows]
+
+
+def _read_chunk(local_conn, chunk_dir, manifest, index):
+    chunk = manifest['chunks'][index]
+    path = os.path.join(chunk_dir, chunk['file'])
+    try:
+        with open(path, 'rb') as f:
+            payload = f.read()
+        if hashlib.sha256(payload).hexdigest() == chunk['sha256']:
+            return chunk, payload
+    except FileNotFoundError:
+        pass
+
+    # Missing or damaged file: the rows are still pending locally, so the chunk is simply rebuilt
+    logging.warning(f"Chunk {chunk['id']} is missing or corrupt, rebuilding it from the local database.")
+    if os.path.exists(path):
+        os.remove(path)
+    table_name = chunk['table']
+    columns = [desc[1] for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]
+    rows = local_conn.execute(
+        f"SELECT * FROM {table_name} WHERE synced = 0 AND id BETWEEN ? AND ? ORDER BY id", (chunk['first_id'], chunk['last_id'])
+    ).fetchall()
+    if not rows:
+        chunk['done'] = True
+        save_manifest(chunk_dir, manifest)
+        return chunk, None
+    chunk = manifest['chunks'][index] = _write_chunk(chunk_dir, table_name, columns, rows)
+    save_manifest(chunk_dir, manifest)
+    with open(os.path.join(chunk_dir, chunk['file']), 'rb') as f:
+        return chunk, f.read()
+
+
+# Upload every chunk not yet done, acknowledging its rows locally. Returns the number of rows uploaded.
+def upload_chunks(server_conn, local_conn, chunk_dir, conflict_key=None, action='delete'):
+    manifest = load_manifest(chunk_dir)
+    _ensure_applied_table(server_conn)
+    uploaded = 0
+    for index in range(len(manifest['chunks'])):
+        if manifest['chunks'][index]['done']:
+            continue
+        chunk, payload = _read_chunk(local_conn, chunk_dir, manifest, index)
+        if payload is None:
+            continue
+        path = os.path.join(chunk_dir, chunk['file'])
+        ids = apply_chunk(server_conn, payload, chunk['sha256'], chunk['id'], conflict_key)
+        acknowledge_rows(local_conn, chunk['table'], ids, action=action)
+
+        chunk['done'] = True
+        save_manifest(chunk_dir, manifest)
+        os.remove(path)
+        uploaded += chunk['rows']
+        logging.info(f"Uploaded chunk {chunk['id']} ({chunk['rows']} rows).")
+
+    # Forget finished chunks once nothing is left in flight
+    if all(chunk['done'] for chunk in manifest['chunks']):
+        manifest['chunks'] = []
+        save_manifest(chunk_dir, manifest)
+    return uploaded
@@ -0,0 +1,177 @@
+import threading
+import psycopg2
+import logging
+from psycopg2.extras import execute_values
+from sync_ack import acknowledge_rows
+from connectivity import CONNECT_TIMEOUT, get_monitor
+from copy_engine import upsert_clause
+from global_ids import UID_COLUMN, ensure_uid_column, ensure_server_uid_column
+
+# Clock-in sync used by the Qt app. Importing this module opens no connections, so the sync
+# can be driven from other processes (benchmarks, tests) without Qt or a server.
+
+# PostgreSQL server connection configuration
+SERVER_DB_CONFIG = {
+    'dbname': 'employee_tracker',
+    'user': 'postgres',
+    'password': 'md',
+    'host': 'localhost',
+    'port': '5432'
+}
+
+# Rows uploaded per server transaction during a sync pass
+SYNC_BATCH_SIZE = 500
+
+# Columns sent to the server; the local id is per device, the uid identifies the row everywhere
+SYNC_COLUMNS = ['employee_id', 'clock_in', 'clock_out', 'created_at', 'modified_at', UID_COLUMN]
+
+# Only one sync may run at a time, whichever thread triggers it
+sync_lock = threading.Lock()
+
+# Shared, cached view of server connectivity; when the server is down checks return immediately
+server_monitor = get_monitor(SERVER_DB_CONFIG)
+
+
+# Create local tables if not already present
+def initialize_local_db(local_conn):
+    local_conn.execute('''
+        CREATE TABLE IF NOT EXISTS clock_in_out (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            employee_id INTEGER,
+            clock_in TIMESTAMP,
+            clock_out TIMESTAMP,
+            synced BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP,
+            modified_at TIMESTAMP
+        )
+    ''')
+    # Every clock-in carries a client-generated uid the server upserts on
+    ensure_uid_column(local_conn, 'clock_in_out')
+    # Same indexes as the ORM's ClockInOut model: pending rows and per-employee time ranges
+    local_conn.execute('CREATE INDEX IF NOT EXISTS idx_clock_in_out_unsynced ON clock_in_out (id) WHERE synced = 0')
+    local_conn.execute('CREATE INDEX IF NOT EXISTS idx_clock_in_out_clock_in ON clock_in_out (clock_in)')
+    local_conn.execute('CREATE INDEX IF NOT EXISTS idx_clock_in_out_employee_id_clock_in ON clock_in_out (employee_id, clock_in)')
+    local_conn.commit()
+
+
+def connect_server():
+    return psycopg2.connect(connect_timeout=CONNECT_TIMEOUT, **SERVER_DB_CONFIG)
+
+
+# Function to create tables in PostgreSQL
+def initialize_server_db():
+    try:
+        server_conn = connect_server()
+        server_cursor = server_conn.cursor()
+
+        # Create the clock_in_out table if it doesn't exist
+        server_cursor.execute('''
+            CREATE TABLE IF NOT EXISTS clock_in_out (
+                id SERIAL PRIMARY KEY,
+                employee_id INTEGER,
+                clock_in TIMESTAMP,
+                clock_out TIMESTAMP,
+                created_at TIMESTAMP,
+                modified_at TIMESTAMP
+            );
+        ''')
+        server_conn.commit()
+        ensure_server_uid_column(server_conn, 'clock_in_out')
+        logging.info("Initialized clock_in_out table in PostgreSQL.")
+
+        server_cursor.close()
+        server_conn.close()
+
+    except psycopg2.Error as e:
+        logging.error(f"Error initializing PostgreSQL tables: {e}")
+
+
+# Function to check server connectivity
+def is_server_reachable():
+    return server_monitor.is_reachable()
+
+
+# Function to sync data from SQLite to PostgreSQL when online.
+# Returns the number of records synced, or None if the server is unreachable or a sync is already running.
+def sync_local_to_server(conn, progress=None):
+    if not is_server_reachable():
+        return None  # Exit if the server is not reachable
+    if not sync_lock.acquire(blocking=False):
+        return None  # Another sync is already in progress
+
+    synced = 0
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM clock_in_out WHERE synced = 0").fetchone()[0]
+        if not total:
+            logging.info("No unsynced data found.")
+            return 0
+
+        server_conn = connect_server()
+        try:
+            server_cursor = server_conn.cursor()
+            ensure_server_uid_column(server_conn, 'clock_in_out')
+            upsert_sql = f"INSERT INTO clock_in_out ({', '.join(SYNC_COLUMNS)}) VALUES %s" + upsert_clause(SYNC_COLUMNS, UID_COLUMN)
+            last_id = 0
+
+            while True:
+                # Fetch the next batch of unsynced data from local SQLite
+                unsynced_data = conn.execute(
+                    f"SELECT id, {', '.join(SYNC_COLUMNS)} FROM clock_in_out "
+                    "WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?", (last_id, SYNC_BATCH_SIZE)
+                ).fetchall()
+                if not unsynced_data:
+                    break
+
+                # Upsert the batch to PostgreSQL in one transaction, excluding the ID column (ID will be auto-generated).
+                # A batch resent after a crash between commit and local delete updates the rows it already created.
+                execute_values(server_cursor, upsert_sql, [record[1:] for record in unsynced_data])
+                server_conn.commit()
+
+                # Delete the synced records from SQLite with one set-based statement
+                acknowledge_rows(conn, 'clock_in_out', [record[0] for record in unsynced_data], action='delete')
+                last_id = unsynced_data[-1][0]
+                synced += len(unsynced_data)
+                if progress:
+                    progress(synced, total)
+
+            logging.info(f"Synced {synced} records to PostgreSQL and deleted them locally.")
+            server_monitor.record_success()
+        except psycopg2.Error:
+            # Do not leave the failed batch's transaction open on the connection
+            if not server_conn.closed:
+                server_conn.rollback()
+            raise
+        finally:
+            server_conn.close()
+
+    except psycopg2.OperationalError as e:
+        server_monitor.record_failure()
+        logging.error(f"Error syncing local data to server: {e}")
+    except psycopg2.Error as e:
+        logging.error(f"Error syncing local data to server: {e}")
+    finally:
+        sync_lock.release()
+    return synced
+
+
+# Coalesces sync triggers (button, timer): at most one sync runs at a time, and any triggers
+# that arrive while it runs collapse into a single follow-up sync
+class SyncRequests:
+    def __init__(self, start):
+        self.start = start
+        self.running = False
+        self.pending = False
+
+    def request(self):
+        if self.running:
+            self.pending = True
+            return False
+        self.running = True
+        self.start()
+        return True
+
+    def finished(self):
+        self.running = False
+        if self.pending:
+            self.pending = False
+            self.request()
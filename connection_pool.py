@@ -0,0 +1,196 @@
+import time
+import logging
+import threading
+
+# Pool defaults, overridable per pool through get_pool(**pool_options)
+POOL_MAX_SIZE = 5
+POOL_MAX_IDLE_TIME = 300      # seconds an idle connection may sit in the pool before it is closed
+POOL_HEALTH_CHECK_AFTER = 30  # seconds of idleness after which a connection is pinged on checkout
+POOL_TIMEOUT = 30             # seconds to wait for a free connection before giving up
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections produced by `factory`."""
+
+    def __init__(self, factory, max_size=POOL_MAX_SIZE, max_idle_time=POOL_MAX_IDLE_TIME,
+                 health_check_after=POOL_HEALTH_CHECK_AFTER, timeout=POOL_TIMEOUT, name='pool'):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self.name = name
+
+        self._idle = []  # (connection, returned_at) pairs, most recently used last
+        self._size = 0   # open connections, idle or checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.hits = 0
+        self.waits = 0
+        self.creations = 0
+        self.discards = 0
+
+    def acquire(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout(f"Pool '{self.name}' is closed.")
+
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        idle_for = time.monotonic() - returned_at
+                        if idle_for > self.max_idle_time:
+                            self._discard(conn)
+                            conn = None
+                            continue
+                        if idle_for <= self.health_check_after:
+                            self.hits += 1
+                            return conn
+                        # Checked out (still counted in _size); pinged below without holding the lock
+                        break
+
+                    if self._size < self.max_size:
+                        # Reserve the slot before releasing the lock to connect
+                        self._size += 1
+                        break
+
+                    if not waited:
+                        self.waits += 1
+                        waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"Timed out waiting for a connection from pool '{self.name}'.")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+
+            # A slow or hung server only delays this caller, not every acquire and release
+            if self._is_healthy(conn):
+                with self._cond:
+                    self.hits += 1
+                return conn
+            try:
+                conn.close()
+            except Exception:
+                pass
+            with self._cond:
+                self._size -= 1
+                self.discards += 1
+                self._cond.notify()
+
+        try:
+            conn = self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.creations += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # Never hand a connection with an open transaction to the next caller
+                conn.rollback()
+            except Exception as e:
+                logging.warning(f"Discarding broken connection from pool '{self.name}': {e}")
+                discard = True
+
+        with self._cond:
+            if discard or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'hits': self.hits,
+                'waits': self.waits,
+                'creations': self.creations,
+                'discards': self.discards,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _discard(self, conn):
+        # Caller holds self._cond
+        self._size -= 1
+        self.discards += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn):
+        if getattr(conn, 'closed', 0):
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_key(db_type, db_name, db_params=None):
+    params = tuple(sorted((db_params or {}).items())) if db_type == 'postgres' else None
+    return (db_type, db_name if db_type == 'sqlite' else None, params)
+
+
+def get_or_create_pool(key, factory, **pool_options):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(factory, name=f"{key[0]}:{key[1] or (dict(key[2] or ()).get('dbname'))}",
+                                  **pool_options)
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {pool.name: pool.stats() for pool in pools.values()}
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
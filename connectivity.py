@@ -0,0 +1,103 @@
+import time
+import logging
+import threading
+import psycopg2
+
+CONNECT_TIMEOUT = 2      # seconds a reachability probe may spend connecting
+PROBE_TTL = 5            # seconds a successful probe is trusted before probing again
+FAILURE_THRESHOLD = 2    # consecutive failures that open the circuit
+RESET_TIMEOUT = 30       # seconds the circuit stays open before a trial probe is allowed
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ConnectivityMonitor:
+    """Cached PostgreSQL reachability with a circuit breaker.
+
+    While the circuit is open every check returns False immediately, so callers fall back
+    to local storage without waiting for a TCP timeout. After `reset_timeout` a single
+    caller is let through to probe (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, db_params, connect_timeout=CONNECT_TIMEOUT, ttl=PROBE_TTL,
+                 failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.db_params = dict(db_params)
+        self.connect_timeout = connect_timeout
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.checked_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_reachable(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return False
+            elif self.checked_at is not None and now - self.checked_at < self.ttl:
+                return True
+            self._probing = True
+
+        try:
+            reachable = self._probe()
+        finally:
+            with self._lock:
+                self._probing = False
+        if reachable:
+            self.record_success()
+        else:
+            self.record_failure()
+        return reachable
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logging.info("PostgreSQL server reachable again, closing circuit.")
+            self.state = CLOSED
+            self.failures = 0
+            self.checked_at = time.monotonic()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.checked_at = None
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logging.warning(f"PostgreSQL server unreachable, opening circuit for {self.reset_timeout}s.")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _probe(self):
+        try:
+            conn = psycopg2.connect(**{'connect_timeout': self.connect_timeout, **self.db_params})
+            conn.close()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(db_params, **options):
+    """Return the process-wide monitor for a server, so every caller shares one cached state."""
+    key = tuple(sorted(db_params.items()))
+    with _monitors_lock:
+        monitor = _monitors.get(key)
+        if monitor is None:
+            monitor = ConnectivityMonitor(db_params, **options)
+            _monitors[key] = monitor
+        return monitor
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import psycopg2
+from psycopg2.extras import execute_values
+
+# Transfer engine used per table; tables not listed here use DEFAULT_ENGINE
+TABLE_ENGINES = {
+    'clock_in_out': 'copy',
+}
+DEFAULT_ENGINE = 'insert'
+
+# Characters read from the row stream per round trip by copy_expert
+COPY_READ_SIZE = 64 * 1024
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\n': '\\n', '\r': '\\r', '\t': '\\t'})
+
+
+def engine_for(table_name):
+    return TABLE_ENGINES.get(table_name, DEFAULT_ENGINE)
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class RowStream:
+    """Read-only file object that encodes rows into COPY text format on demand.
+
+    copy_expert pulls fixed-size chunks through read(); rows are only taken from the
+    source iterator as needed to fill the next chunk, so the payload is never built in full.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ''
+        self._exhausted = False
+        self.row_count = 0
+
+    def _fill(self, size):
+        lines = []
+        pending = len(self._buffer)
+        while not self._exhausted and (size < 0 or pending < size):
+            row = next(self._rows, None)
+            if row is None:
+                self._exhausted = True
+                break
+            line = '\t'.join([_copy_value(value) for value in row]) + '\n'
+            lines.append(line)
+            pending += len(line)
+            self.row_count += 1
+        if lines:
+            self._buffer += ''.join(lines)
+
+    def read(self, size=-1):
+        self._fill(size)
+        if size < 0 or size >= len(self._buffer):
+            chunk, self._buffer = self._buffer, ''
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size=-1):
+        while '\n' not in self._buffer and not self._exhausted:
+            self._fill(len(self._buffer) + 1)
+        end = self._buffer.find('\n') + 1 or len(self._buffer)
+        line, self._buffer = self._buffer[:end], self._buffer[end:]
+        return line
+
+
+def upsert_clause(columns, conflict_key):
+    """ON CONFLICT clause that overwrites an existing row with the incoming values."""
+    if not conflict_key:
+        return ''
+    updates = ', '.join([f'"{col}" = EXCLUDED."{col}"' for col in columns if col != conflict_key])
+    action = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+    return f' ON CONFLICT ("{conflict_key}") {action}'
+
+
+def _stage_name(table_name, columns):
+    digest = hashlib.sha1(','.join(columns).encode()).hexdigest()[:8]
+    return f'_stage_{table_name}_{digest}'
+
+
+def copy_rows(conn, table_name, columns, rows, conflict_key=None):
+    quoted_columns = ', '.join([f'"{col}"' for col in columns])
+    stream = RowStream(rows)
+    with conn.cursor() as cursor:
+        if not conflict_key:
+            cursor.copy_expert(f'COPY "{table_name}" ({quoted_columns}) FROM STDIN', stream, size=COPY_READ_SIZE)
+            return stream.row_count
+        # COPY cannot resolve conflicts itself: stream into a session-local staging table, then upsert from it.
+        # The stage holds only the uploaded columns (LIKE would copy NOT NULL on columns such as a serial id
+        # without their defaults); its name follows the column list so a schema change gets a fresh stage.
+        stage = _stage_name(table_name, columns)
+        cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS "{stage}" AS SELECT {quoted_columns} FROM "{table_name}" WITH NO DATA')
+        cursor.copy_expert(f'COPY "{stage}" ({quoted_columns}) FROM STDIN', stream, size=COPY_READ_SIZE)
+        cursor.execute(f'INSERT INTO "{table_name}" ({quoted_columns}) SELECT {quoted_columns} FROM "{stage}"'
+                       + upsert_clause(columns, conflict_key))
+        cursor.execute(f'TRUNCATE "{stage}"')
+    return stream.row_count
+
+
+def insert_rows(conn, table_name, columns, rows, page_size=1000, conflict_key=None):
+    quoted_columns = ', '.join([f'"{col}"' for col in columns])
+    rows = list(rows)
+    with conn.cursor() as cursor:
+        execute_values(cursor, f'INSERT INTO "{table_name}" ({quoted_columns}) VALUES %s'
+                       + upsert_clause(columns, conflict_key), rows, page_size=page_size)
+    return len(rows)
+
+
+def _supports_copy(conn):
+    cursor = conn.cursor()
+    try:
+        return hasattr(cursor, 'copy_expert')
+    finally:
+        cursor.close()
+
+
+def upload_rows(conn, table_name, columns, rows_factory, engine=None, conflict_key=None):
+    """Upload rows with the table's engine, without committing. Returns the number of rows sent.
+
+    `rows_factory` must return a fresh iterable on each call so the rows can be replayed
+    through execute_values if the server refuses COPY. With `conflict_key` the rows are
+    upserted on that (unique) column, so resending a batch does not create duplicates.
+    """
+    engine = engine or engine_for(table_name)
+    if engine == 'copy':
+        if _supports_copy(conn):
+            # A savepoint confines a refused COPY to itself, leaving the caller's transaction intact
+            with conn.cursor() as cursor:
+                cursor.execute("SAVEPOINT copy_upload")
+            try:
+                sent = copy_rows(conn, table_name, columns, rows_factory(), conflict_key)
+                with conn.cursor() as cursor:
+                    cursor.execute("RELEASE SAVEPOINT copy_upload")
+                return sent
+            except psycopg2.NotSupportedError as e:
+                with conn.cursor() as cursor:
+                    cursor.execute("ROLLBACK TO SAVEPOINT copy_upload")
+                logging.warning(f"COPY not available for '{table_name}', falling back to INSERT: {e}")
+        else:
+            logging.warning(f"Connection does not support COPY, falling back to INSERT for '{table_name}'.")
+    elif engine != 'insert':
+        raise ValueError(f"Unsupported transfer engine: {engine}")
+    return insert_rows(conn, table_name, columns, rows_factory(), conflict_key=conflict_key)
@@ -1,5 +1,9 @@
+import uuid
 import logging
+from itertools import islice
+from psycopg2.extras import execute_values
 from db_connection import get_connection
+from sql_builder import build_sql, execute_prepared
 
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -21,7 +25,8 @@ def create_employees_table(db_type='sqlite', db_name='database.db', db_params=No
             department TEXT,
             position TEXT,
             is_synced BOOLEAN,
-            is_active BOOLEAN
+            is_active BOOLEAN,
+            modified_at TIMESTAMP
         )
         """ if db_type == 'sqlite' else """
         CREATE TABLE IF NOT EXISTS employees (
@@ -32,7 +37,8 @@ def create_employees_table(db_type='sqlite', db_name='database.db', db_params=No
             department VARCHAR(100),
             position VARCHAR(100),
             is_synced BOOLEAN,
-            is_active BOOLEAN
+            is_active BOOLEAN,
+            modified_at TIMESTAMP DEFAULT now()
         )
         """
         safe_execute(cursor, sql)
@@ -40,10 +46,15 @@ def create_employees_table(db_type='sqlite', db_name='database.db', db_params=No
 
 def store(table_name, data_dict, db_type='sqlite', db_name='database.db', db_params=None):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
-        keys = ', '.join(data_dict.keys())
-        placeholders = ', '.join(['%s' if db_type == 'postgres' else '?' for _ in data_dict])
-        sql = f"INSERT INTO {table_name} ({keys}) VALUES ({placeholders})"
-        safe_execute(cursor, sql, tuple(data_dict.values()))
+        keys = tuple(data_dict.keys())
+        if db_type == 'postgres':
+            try:
+                execute_prepared(conn, cursor, 'insert', table_name, keys, tuple(data_dict.values()))
+            except Exception as e:
+                logging.error(f"Error executing prepared insert into {table_name} | Error: {e}")
+                raise
+        else:
+            safe_execute(cursor, build_sql('insert', table_name, keys, db_type), tuple(data_dict.values()))
         conn.commit()
 
 def get_all(table_name, db_type='sqlite', db_name='database.db', db_params=None):
@@ -57,13 +68,51 @@ def get_all(table_name, db_type='sqlite', db_name='database.db', db_params=None)
 
 def store(table_name, data_dict, db_type='sqlite', db_name='database.db', db_params=None):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
-        keys = ', '.join(data_dict.keys())
-        placeholders = ', '.join(['%s' if db_type == 'postgres' else '?' for _ in data_dict])
-        sql = f"INSERT INTO {table_name} ({keys}) VALUES ({placeholders})"
-        safe_execute(cursor, sql, tuple(data_dict.values()))
+        keys = tuple(data_dict.keys())
+        if db_type == 'postgres':
+            try:
+                execute_prepared(conn, cursor, 'insert', table_name, keys, tuple(data_dict.values()))
+            except Exception as e:
+                logging.error(f"Error executing prepared insert into {table_name} | Error: {e}")
+                raise
+        else:
+            safe_execute(cursor, build_sql('insert', table_name, keys, db_type), tuple(data_dict.values()))
         conn.commit()
 
 
+def store_many(table_name, rows, chunk_size=1000, db_type='sqlite', db_name='database.db', db_params=None):
+    """Insert an iterable of dicts, committing once per chunk. Returns the number of rows stored."""
+    rows = iter(rows)
+    stored = 0
+    with get_connection(db_type, db_name, db_params) as (conn, cursor):
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            keys = tuple(chunk[0].keys())
+            key_set = set(keys)
+            values = []
+            for row in chunk:
+                if row.keys() != key_set:
+                    raise ValueError(f"All rows in a chunk must have the same columns as the first row: {keys}")
+                values.append(tuple(row[key] for key in keys))
+
+            columns = ', '.join(keys)
+            try:
+                if db_type == 'postgres':
+                    sql = f"INSERT INTO {table_name} ({columns}) VALUES %s"
+                    execute_values(cursor, sql, values, page_size=len(values))
+                else:
+                    cursor.executemany(build_sql('insert', table_name, keys, db_type), values)
+            except Exception as e:
+                logging.error(f"Error executing bulk insert into {table_name} after {stored} rows | Error: {e}")
+                raise
+            conn.commit()
+            stored += len(chunk)
+    return stored
+
+
 def get_all(table_name, db_type='sqlite', db_name='database.db', db_params=None):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
         sql = f"SELECT * FROM {table_name}"
@@ -74,8 +123,7 @@ def get_all(table_name, db_type='sqlite', db_name='database.db', db_params=None)
 
 def get_by_condition(table_name, conditions, db_type='sqlite', db_name='database.db', db_params=None):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
-        condition_str = ' AND '.join([f"{key} = %s" if db_type == 'postgres' else f"{key} = ?" for key in conditions])
-        sql = f"SELECT * FROM {table_name} WHERE {condition_str}"
+        sql = build_sql('select', table_name, tuple(conditions), db_type)
         safe_execute(cursor, sql, tuple(conditions.values()))
         rows = cursor.fetchall()
     return rows
@@ -83,21 +131,91 @@ def get_by_condition(table_name, conditions, db_type='sqlite', db_name='database
 
 def update(table_name, record_id, data_dict, db_type='sqlite', db_name='database.db', db_params=None):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
-        updates = ', '.join([f"{key} = %s" if db_type == 'postgres' else f"{key} = ?" for key in data_dict])
-        sql = f"UPDATE {table_name} SET {updates} WHERE id = %s" if db_type == 'postgres' else f"UPDATE {table_name} SET {updates} WHERE id = ?"
+        sql = build_sql('update', table_name, tuple(data_dict), db_type)
         safe_execute(cursor, sql, (*data_dict.values(), record_id))
         conn.commit()
 
 
 def delete(table_name, record_id, db_type='sqlite', db_name='database.db', db_params=None):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
-        sql = f"DELETE FROM {table_name} WHERE id = %s" if db_type == 'postgres' else f"DELETE FROM {table_name} WHERE id = ?"
+        sql = build_sql('delete', table_name, (), db_type)
         safe_execute(cursor, sql, (record_id,))
         conn.commit()
 
-def get_paginated(table_name, limit=10, offset=0, db_type='sqlite', db_name='database.db', db_params=None):
+def _check_order_column(cursor, table_name, column):
+    # order_by is interpolated into the keyset predicate, so it must be a real column of the table
+    safe_execute(cursor, f"SELECT * FROM {table_name} LIMIT 0")
+    columns = [desc[0] for desc in cursor.description]
+    cursor.fetchall()
+    if column not in columns:
+        raise ValueError(f"Unknown column '{column}' for table {table_name}")
+    return columns.index(column)
+
+
+def get_paginated(table_name, limit=10, offset=0, db_type='sqlite', db_name='database.db', db_params=None,
+                  after=None, order_by='id'):
     with get_connection(db_type, db_name, db_params) as (conn, cursor):
-        sql = f"SELECT * FROM {table_name} LIMIT %s OFFSET %s" if db_type == 'postgres' else f"SELECT * FROM {table_name} LIMIT ? OFFSET ?"
-        safe_execute(cursor, sql, (limit, offset))
+        placeholder = '%s' if db_type == 'postgres' else '?'
+        if after is not None:
+            # Keyset pagination: seek past the last key seen instead of counting skipped rows
+            _check_order_column(cursor, table_name, order_by)
+            sql = f"SELECT * FROM {table_name} WHERE {order_by} > {placeholder} ORDER BY {order_by} LIMIT {placeholder}"
+            params = (after, limit)
+        else:
+            sql = f"SELECT * FROM {table_name} LIMIT {placeholder} OFFSET {placeholder}"
+            params = (limit, offset)
+        safe_execute(cursor, sql, params)
         rows = cursor.fetchall()
     return rows
+
+
+def iter_rows(table_name, order_by='id', after=None, chunk=1000, db_type='sqlite', db_name='database.db', db_params=None):
+    """Yield every row of a table ordered by a unique column, holding at most `chunk` rows in memory.
+
+    On SQLite a pooled connection is only held while each chunk is read, so an iterator that
+    is abandoned half-way holds none. On PostgreSQL the rows stream from a server-side cursor
+    that keeps its connection until the iterator is exhausted, closed (close()) or collected.
+    """
+    if db_type == 'postgres':
+        yield from _iter_rows_server_side(table_name, order_by, after, chunk, db_name, db_params)
+        return
+
+    key_index = None
+    while True:
+        with get_connection(db_type, db_name, db_params) as (conn, cursor):
+            if key_index is None:
+                key_index = _check_order_column(cursor, table_name, order_by)
+            if after is None:
+                sql = f"SELECT * FROM {table_name} ORDER BY {order_by} LIMIT ?"
+                params = (chunk,)
+            else:
+                sql = f"SELECT * FROM {table_name} WHERE {order_by} > ? ORDER BY {order_by} LIMIT ?"
+                params = (after, chunk)
+            safe_execute(cursor, sql, params)
+            rows = cursor.fetchall()
+        if not rows:
+            return
+        yield from rows
+        if len(rows) < chunk:
+            return
+        after = rows[-1][key_index]
+
+
+def _iter_rows_server_side(table_name, order_by, after, chunk, db_name, db_params):
+    with get_connection('postgres', db_name, db_params) as (conn, cursor):
+        _check_order_column(cursor, table_name, order_by)
+        # A named cursor keeps the result set on the server and streams it `chunk` rows at a time
+        named = conn.cursor(name=f"iter_{table_name}_{uuid.uuid4().hex[:8]}")
+        named.itersize = chunk
+        try:
+            if after is None:
+                safe_execute(named, f"SELECT * FROM {table_name} ORDER BY {order_by}")
+            else:
+                safe_execute(named, f"SELECT * FROM {table_name} WHERE {order_by} > %s ORDER BY {order_by}", (after,))
+            while True:
+                rows = named.fetchmany(chunk)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            named.close()
@@ -1,10 +1,31 @@
 import sqlite3
 import psycopg2
 from contextlib import contextmanager
+from connection_pool import get_or_create_pool, pool_key
+
+# Performance profile applied to every SQLite connection opened through connect_sqlite.
+# WAL lets readers (the UI) and the writer (sync) work concurrently instead of hitting "database is locked".
+SQLITE_PROFILE = {
+    'busy_timeout': 5000,         # ms to wait for a lock before raising
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',      # durable across application crashes; fsync only at checkpoints in WAL mode
+    'cache_size': -16000,         # negative means KiB, i.e. 16 MB of page cache
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+def configure_sqlite(**settings):
+    SQLITE_PROFILE.update(settings)
+
+def connect_sqlite(db_name, profile=None, **connect_kwargs):
+    conn = sqlite3.connect(db_name, **connect_kwargs)
+    for pragma, value in (SQLITE_PROFILE if profile is None else profile).items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
 
 def connect(db_type='sqlite', db_name='database.db', db_params=None):
     if db_type == 'sqlite':
-        conn = sqlite3.connect(db_name)
+        conn = connect_sqlite(db_name)
         cursor = conn.cursor()
     elif db_type == 'postgres':
         conn = psycopg2.connect(**db_params)
@@ -13,12 +34,33 @@ def connect(db_type='sqlite', db_name='database.db', db_params=None):
         raise ValueError("Unsupported database type. Use 'sqlite' or 'postgres'.")
     return conn, cursor
 
+def _open_pooled(db_type, db_name, db_params):
+    if db_type == 'sqlite':
+        # Pooled connections may be checked out by a different thread than the one that opened them
+        return connect_sqlite(db_name, check_same_thread=False)
+    return psycopg2.connect(**db_params)
+
+def get_pool(db_type='sqlite', db_name='database.db', db_params=None, **pool_options):
+    if db_type not in ('sqlite', 'postgres'):
+        raise ValueError("Unsupported database type. Use 'sqlite' or 'postgres'.")
+    key = pool_key(db_type, db_name, db_params)
+    return get_or_create_pool(key, lambda: _open_pooled(db_type, db_name, db_params), **pool_options)
+
 @contextmanager
 def get_connection(db_type='sqlite', db_name='database.db', db_params=None):
-    conn, cursor = None, None
+    pool = get_pool(db_type, db_name, db_params)
+    conn = pool.acquire()
+    cursor, broken = None, False
     try:
-        conn, cursor = connect(db_type, db_name, db_params)
+        cursor = conn.cursor()
         yield conn, cursor
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
     finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
+        if cursor:
+            try:
+                cursor.close()
+            except Exception:
+                broken = True
+        pool.release(conn, discard=broken)
@@ -0,0 +1,87 @@
+import uuid
+import logging
+import threading
+
+# Client-generated, globally unique row identifier carried from the local database to the server.
+# The server upserts on it, so a batch that was uploaded but never acknowledged locally can be resent safely.
+UID_COLUMN = 'uid'
+
+# SQLite expression yielding 32 random hex characters, the same shape as new_uid()
+UID_SQL = "lower(hex(randomblob(16)))"
+
+_server_tables_ready = set()
+
+# (database file, table) -> PRAGMA schema_version after ensure_uid_column last set the table up
+_local_tables_ready = {}
+_lock = threading.Lock()
+
+
+def new_uid():
+    return uuid.uuid4().hex
+
+
+def has_uid_column(local_conn, table_name):
+    return UID_COLUMN in [desc[1] for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]
+
+
+# Add the uid column to a local table (if missing), fill it for existing rows and keep it filled for new ones.
+# SQLite cannot ALTER in a column with an expression default, so rows inserted without a uid get one from a trigger.
+# Once done, later calls cost one PRAGMA schema_version until the schema of the database changes.
+def ensure_uid_column(local_conn, table_name):
+    database = local_conn.execute("PRAGMA database_list").fetchone()[2]
+    key = (database, table_name)
+    version = local_conn.execute("PRAGMA schema_version").fetchone()[0]
+    with _lock:
+        ready = database and _local_tables_ready.get(key) == version
+    if ready:
+        return
+
+    if not has_uid_column(local_conn, table_name):
+        local_conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {UID_COLUMN} TEXT")
+        logging.info(f"Added '{UID_COLUMN}' column to local table '{table_name}'.")
+    local_conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table_name}_fill_uid AFTER INSERT ON {table_name}
+        WHEN NEW.{UID_COLUMN} IS NULL
+        BEGIN UPDATE {table_name} SET {UID_COLUMN} = {UID_SQL} WHERE rowid = NEW.rowid; END
+    ''')
+    local_conn.execute(f"UPDATE {table_name} SET {UID_COLUMN} = {UID_SQL} WHERE {UID_COLUMN} IS NULL")
+    local_conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table_name}_{UID_COLUMN} ON {table_name} ({UID_COLUMN})")
+    local_conn.commit()
+    # In-memory databases have no file name to tell them apart, so they are not remembered
+    if database:
+        with _lock:
+            _local_tables_ready[key] = local_conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def _server_uid_ready(server_conn, table_name):
+    with server_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+            (table_name, UID_COLUMN)
+        )
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s AND indexname = %s",
+            (table_name, f"uq_{table_name}_{UID_COLUMN}")
+        )
+        return cursor.fetchone() is not None
+
+
+# Make sure the server table has a unique uid column to upsert on. Checked once per server table and
+# process; the DDL (and its ACCESS EXCLUSIVE lock) is only issued when the catalog shows it is missing.
+def ensure_server_uid_column(server_conn, table_name):
+    key = (server_conn.dsn, table_name)
+    if key in _server_tables_ready:
+        return
+    if _server_uid_ready(server_conn, table_name):
+        # End the catalog query's transaction
+        server_conn.commit()
+    else:
+        with server_conn.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS "{UID_COLUMN}" TEXT')
+            cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "uq_{table_name}_{UID_COLUMN}" ON "{table_name}" ("{UID_COLUMN}")')
+        server_conn.commit()
+        logging.info(f"Added unique '{UID_COLUMN}' column to server table '{table_name}'.")
+    _server_tables_ready.add(key)
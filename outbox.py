@@ -0,0 +1,163 @@
+import logging
+from contextlib import contextmanager
+from psycopg2.extras import execute_values
+from copy_engine import upsert_clause
+
+CHANGELOG_TABLE = 'sync_changelog'
+STATE_TABLE = 'sync_state'
+# Tables whose deletes are currently acknowledgement purges rather than user deletes (see suppress_delete_events)
+SUPPRESS_TABLE = 'sync_outbox_suppress'
+
+# SQLite caps the number of bound parameters per statement; stay well below it
+ID_CHUNK_SIZE = 500
+
+
+def _table_columns(local_conn, table_name):
+    return [desc[1] for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]
+
+
+# Create the change-log tables and the triggers that feed them for one table
+def install_outbox(local_conn, table_name, key_column='id', ignore_columns=('synced',)):
+    local_conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {CHANGELOG_TABLE} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_key NOT NULL,  -- untyped so integer ids and text keys both fit
+            op TEXT NOT NULL
+        )
+    ''')
+    local_conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS {CHANGELOG_TABLE}_table_seq ON {CHANGELOG_TABLE} (table_name, seq)
+    ''')
+    local_conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    local_conn.execute(f"CREATE TABLE IF NOT EXISTS {SUPPRESS_TABLE} (table_name TEXT PRIMARY KEY)")
+
+    # Acknowledgement columns such as 'synced' must not generate change events of their own
+    tracked = [col for col in _table_columns(local_conn, table_name) if col not in ignore_columns]
+    log_insert = f"INSERT INTO {CHANGELOG_TABLE} (table_name, row_key, op) VALUES ('{table_name}'"
+
+    # Triggers are recreated so the UPDATE OF column list follows schema changes.
+    # A key filled in after the insert (e.g. a uid set by another trigger) is logged by the update trigger.
+    for op in ('insert', 'update', 'delete'):
+        local_conn.execute(f"DROP TRIGGER IF EXISTS {table_name}_outbox_{op}")
+    local_conn.execute(f'''
+        CREATE TRIGGER {table_name}_outbox_insert AFTER INSERT ON {table_name}
+        WHEN NEW.{key_column} IS NOT NULL
+        BEGIN {log_insert}, NEW.{key_column}, 'I'); END
+    ''')
+    local_conn.execute(f'''
+        CREATE TRIGGER {table_name}_outbox_update AFTER UPDATE OF {', '.join(tracked)} ON {table_name}
+        WHEN NEW.{key_column} IS NOT NULL
+        BEGIN {log_insert}, NEW.{key_column}, 'U'); END
+    ''')
+    local_conn.execute(f'''
+        CREATE TRIGGER {table_name}_outbox_delete AFTER DELETE ON {table_name}
+        WHEN OLD.{key_column} IS NOT NULL
+         AND NOT EXISTS (SELECT 1 FROM {SUPPRESS_TABLE} WHERE table_name = '{table_name}')
+        BEGIN {log_insert}, OLD.{key_column}, 'D'); END
+    ''')
+
+    # First installation: queue the rows that were pending before the triggers existed
+    registered = local_conn.execute(f"SELECT 1 FROM {STATE_TABLE} WHERE table_name = ?", (table_name,)).fetchone()
+    if not registered:
+        pending = "WHERE synced = 0" if 'synced' in ignore_columns and 'synced' in _table_columns(local_conn, table_name) else ""
+        local_conn.execute(f'''
+            INSERT INTO {CHANGELOG_TABLE} (table_name, row_key, op)
+            SELECT '{table_name}', {key_column}, 'I' FROM {table_name} {pending} ORDER BY {key_column}
+        ''')
+        local_conn.execute(f"INSERT INTO {STATE_TABLE} (table_name, last_seq) VALUES (?, 0)", (table_name,))
+    local_conn.commit()
+
+
+@contextmanager
+def suppress_delete_events(local_conn, table_name):
+    """Keep deletes made inside the block out of the change log.
+
+    Used when rows are purged locally because the server already has them; logging those
+    deletes would make the next sync_changes delete the rows on the server. The flag lives
+    in the caller's transaction, so a rollback or crash can never leave it set.
+    """
+    installed = local_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SUPPRESS_TABLE,)
+    ).fetchone()
+    if not installed:
+        yield
+        return
+    local_conn.execute(f"INSERT OR IGNORE INTO {SUPPRESS_TABLE} (table_name) VALUES (?)", (table_name,))
+    try:
+        yield
+    finally:
+        local_conn.execute(f"DELETE FROM {SUPPRESS_TABLE} WHERE table_name = ?", (table_name,))
+
+
+def get_high_water_mark(local_conn, table_name):
+    row = local_conn.execute(f"SELECT last_seq FROM {STATE_TABLE} WHERE table_name = ?", (table_name,)).fetchone()
+    return row[0] if row else 0
+
+
+def fetch_changes(local_conn, table_name, after_seq, batch_size):
+    return local_conn.execute(
+        f"SELECT seq, row_key, op FROM {CHANGELOG_TABLE} WHERE table_name = ? AND seq > ? ORDER BY seq LIMIT ?",
+        (table_name, after_seq, batch_size)
+    ).fetchall()
+
+
+def _fetch_rows(local_conn, table_name, key_column, keys):
+    rows = []
+    for start in range(0, len(keys), ID_CHUNK_SIZE):
+        chunk = keys[start:start + ID_CHUNK_SIZE]
+        placeholders = ', '.join(['?' for _ in chunk])
+        rows.extend(local_conn.execute(
+            f"SELECT * FROM {table_name} WHERE {key_column} IN ({placeholders})", chunk
+        ).fetchall())
+    return rows
+
+
+# Apply one batch of change-log events to PostgreSQL and advance the high-water mark
+def sync_changes(local_conn, server_conn, table_name, batch_size=1000, key_column='id', ignore_columns=('synced',)):
+    last_seq = get_high_water_mark(local_conn, table_name)
+    events = fetch_changes(local_conn, table_name, last_seq, batch_size)
+    if not events:
+        return 0
+
+    # Several events for the same row collapse into the latest one
+    latest = {}
+    for seq, row_key, op in events:
+        latest[row_key] = op
+    upsert_keys = [key for key, op in latest.items() if op != 'D']
+    delete_keys = [key for key, op in latest.items() if op == 'D']
+
+    columns = _table_columns(local_conn, table_name)
+    positions = [index for index, col in enumerate(columns) if col not in ignore_columns]
+    upload_columns = [columns[index] for index in positions]
+    rows = [tuple(row[index] for index in positions) for row in _fetch_rows(local_conn, table_name, key_column, upsert_keys)]
+
+    try:
+        with server_conn.cursor() as cursor:
+            if rows:
+                quoted_columns = ', '.join([f'"{col}"' for col in upload_columns])
+                execute_values(
+                    cursor,
+                    f'INSERT INTO "{table_name}" ({quoted_columns}) VALUES %s' + upsert_clause(upload_columns, key_column),
+                    rows, page_size=len(rows)
+                )
+            if delete_keys:
+                cursor.execute(f'DELETE FROM "{table_name}" WHERE "{key_column}" = ANY(%s)', (delete_keys,))
+        server_conn.commit()
+    except Exception as e:
+        server_conn.rollback()
+        logging.error(f"Error applying change-log batch for '{table_name}': {e}")
+        raise
+
+    # Replaying a batch after a crash here is harmless: upserts and deletes are idempotent
+    high_water_mark = events[-1][0]
+    local_conn.execute(f"UPDATE {STATE_TABLE} SET last_seq = ? WHERE table_name = ?", (high_water_mark, table_name))
+    local_conn.execute(f"DELETE FROM {CHANGELOG_TABLE} WHERE table_name = ? AND seq <= ?", (table_name, high_water_mark))
+    local_conn.commit()
+    logging.info(f"Applied {len(events)} change events ({len(rows)} upserts, {len(delete_keys)} deletes) to '{table_name}'.")
+    return len(events)
@@ -0,0 +1,152 @@
+import os
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from automatedsync import POSTGRES_CONFIG, connect_postgres, fetch_unsynced_batch, prepare_rows
+from copy_engine import upload_rows
+from sync_ack import acknowledge_rows
+from global_ids import UID_COLUMN, ensure_uid_column, ensure_server_uid_column
+from db_connection import connect_sqlite
+from schema_cache import get_table_schema
+from sync_metrics import REGISTRY as metrics, export_metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(message)s')
+
+PARTITION_ROWS = 50000   # pending rows per partition handed to a worker
+BATCH_SIZE = 5000        # rows per server transaction inside a partition
+
+
+# Split the pending rows of each table into id ranges of about `partition_rows` rows
+def plan_partitions(local_conn, tables, partition_rows=PARTITION_ROWS):
+    partitions = []
+    for table_name in tables:
+        after_id = 0
+        while True:
+            first = local_conn.execute(
+                f"SELECT id FROM {table_name} WHERE synced = 0 AND id > ? ORDER BY id LIMIT 1", (after_id,)
+            ).fetchone()
+            if not first:
+                break
+            # Seek to the last id of this partition through the pending-rows index
+            last = local_conn.execute(
+                f"SELECT id FROM {table_name} WHERE synced = 0 AND id > ? ORDER BY id LIMIT 1 OFFSET ?",
+                (after_id, partition_rows - 1)
+            ).fetchone()
+            if not last:
+                last = local_conn.execute(f"SELECT MAX(id) FROM {table_name} WHERE synced = 0").fetchone()
+            partitions.append((table_name, first[0], last[0]))
+            after_id = last[0]
+    return partitions
+
+
+def _init_worker(postgres_config):
+    # Spawned workers re-import automatedsync; carry over the configuration the parent actually uses
+    POSTGRES_CONFIG.clear()
+    POSTGRES_CONFIG.update(postgres_config)
+
+
+# Runs in a worker process with its own connections. Uploads one id range batch by batch and
+# returns the ids the server committed; acknowledging them locally is left to the parent, so
+# workers never compete for the SQLite write lock.
+def sync_partition(db_name, schema, first_id, last_id, batch_size=BATCH_SIZE):
+    table_name = schema.table_name
+    result = {'table': table_name, 'range': (first_id, last_id), 'ids': [], 'error': None}
+    conn = connect_postgres()
+    if not conn:
+        result['error'] = 'PostgreSQL unreachable'
+        return result
+
+    local_conn = connect_sqlite(f'{db_name}.db')
+    try:
+        after_id = first_id - 1
+        while True:
+            batch = fetch_unsynced_batch(local_conn, table_name, batch_size, after_id, last_id)
+            if not batch:
+                break
+            prepared = prepare_rows(batch, schema)
+            upload_rows(conn, table_name, schema.upload_columns, lambda: prepared.rows, conflict_key=UID_COLUMN)
+            conn.commit()
+            result['ids'].extend(prepared.ids)
+            after_id = batch[-1][0]
+    except Exception as e:
+        conn.rollback()
+        result['error'] = str(e)
+    finally:
+        local_conn.close()
+        conn.close()
+    return result
+
+
+def parallel_sync(db_name, tables, workers=None, partition_rows=PARTITION_ROWS, batch_size=BATCH_SIZE):
+    """Sync the backlog of several tables with a pool of processes, one id range per task.
+
+    Returns {table: rows synced}, or None when PostgreSQL could not be reached. Rows of a
+    partition that failed part-way stay pending; everything uploaded is upserted on uid, so
+    running the sync again is safe.
+    """
+    workers = workers or os.cpu_count() or 1
+    local_conn = connect_sqlite(f'{db_name}.db')
+    try:
+        # Schema changes and introspection happen once here; workers receive the resulting schemas
+        conn = connect_postgres()
+        if not conn:
+            logging.error("Failed to connect to PostgreSQL for syncing.")
+            for table_name in tables:
+                metrics.inc('sync_errors_total', table=table_name)
+            export_metrics()
+            return None
+        schemas = {}
+        try:
+            for table_name in tables:
+                ensure_uid_column(local_conn, table_name)
+                ensure_server_uid_column(conn, table_name)
+                schemas[table_name] = get_table_schema(local_conn, table_name, conn)
+        finally:
+            conn.close()
+
+        partitions = plan_partitions(local_conn, tables, partition_rows)
+        logging.info(f"Syncing {len(partitions)} partitions of {', '.join(tables)} with {workers} processes.")
+
+        synced = {table_name: 0 for table_name in tables}
+        started = time.perf_counter()
+        # Spawned workers start clean instead of inheriting this process's open connections
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(dict(POSTGRES_CONFIG),)) as pool:
+            futures = [pool.submit(sync_partition, db_name, schemas[table_name], first_id, last_id, batch_size)
+                       for table_name, first_id, last_id in partitions]
+            for future in as_completed(futures):
+                result = future.result()
+                if result['ids']:
+                    with metrics.stage('ack', result['table']):
+                        acknowledge_rows(local_conn, result['table'], result['ids'], action='delete')
+                    synced[result['table']] += len(result['ids'])
+                    metrics.inc('sync_rows_total', len(result['ids']), table=result['table'])
+                if result['error']:
+                    metrics.inc('sync_errors_total', table=result['table'])
+                    logging.error(f"Partition {result['table']} {result['range']} stopped early: {result['error']}")
+    finally:
+        local_conn.close()
+        export_metrics()
+
+    elapsed = time.perf_counter() - started
+    total = sum(synced.values())
+    rate = total / elapsed if elapsed > 0 else 0.0
+    logging.info(f"Synced {total} records in {elapsed:.2f}s ({rate:.0f} rows/sec): {synced}")
+    return synced
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync the local backlog to PostgreSQL with several processes.')
+    parser.add_argument('db_name', help='Local SQLite database name, without the .db suffix')
+    parser.add_argument('tables', nargs='+', help='Tables to sync')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--partition-rows', type=int, default=PARTITION_ROWS, help='Pending rows per partition')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per server transaction')
+    args = parser.parse_args()
+    parallel_sync(args.db_name, args.tables, args.workers, args.partition_rows, args.batch_size)
+
+# python parallel_sync.py employee_tracker clock_in_out employees --workers 8
@@ -0,0 +1,208 @@
+import logging
+import psycopg2
+from datetime import datetime, timedelta
+
+PULL_STATE_TABLE = 'sync_pull_state'
+
+# Rows committed on the server by a transaction that started before the last pull can carry an
+# older modified_at than the stored watermark; each pull re-reads this window to pick them up.
+PULL_OVERLAP = timedelta(seconds=30)
+
+# How a pulled row is applied when the local table already has a row with the same key
+CONFLICT_POLICIES = {
+    # Keep whichever version was modified last; a local row without a readable timestamp loses.
+    # julianday() compares instants, whichever of 'T' or ' ' separates date and time in the text.
+    'last_writer_wins': ('DO UPDATE SET {updates} WHERE julianday({table}.{modified}) IS NULL '
+                         'OR julianday(excluded.{modified}) > julianday({table}.{modified})'),
+    'server_wins': 'DO UPDATE SET {updates}',
+    'local_wins': 'DO NOTHING',
+}
+
+
+def _local_value(value):
+    # Timestamps are stored as ISO strings locally, as the ORM writes them
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _parse_timestamp(value):
+    # Local timestamps may be 'T'-separated (isoformat) or space-separated (CURRENT_TIMESTAMP,
+    # sqlite3's default adapter); compare them as datetimes rather than as text
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _missing_server_objects(server_conn, table_name, modified_column):
+    # Catalog lookups only take ordinary read locks, unlike the DDL they let us skip
+    trigger = f"{table_name}_touch_{modified_column}"
+    with server_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+            (table_name, modified_column)
+        )
+        column = cursor.fetchone() is not None
+        cursor.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s AND indexname = %s",
+            (table_name, f"idx_{table_name}_{modified_column}")
+        )
+        index = cursor.fetchone() is not None
+        cursor.execute(
+            "SELECT 1 FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = current_schema() AND c.relname = %s AND t.tgname = %s",
+            (table_name, trigger)
+        )
+        has_trigger = cursor.fetchone() is not None
+    return {name for name, present in (('column', column), ('index', index), ('trigger', has_trigger)) if not present}
+
+
+# Give a server table a modified_at column that PostgreSQL maintains on every insert and update.
+# DDL is only issued for what the catalog says is missing, so routine pulls take no exclusive locks.
+def ensure_server_modified_at(server_conn, table_name, modified_column='modified_at'):
+    missing = _missing_server_objects(server_conn, table_name, modified_column)
+    if not missing:
+        # End the catalog query's transaction
+        server_conn.rollback()
+        return
+    try:
+        with server_conn.cursor() as cursor:
+            if 'column' in missing:
+                cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN IF NOT EXISTS "{modified_column}" TIMESTAMP DEFAULT now()')
+            if 'index' in missing:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_{modified_column}" ON "{table_name}" ("{modified_column}")')
+            if 'trigger' in missing:
+                cursor.execute(f'''
+                    CREATE OR REPLACE FUNCTION sync_touch_{modified_column}() RETURNS trigger AS $$
+                    BEGIN NEW."{modified_column}" := now(); RETURN NEW; END
+                    $$ LANGUAGE plpgsql
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER "{table_name}_touch_{modified_column}" BEFORE UPDATE ON "{table_name}"
+                    FOR EACH ROW EXECUTE PROCEDURE sync_touch_{modified_column}()
+                ''')
+        server_conn.commit()
+        logging.info(f"Added {', '.join(sorted(missing))} for '{modified_column}' on server table '{table_name}'.")
+    except psycopg2.Error:
+        server_conn.rollback()
+        # Another client may have created the same objects at the same moment; that is fine
+        still_missing = _missing_server_objects(server_conn, table_name, modified_column)
+        server_conn.rollback()
+        if still_missing:
+            raise
+
+
+def ensure_local_modified_at(local_conn, table_name, modified_column='modified_at'):
+    if modified_column not in [desc[1] for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]:
+        local_conn.execute(f"ALTER TABLE {table_name} ADD COLUMN {modified_column} TIMESTAMP")
+        local_conn.commit()
+
+
+def _ensure_state_table(local_conn):
+    local_conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {PULL_STATE_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            last_modified TEXT
+        )
+    ''')
+
+
+def get_watermark(local_conn, table_name):
+    _ensure_state_table(local_conn)
+    row = local_conn.execute(f"SELECT last_modified FROM {PULL_STATE_TABLE} WHERE table_name = ?", (table_name,)).fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(local_conn, table_name, last_modified):
+    local_conn.execute(
+        f"INSERT INTO {PULL_STATE_TABLE} (table_name, last_modified) VALUES (?, ?) "
+        f"ON CONFLICT(table_name) DO UPDATE SET last_modified = excluded.last_modified",
+        (table_name, last_modified)
+    )
+
+
+def _pull_columns(local_conn, server_conn, table_name):
+    local_columns = [desc[1] for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]
+    with server_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = %s AND table_schema = current_schema()",
+            (table_name,)
+        )
+        server_columns = {row[0] for row in cursor.fetchall()}
+    return [col for col in local_columns if col in server_columns]
+
+
+# One keyset page of server rows ordered by (modified_at, key), strictly after `after` = (modified, key).
+# With `after` = (modified, None) the page starts at that timestamp inclusive.
+def fetch_server_changes(server_conn, table_name, columns, after, batch_size, modified_column='modified_at', key_column='id'):
+    quoted_columns = ', '.join([f'"{col}"' for col in columns])
+    sql = f'SELECT {quoted_columns} FROM "{table_name}"'
+    params = []
+    if after is not None and after[1] is None:
+        sql += f' WHERE "{modified_column}" >= %s'
+        params.append(after[0])
+    elif after is not None:
+        sql += f' WHERE ("{modified_column}", "{key_column}") > (%s, %s)'
+        params.extend(after)
+    sql += f' ORDER BY "{modified_column}", "{key_column}" LIMIT %s'
+    params.append(batch_size)
+    with server_conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def apply_rows(local_conn, table_name, columns, rows, conflict='last_writer_wins', modified_column='modified_at', key_column='id'):
+    """Upsert pulled rows into the local table in one executemany, without committing."""
+    if conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"Unsupported conflict policy: {conflict}")
+    updates = ', '.join([f"{col} = excluded.{col}" for col in columns if col != key_column])
+    action = CONFLICT_POLICIES[conflict].format(updates=updates, table=table_name, modified=modified_column)
+    sql = (f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(['?' for _ in columns])}) "
+           f"ON CONFLICT({key_column}) {action}")
+    local_conn.executemany(sql, [tuple(_local_value(value) for value in row) for row in rows])
+
+
+def pull_changes(local_conn, server_conn, table_name, batch_size=1000, conflict='last_writer_wins',
+                 modified_column='modified_at', key_column='id'):
+    """Copy server rows changed since the stored watermark into the local table.
+
+    Pages are read in (modified_at, key) order and each one is applied and checkpointed in
+    its own local transaction, so an interrupted pull resumes where it stopped. Deletions
+    on the server are not propagated; mark rows inactive instead. Returns the rows pulled.
+    """
+    columns = _pull_columns(local_conn, server_conn, table_name)
+    if modified_column not in columns or key_column not in columns:
+        raise ValueError(f"'{table_name}' needs '{modified_column}' and '{key_column}' locally and on the server to be pulled")
+    modified_index, key_index = columns.index(modified_column), columns.index(key_column)
+
+    watermark = get_watermark(local_conn, table_name)
+    after = None
+    if watermark is not None:
+        after = ((_parse_timestamp(watermark) - PULL_OVERLAP).isoformat(), None)
+
+    pulled = 0
+    while True:
+        rows = fetch_server_changes(server_conn, table_name, columns, after, batch_size, modified_column, key_column)
+        # End the server's read transaction so it does not stay open between pages
+        server_conn.rollback()
+        if not rows:
+            break
+        last = rows[-1]
+        try:
+            apply_rows(local_conn, table_name, columns, rows, conflict, modified_column, key_column)
+            if watermark is None or _parse_timestamp(last[modified_index]) > _parse_timestamp(watermark):
+                watermark = _local_value(last[modified_index])
+                set_watermark(local_conn, table_name, watermark)
+            local_conn.commit()
+        except Exception:
+            local_conn.rollback()
+            raise
+        pulled += len(rows)
+        after = (last[modified_index], last[key_index])
+        if len(rows) < batch_size:
+            break
+
+    logging.info(f"Pulled {pulled} changed records into '{table_name}'.")
+    return pulled
@@ -0,0 +1,94 @@
+import json
+import logging
+from outbox import suppress_delete_events
+
+# Rows that can never be uploaded (e.g. NULL in a column the server requires) are moved here,
+# out of the pending set, so a sync stops fetching and rejecting them again on every run.
+QUARANTINE_TABLE = 'sync_quarantine'
+
+
+def ensure_quarantine_table(local_conn):
+    local_conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {QUARANTINE_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER,
+            row_data TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def quarantine_rows(local_conn, table_name, columns, rejected, id_position=0, commit=True):
+    """Move rejected (row, reason) pairs out of `table_name` into the quarantine table.
+
+    `columns` names the values of each row. The copy and the delete share one transaction,
+    so a row is never lost or left in both places. Returns the number of rows moved.
+    """
+    if not rejected:
+        return 0
+    try:
+        ensure_quarantine_table(local_conn)
+        local_conn.executemany(
+            f"INSERT INTO {QUARANTINE_TABLE} (table_name, row_id, row_data, reason) VALUES (?, ?, ?, ?)",
+            [(table_name, row[id_position], json.dumps(dict(zip(columns, row)), default=str), reason)
+             for row, reason in rejected]
+        )
+        # Moving a row aside is not a user delete: keep it out of the outbox change log
+        with suppress_delete_events(local_conn, table_name):
+            local_conn.executemany(f"DELETE FROM {table_name} WHERE id = ?", [(row[id_position],) for row, _ in rejected])
+        if commit:
+            local_conn.commit()
+    except Exception:
+        local_conn.rollback()
+        raise
+    logging.warning(f"Quarantined {len(rejected)} invalid records from '{table_name}'.")
+    return len(rejected)
+
+
+def quarantined_rows(local_conn, table_name=None):
+    """Quarantined rows as dicts (with the original values under 'row'), oldest first."""
+    ensure_quarantine_table(local_conn)
+    sql = f"SELECT id, table_name, row_id, row_data, reason, quarantined_at FROM {QUARANTINE_TABLE}"
+    params = ()
+    if table_name is not None:
+        sql += " WHERE table_name = ?"
+        params = (table_name,)
+    return [
+        {'id': entry_id, 'table': table, 'row_id': row_id, 'row': json.loads(row_data), 'reason': reason,
+         'quarantined_at': quarantined_at}
+        for entry_id, table, row_id, row_data, reason, quarantined_at in local_conn.execute(sql + " ORDER BY id", params)
+    ]
+
+
+def restore_rows(local_conn, entry_ids, **overrides):
+    """Put quarantined rows back into their tables as pending rows, e.g. after fixing the data.
+
+    Keyword arguments replace column values on the way back (restore_rows(conn, [3], employee_id=7)).
+    Restored rows get a new local id. Returns the number of rows restored.
+    """
+    ensure_quarantine_table(local_conn)
+    restored = 0
+    try:
+        for entry_id in entry_ids:
+            entry = local_conn.execute(
+                f"SELECT table_name, row_data FROM {QUARANTINE_TABLE} WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if not entry:
+                continue
+            table_name, row_data = entry
+            row = dict(json.loads(row_data), **overrides)
+            row.pop('id', None)
+            if 'synced' in row:
+                row['synced'] = 0
+            columns = ', '.join(row)
+            local_conn.execute(f"INSERT INTO {table_name} ({columns}) VALUES ({', '.join('?' * len(row))})",
+                               tuple(row.values()))
+            local_conn.execute(f"DELETE FROM {QUARANTINE_TABLE} WHERE id = ?", (entry_id,))
+            restored += 1
+        local_conn.commit()
+    except Exception:
+        local_conn.rollback()
+        raise
+    return restored
@@ -0,0 +1,118 @@
+import logging
+import threading
+from datetime import datetime
+from batch_transform import BatchTransformer
+
+# Table schemas are introspected once and reused until the local schema version changes or
+# an upload reports a column/type error (see invalidate). Converters are picked per column
+# from the server's type, falling back to the declared SQLite type when the server is unknown.
+_cache = {}
+_lock = threading.Lock()
+
+TIMESTAMP_TYPES = ('timestamp without time zone', 'timestamp with time zone', 'date')
+
+
+def to_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 't', 'true', 'y', 'yes')
+    return bool(value)
+
+
+def to_timestamp(value):
+    # SQLite has no timestamp type: ISO strings pass through for PostgreSQL to parse, unix times are converted
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    return value
+
+
+def converter_for(local_type, server_type=None):
+    if server_type is not None:
+        if server_type == 'boolean':
+            return to_bool
+        if server_type in TIMESTAMP_TYPES:
+            return to_timestamp
+        return None
+    local_type = (local_type or '').upper()
+    if 'BOOL' in local_type:
+        return to_bool
+    if 'TIME' in local_type or 'DATE' in local_type:
+        return to_timestamp
+    return None
+
+
+class TableSchema:
+    """Column layout of one table on both sides, with a converter per uploaded column."""
+
+    def __init__(self, table_name, local_columns, server_types=None, exclude=('id',)):
+        self.table_name = table_name
+        self.local_columns = [name for name, _ in local_columns]
+        self.server_types = server_types
+        local_types = dict(local_columns)
+
+        self.upload_columns, self.positions, self.converters = [], [], []
+        for position, name in enumerate(self.local_columns):
+            if name in exclude:
+                continue
+            if server_types is not None and name not in server_types:
+                logging.warning(f"Column '{name}' of '{table_name}' does not exist on the server and is not uploaded.")
+                continue
+            self.upload_columns.append(name)
+            self.positions.append(position)
+            self.converters.append(converter_for(local_types[name], server_types.get(name) if server_types else None))
+        self.transformer = BatchTransformer(self.upload_columns, self.positions, self.converters,
+                                            id_position=self.local_columns.index('id') if 'id' in self.local_columns else None)
+
+    def position(self, column):
+        return self.local_columns.index(column)
+
+    def transform(self, rows):
+        """Local rows (SELECT * order) to a TransformedBatch of upload tuples and their local ids."""
+        return self.transformer.transform(rows)
+
+    def convert_rows(self, rows):
+        """Local rows (SELECT * order) to upload tuples in `upload_columns` order."""
+        return self.transform(rows).rows
+
+
+def _local_key(local_conn, table_name):
+    database = local_conn.execute("PRAGMA database_list").fetchone()[2]
+    return database, table_name
+
+
+def _server_types(server_conn, table_name):
+    with server_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_name = %s AND table_schema = current_schema()", (table_name,)
+        )
+        # A table missing on the server yields no columns: treat its types as unknown
+        return dict(cursor.fetchall()) or None
+
+
+def get_table_schema(local_conn, table_name, server_conn=None, exclude=('id',)):
+    """Cached TableSchema for a local table; pass server_conn to map columns to the server's types."""
+    key = _local_key(local_conn, table_name) + (tuple(exclude),)
+    version = local_conn.execute("PRAGMA schema_version").fetchone()[0]
+    with _lock:
+        cached = _cache.get(key)
+    if cached and cached[0] == version and (server_conn is None or cached[1].server_types is not None):
+        return cached[1]
+
+    local_columns = [(desc[1].lower(), desc[2]) for desc in local_conn.execute(f'PRAGMA table_info({table_name})')]
+    server_types = _server_types(server_conn, table_name) if server_conn is not None else None
+    if server_conn is not None:
+        # Do not leave the metadata query's transaction open
+        server_conn.commit()
+    schema = TableSchema(table_name, local_columns, server_types, exclude)
+    with _lock:
+        _cache[key] = (version, schema)
+    return schema
+
+
+def invalidate(table_name=None):
+    """Forget cached schemas (of one table, or all), e.g. after the server rejected a column."""
+    with _lock:
+        for key in [key for key in _cache if table_name is None or key[1] == table_name]:
+            del _cache[key]
@@ -0,0 +1,58 @@
+import hashlib
+import weakref
+from functools import lru_cache
+
+# Upper bound on distinct (operation, table, columns, dialect) statements kept in memory
+SQL_CACHE_SIZE = 512
+
+# Names of statements PREPAREd on each live Postgres connection; entries vanish with the connection
+_prepared_by_connection = weakref.WeakKeyDictionary()
+
+
+def _placeholders(count, dialect):
+    return ', '.join(['%s' if dialect == 'postgres' else '?' for _ in range(count)])
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def build_sql(operation, table_name, columns=(), dialect='sqlite'):
+    """Return the SQL text for a CRUD operation; `columns` must be a tuple so the result can be cached."""
+    placeholder = '%s' if dialect == 'postgres' else '?'
+    if operation == 'insert':
+        return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({_placeholders(len(columns), dialect)})"
+    if operation == 'update':
+        updates = ', '.join([f"{column} = {placeholder}" for column in columns])
+        return f"UPDATE {table_name} SET {updates} WHERE id = {placeholder}"
+    if operation == 'select':
+        if not columns:
+            return f"SELECT * FROM {table_name}"
+        conditions = ' AND '.join([f"{column} = {placeholder}" for column in columns])
+        return f"SELECT * FROM {table_name} WHERE {conditions}"
+    if operation == 'delete':
+        return f"DELETE FROM {table_name} WHERE id = {placeholder}"
+    raise ValueError(f"Unsupported SQL operation: {operation}")
+
+
+@lru_cache(maxsize=SQL_CACHE_SIZE)
+def build_prepared(operation, table_name, columns=()):
+    """Return (name, PREPARE statement, EXECUTE statement) for a Postgres server-side prepared statement."""
+    sql = build_sql(operation, table_name, columns, 'postgres')
+    # Rewrite the %s placeholders to the $n form PREPARE expects
+    parts = sql.split('%s')
+    numbered = parts[0] + ''.join(f"${index}{part}" for index, part in enumerate(parts[1:], start=1))
+    name = f"{operation}_{table_name}_{hashlib.md5(sql.encode()).hexdigest()[:12]}"
+    execute_sql = f"EXECUTE {name} ({_placeholders(len(parts) - 1, 'postgres')})" if len(parts) > 1 else f"EXECUTE {name}"
+    return name, f"PREPARE {name} AS {numbered}", execute_sql
+
+
+def execute_prepared(conn, cursor, operation, table_name, columns, params):
+    """Execute a cached statement on a Postgres connection, PREPAREing it once per connection."""
+    name, prepare_sql, execute_sql = build_prepared(operation, table_name, tuple(columns))
+    prepared = _prepared_by_connection.setdefault(conn, set())
+    if name not in prepared:
+        cursor.execute(prepare_sql)
+        prepared.add(name)
+    cursor.execute(execute_sql, params)
+
+
+def cache_info():
+    return {'sql': build_sql.cache_info()._asdict(), 'prepared': build_prepared.cache_info()._asdict()}
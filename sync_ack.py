@@ -0,0 +1,40 @@
+from outbox import suppress_delete_events
+
+ACK_TABLE = 'sync_ack_ids'
+
+
+def acknowledge_rows(local_conn, table_name, ids, action='mark', commit=True):
+    """Mark rows as synced (action='mark') or delete them (action='delete') with one set-based statement.
+
+    A contiguous run of ids becomes a single BETWEEN range; anything else is staged in a
+    temporary table and joined, so the cost no longer grows with one statement per row.
+    Deletes are acknowledgements, not user deletes, so they are kept out of the outbox change log.
+    Returns the number of rows affected.
+    """
+    ids = sorted(set(ids))
+    if not ids:
+        return 0
+
+    if action == 'mark':
+        statement = f"UPDATE {table_name} SET synced = 1"
+    elif action == 'delete':
+        statement = f"DELETE FROM {table_name}"
+    else:
+        raise ValueError(f"Unsupported acknowledgement action: {action}")
+
+    try:
+        with suppress_delete_events(local_conn, table_name):
+            if ids[-1] - ids[0] + 1 == len(ids):
+                cursor = local_conn.execute(f"{statement} WHERE id BETWEEN ? AND ?", (ids[0], ids[-1]))
+            else:
+                local_conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {ACK_TABLE} (id INTEGER PRIMARY KEY)")
+                local_conn.execute(f"DELETE FROM {ACK_TABLE}")
+                local_conn.executemany(f"INSERT INTO {ACK_TABLE} (id) VALUES (?)", [(row_id,) for row_id in ids])
+                cursor = local_conn.execute(f"{statement} WHERE id IN (SELECT id FROM {ACK_TABLE})")
+                local_conn.execute(f"DELETE FROM {ACK_TABLE}")
+        if commit:
+            local_conn.commit()
+    except Exception:
+        local_conn.rollback()
+        raise
+    return cursor.rowcount
@@ -0,0 +1,115 @@
+import time
+import signal
+import random
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from automatedsync import drain_data_to_postgres
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_INTERVAL = 10   # seconds between sync passes of a table
+MAX_BACKOFF = 300       # upper bound in seconds on the wait after repeated connection failures
+
+
+# One per table worker, so each failure escalates only that table's delay once per pass and
+# one table's success does not cut short another table's backoff
+class ServerBackoff:
+    def __init__(self, base_delay=DEFAULT_INTERVAL, max_delay=MAX_BACKOFF, name='sync'):
+        self.name = name
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        delay = min(self.base_delay * 2 ** (self.failures - 1), self.max_delay)
+        # Jitter keeps the workers from reconnecting in lockstep
+        self.retry_at = time.monotonic() + delay * random.uniform(0.8, 1.2)
+        logging.warning(f"{self.name}: PostgreSQL unreachable ({self.failures} failures in a row), backing off {delay:.1f}s.")
+
+    def record_success(self):
+        if self.failures:
+            logging.info(f"{self.name}: PostgreSQL reachable again, resuming normal schedule.")
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def remaining(self):
+        return max(0.0, self.retry_at - time.monotonic())
+
+
+async def _sleep_or_stop(stop_event, delay):
+    try:
+        await asyncio.wait_for(stop_event.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_table(db_name, table_name, interval, batch_size, executor, backoff, stop_event):
+    loop = asyncio.get_running_loop()
+    while not stop_event.is_set():
+        wait = backoff.remaining()
+        if wait:
+            await _sleep_or_stop(stop_event, wait)
+            continue
+
+        try:
+            synced = await loop.run_in_executor(executor, drain_data_to_postgres, db_name, table_name, batch_size)
+        except Exception as e:
+            logging.error(f"Unexpected error syncing '{table_name}': {e}")
+            synced = 0
+
+        if synced is None:
+            backoff.record_failure()
+            continue
+        backoff.record_success()
+        await _sleep_or_stop(stop_event, interval)
+
+
+async def run_daemon(db_name, tables, workers=4, batch_size=1000, stop_event=None):
+    """Keep syncing `tables` ({table_name: interval_seconds}) until SIGINT/SIGTERM or `stop_event` is set."""
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass  # Windows: fall back to KeyboardInterrupt
+
+    # sqlite3 and psycopg2 calls block, so they run on a bounded pool of worker threads
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync') as executor:
+        logging.info(f"Sync daemon started for {len(tables)} tables with {workers} workers.")
+        await asyncio.gather(*[
+            run_table(db_name, table_name, interval, batch_size, executor,
+                      ServerBackoff(base_delay=interval, name=table_name), stop_event)
+            for table_name, interval in tables.items()
+        ])
+    logging.info("Sync daemon stopped.")
+
+
+def parse_tables(specs, default_interval):
+    tables = {}
+    for spec in specs:
+        table_name, _, interval = spec.partition(':')
+        tables[table_name] = float(interval) if interval else default_interval
+    return tables
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Continuously sync local SQLite tables to PostgreSQL.')
+    parser.add_argument('db_name', help='Local SQLite database name (without .db)')
+    parser.add_argument('tables', nargs='+', help='Tables to sync, optionally with a per-table interval: table[:seconds]')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='Default seconds between sync passes')
+    parser.add_argument('--workers', type=int, default=4, help='Maximum number of tables synced concurrently')
+    parser.add_argument('--batch_size', type=int, default=1000, help='Rows per sync transaction')
+
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_daemon(args.db_name, parse_tables(args.tables, args.interval), args.workers, args.batch_size))
+    except KeyboardInterrupt:
+        pass
+
+# python sync_daemon.py employee_tracker clock_in_out employees:60 --workers 4
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stages of one sync batch, in order
+STAGES = ('fetch', 'transform', 'upload', 'commit', 'ack')
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative, running = [], 0
+        for count in self.counts:
+            running += count
+            cumulative.append(running)
+        return {'buckets': dict(zip(self.buckets, cumulative)), 'sum': self.sum, 'count': self.count}
+
+
+class MetricsRegistry:
+    """Counters, gauges and latency histograms keyed by name and labels; safe to share between threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {'counter': {}, 'gauge': {}, 'histogram': {}}
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            series = self._metrics['counter'].setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._metrics['gauge'].setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        with self._lock:
+            series = self._metrics['histogram'].setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def stage(self, stage, table):
+        """Time one stage of a sync batch (see STAGES) into sync_stage_seconds."""
+        return self.timer('sync_stage_seconds', stage=stage, table=table)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                kind: {name: [{'labels': dict(key), 'value': value.snapshot() if kind == 'histogram' else value}
+                              for key, value in series.items()]
+                       for name, series in metrics.items()}
+                for kind, metrics in self._metrics.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            for metrics in self._metrics.values():
+                metrics.clear()
+
+
+def _atomic_write(path, text):
+    # A temp file of its own in the target directory, so concurrent writers never rename each other's
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        # mkstemp creates the file owner-only; collectors such as node_exporter run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonExporter:
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, snapshot):
+        _atomic_write(self.path, json.dumps(dict(snapshot, exported_at=time.time()), indent=2))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PrometheusTextExporter:
+    """Writes the Prometheus text exposition format, e.g. for node_exporter's textfile collector."""
+
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def _labels(labels, **extra):
+        labels = dict(labels, **extra)
+        if not labels:
+            return ''
+        return '{' + ','.join([f'{key}="{_escape(value)}"' for key, value in labels.items()]) + '}'
+
+    def render(self, snapshot):
+        lines = []
+        for kind in ('counter', 'gauge'):
+            for name, series in sorted(snapshot[kind].items()):
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{self._labels(item['labels'])} {item['value']}" for item in series)
+        for name, series in sorted(snapshot['histogram'].items()):
+            lines.append(f"# TYPE {name} histogram")
+            for item in series:
+                histogram = item['value']
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f"{name}_bucket{self._labels(item['labels'], le=bound)} {count}")
+                lines.append(f"{name}_bucket{self._labels(item['labels'], le='+Inf')} {histogram['count']}")
+                lines.append(f"{name}_sum{self._labels(item['labels'])} {histogram['sum']}")
+                lines.append(f"{name}_count{self._labels(item['labels'])} {histogram['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, snapshot):
+        _atomic_write(self.path, self.render(snapshot))
+
+
+# Process-wide registry used by the sync code, and the exporters it is written to
+REGISTRY = MetricsRegistry()
+_exporters = []
+# Sync worker threads export at the end of every drain; one export at a time keeps the files consistent
+_export_lock = threading.Lock()
+
+
+def add_exporter(exporter):
+    _exporters.append(exporter)
+
+
+def exporter_for_path(path):
+    return JsonExporter(path) if path.endswith('.json') else PrometheusTextExporter(path)
+
+
+def configure_from_env(variable='SYNC_METRICS_FILE'):
+    """Add an exporter for the file named in the environment (.json for JSON, anything else Prometheus text)."""
+    path = os.getenv(variable)
+    if path and not any(getattr(exporter, 'path', None) == path for exporter in _exporters):
+        add_exporter(exporter_for_path(path))
+
+
+def export_metrics():
+    # Entry points need not configure exporters themselves: SYNC_METRICS_FILE is honoured on first export
+    with _export_lock:
+        configure_from_env()
+        if not _exporters:
+            return
+        snapshot = REGISTRY.snapshot()
+        for exporter in _exporters:
+            exporter.export(snapshot)
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from contextlib import ExitStack
+from unittest import mock
+
+import psycopg2
+
+import automatedsync
+from sync_metrics import MetricsRegistry
+
+
+class RecordingUpload:
+    """Stand-in for copy_engine.upload_rows that records each uploaded batch and can fail on one of them."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.batches = []
+
+    def __call__(self, conn, table_name, columns, make_rows, conflict_key=None):
+        rows = list(make_rows())
+        if len(self.batches) + 1 == self.fail_on:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.batches.append(rows)
+
+
+class TestDrainDataToPostgres(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'local')
+        conn = sqlite3.connect(f'{self.db_name}.db')
+        conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, synced BOOLEAN)")
+        conn.executemany("INSERT INTO clock_in_out (employee_id, synced) VALUES (?, 0)", [(i,) for i in range(1, 11)])
+        conn.commit()
+        conn.close()
+
+        self.registry = MetricsRegistry()
+        self.server = mock.MagicMock()
+        self.server.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+            ('employee_id', 'integer'), ('synced', 'boolean'), ('uid', 'text')]
+        self.patches = [mock.patch.object(automatedsync, 'metrics', self.registry),
+                        mock.patch.object(automatedsync, 'connect_postgres', return_value=self.server)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.tmpdir.cleanup()
+
+    def _pending(self):
+        conn = sqlite3.connect(f'{self.db_name}.db')
+        try:
+            return [row[0] for row in conn.execute("SELECT employee_id FROM clock_in_out ORDER BY id")]
+        finally:
+            conn.close()
+
+    def _drain(self, upload, **patches):
+        threads_before = set(threading.enumerate())
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch.object(automatedsync, 'upload_rows', upload))
+            for name, value in patches.items():
+                stack.enter_context(mock.patch.object(automatedsync, name, value))
+            log = stack.enter_context(self.assertLogs('root', 'INFO'))
+            synced = automatedsync.drain_data_to_postgres(self.db_name, 'clock_in_out', batch_size=3)
+        # The prefetch thread is shut down before drain returns, whatever happened
+        self.assertEqual(set(threading.enumerate()) - threads_before, set())
+        return synced, log.output
+
+    def _uploaded(self, upload):
+        return [row[0] for batch in upload.batches for row in batch]
+
+    def test_backlog_is_drained_in_batches(self):
+        """Every pending row is uploaded once, over one server connection, and removed locally."""
+        upload = RecordingUpload()
+
+        synced, log = self._drain(upload)
+
+        self.assertEqual(synced, 10)
+        self.assertEqual([len(batch) for batch in upload.batches], [3, 3, 3, 1])
+        self.assertEqual(self._uploaded(upload), list(range(1, 11)))
+        self.assertEqual(self._pending(), [])
+        self.assertEqual(automatedsync.connect_postgres.call_count, 1)
+        self.assertGreaterEqual(self.server.commit.call_count, 4)
+        self.assertTrue(any('rows/sec' in line for line in log))
+        self.assertEqual(self.registry.snapshot()['counter']['sync_rows_total'][0]['value'], 10)
+
+    def test_upload_error_stops_the_drain(self):
+        """Batches acknowledged before a failed upload stay acknowledged; the rest stay pending."""
+        upload = RecordingUpload(fail_on=3)
+
+        synced, _ = self._drain(upload)
+
+        self.assertEqual(synced, 6)
+        self.assertEqual(self._pending(), [7, 8, 9, 10])
+        self.server.rollback.assert_called_once()
+        self.server.close.assert_called_once()
+        self.assertEqual(self.registry.snapshot()['counter']['sync_errors_total'][0]['value'], 1)
+
+    def test_ack_failure_keeps_rows_pending(self):
+        """If the local delete fails, the uploaded batch stays pending and is not counted as synced."""
+        upload = RecordingUpload()
+
+        synced, _ = self._drain(upload, acknowledge_rows=mock.Mock(side_effect=sqlite3.OperationalError('locked')))
+
+        self.assertEqual(synced, 0)
+        self.assertEqual(len(upload.batches), 1)
+        self.assertEqual(self._pending(), list(range(1, 11)))
+        counters = self.registry.snapshot()['counter']
+        self.assertNotIn('sync_rows_total', counters)
+        self.assertEqual(counters['sync_errors_total'][0]['value'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
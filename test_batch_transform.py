@@ -0,0 +1,42 @@
+import unittest
+
+from batch_transform import BatchTransformer
+from schema_cache import to_bool
+
+
+class TestBatchTransformer(unittest.TestCase):
+
+    def setUp(self):
+        # Local rows: id, employee_id, clock_out, synced, uid
+        self.transformer = BatchTransformer(['employee_id', 'clock_out', 'synced', 'uid'], [1, 2, 3, 4],
+                                            [None, None, to_bool, None], required=('employee_id', 'uid'))
+
+    def test_payload_and_ids_in_one_pass(self):
+        """Columns are projected and converted, and ids come back in payload order."""
+        batch = self.transformer.transform([(7, 1, None, 0, 'a'), (9, 2, '2024-01-01', '1', 'b')])
+
+        self.assertEqual(batch.rows, [(1, None, False, 'a'), (2, '2024-01-01', True, 'b')])
+        self.assertEqual(batch.ids, [7, 9])
+        self.assertEqual(batch.rejected, [])
+
+    def test_nulls_in_required_columns_are_rejected(self):
+        """Rows with NULL in a required column are set aside with the reason; the rest go through."""
+        rows = [(1, None, None, 0, 'a'), (2, 5, None, 0, 'b'), (3, 6, None, 0, None)]
+
+        batch = self.transformer.transform(rows)
+
+        self.assertEqual(batch.ids, [2])
+        self.assertEqual(batch.rows, [(5, None, False, 'b')])
+        self.assertEqual(batch.rejected, [(rows[0], "NULL in non-nullable column 'employee_id'"),
+                                          (rows[2], "NULL in non-nullable column 'uid'")])
+
+    def test_empty_and_fully_rejected_batches(self):
+        """An empty batch, or one where every row is rejected, uploads nothing."""
+        self.assertEqual(self.transformer.transform([]), ([], [], []))
+
+        batch = self.transformer.transform([(1, None, None, 0, 'a')])
+        self.assertEqual((batch.rows, batch.ids, len(batch.rejected)), ([], [], 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import psycopg2
+
+import chunk_transport
+from chunk_transport import decode_chunk, encode_chunk, export_chunks, load_manifest, upload_chunks
+
+
+class StandInCursor:
+    """Cursor that only understands the applied-chunks bookkeeping statements."""
+
+    def __init__(self, server):
+        self.server = server
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        if sql.startswith('SELECT 1'):
+            self.result = (1,) if params[0] in self.server.applied else None
+        elif sql.startswith('INSERT'):
+            self.server.pending_applied.append(params[0])
+
+    def fetchone(self):
+        return self.result
+
+
+class StandInServer:
+    """Server that keeps uploaded rows and applied chunk ids, honouring commit and rollback."""
+
+    def __init__(self, fail_on_upload=None):
+        self.rows, self.pending_rows = [], []
+        self.applied, self.pending_applied = set(), []
+        self.uploads = 0
+        self.fail_on_upload = fail_on_upload
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def upload(self, conn, table_name, columns, rows_factory, conflict_key=None):
+        self.uploads += 1
+        if self.uploads == self.fail_on_upload:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.pending_rows.extend(rows_factory())
+
+    def commit(self):
+        self.rows.extend(self.pending_rows)
+        self.applied.update(self.pending_applied)
+        self.pending_rows, self.pending_applied = [], []
+
+    def rollback(self):
+        self.pending_rows, self.pending_applied = [], []
+
+
+class TestChunkTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.chunk_dir = os.path.join(self.tmpdir.name, 'chunks')
+        self.local = sqlite3.connect(':memory:')
+        self.local.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, clock_out TIMESTAMP, synced BOOLEAN)")
+        self.local.executemany("INSERT INTO clock_in_out (employee_id, clock_out, synced) VALUES (?, ?, 0)",
+                               [(i, None if i % 3 else '2024-01-01T17:00:00') for i in range(25)])
+        self.local.commit()
+
+    def tearDown(self):
+        self.local.close()
+        self.tmpdir.cleanup()
+
+    def pending(self):
+        return self.local.execute("SELECT COUNT(*) FROM clock_in_out").fetchone()[0]
+
+    def test_chunk_round_trip(self):
+        """Encoded chunks decode to the same rows and reject tampered payloads."""
+        rows = [(1, 7, None, 0), (2, 8, '2024-01-01T17:00:00', 0)]
+        payload, checksum = encode_chunk('clock_in_out', ['id', 'employee_id', 'clock_out', 'synced'], rows)
+
+        self.assertEqual(decode_chunk(payload, checksum)[2], rows)
+        with self.assertRaises(ValueError):
+            decode_chunk(payload[:20] + bytes([payload[20] ^ 1]) + payload[21:], checksum)
+
+    def test_export_is_incremental(self):
+        """Exporting twice only writes chunks for rows added in between."""
+        self.assertEqual(export_chunks(self.local, 'clock_in_out', self.chunk_dir, chunk_rows=10), 3)
+        self.local.execute("INSERT INTO clock_in_out (employee_id, synced) VALUES (99, 0)")
+
+        self.assertEqual(export_chunks(self.local, 'clock_in_out', self.chunk_dir, chunk_rows=10), 1)
+        self.assertEqual(sum(chunk['rows'] for chunk in load_manifest(self.chunk_dir)['chunks']), 26)
+
+    def test_interrupted_upload_resumes_at_failed_chunk(self):
+        """After a dropped connection only the chunks not yet applied are sent again."""
+        export_chunks(self.local, 'clock_in_out', self.chunk_dir, chunk_rows=10)
+        server = StandInServer(fail_on_upload=2)
+
+        with mock.patch.object(chunk_transport, 'upload_rows', server.upload):
+            with self.assertRaises(psycopg2.OperationalError):
+                upload_chunks(server, self.local, self.chunk_dir)
+            self.assertEqual(len(server.rows), 10)
+            self.assertEqual(self.pending(), 15)
+
+            self.assertEqual(upload_chunks(server, self.local, self.chunk_dir), 15)
+
+        self.assertEqual(len(server.rows), 25)
+        self.assertEqual(server.uploads, 4)
+        self.assertEqual(self.pending(), 0)
+        self.assertEqual(load_manifest(self.chunk_dir)['chunks'], [])
+
+    def test_applied_chunk_is_not_uploaded_again(self):
+        """A chunk committed on the server but not acknowledged locally is only acknowledged."""
+        export_chunks(self.local, 'clock_in_out', self.chunk_dir, chunk_rows=25)
+        server = StandInServer()
+        server.applied.add(load_manifest(self.chunk_dir)['chunks'][0]['id'])
+
+        with mock.patch.object(chunk_transport, 'upload_rows', server.upload):
+            upload_chunks(server, self.local, self.chunk_dir)
+
+        self.assertEqual(server.uploads, 0)
+        self.assertEqual(self.pending(), 0)
+
+    def test_corrupt_chunk_is_rebuilt(self):
+        """A damaged chunk file is re-exported from the still pending local rows."""
+        export_chunks(self.local, 'clock_in_out', self.chunk_dir, chunk_rows=25)
+        chunk = load_manifest(self.chunk_dir)['chunks'][0]
+        with open(os.path.join(self.chunk_dir, chunk['file']), 'wb') as f:
+            f.write(b'garbage')
+        server = StandInServer()
+
+        with mock.patch.object(chunk_transport, 'upload_rows', server.upload):
+            self.assertEqual(upload_chunks(server, self.local, self.chunk_dir), 25)
+
+        self.assertEqual(len(server.rows), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
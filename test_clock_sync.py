@@ -0,0 +1,124 @@
+import sqlite3
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import psycopg2
+
+import clock_sync
+from clock_sync import SyncRequests, initialize_local_db, sync_local_to_server
+
+
+class RecordingUpload:
+    """Stand-in for execute_values that records each uploaded batch and can fail on one of them."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.batches = []
+
+    def __call__(self, cursor, sql, rows):
+        if len(self.batches) + 1 == self.fail_on:
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.batches.append(list(rows))
+
+
+class TestSyncLocalToServer(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        initialize_local_db(self.conn)
+        self.conn.executemany(
+            "INSERT INTO clock_in_out (employee_id, clock_in, synced) VALUES (?, ?, 0)",
+            [(employee_id, datetime(2024, 1, 1, 8, employee_id)) for employee_id in range(1, 6)]
+        )
+        self.conn.commit()
+
+        self.server = mock.MagicMock()
+        self.server.closed = False
+        self.monitor = mock.MagicMock()
+        self.monitor.is_reachable.return_value = True
+        self.patches = [mock.patch.object(clock_sync, 'server_monitor', self.monitor),
+                        mock.patch.object(clock_sync, 'connect_server', return_value=self.server),
+                        mock.patch.object(clock_sync, 'ensure_server_uid_column'),
+                        mock.patch.object(clock_sync, 'SYNC_BATCH_SIZE', 2)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.conn.close()
+
+    def _pending(self):
+        return [row[0] for row in self.conn.execute("SELECT employee_id FROM clock_in_out ORDER BY id")]
+
+    def test_batches_are_uploaded_and_deleted_locally(self):
+        """Each batch is upserted in its own transaction and then deleted from the local queue."""
+        upload = RecordingUpload()
+        progress = []
+
+        with mock.patch.object(clock_sync, 'execute_values', upload), self.assertLogs('root', 'INFO'):
+            synced = sync_local_to_server(self.conn, progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(synced, 5)
+        self.assertEqual([[row[0] for row in batch] for batch in upload.batches], [[1, 2], [3, 4], [5]])
+        self.assertTrue(all(len(row) == len(clock_sync.SYNC_COLUMNS) for batch in upload.batches for row in batch))
+        self.assertEqual(self.server.commit.call_count, 3)
+        self.assertEqual(progress, [(2, 5), (4, 5), (5, 5)])
+        self.assertEqual(self._pending(), [])
+        self.server.close.assert_called_once()
+        self.monitor.record_success.assert_called_once()
+
+    def test_server_error_rolls_back_and_closes(self):
+        """A failed batch is rolled back, the connection closed, and later rows stay queued."""
+        upload = RecordingUpload(fail_on=2)
+
+        with mock.patch.object(clock_sync, 'execute_values', upload), self.assertLogs('root', 'ERROR'):
+            synced = sync_local_to_server(self.conn)
+
+        self.assertEqual(synced, 2)
+        self.assertEqual(self._pending(), [3, 4, 5])
+        self.server.rollback.assert_called_once()
+        self.server.close.assert_called_once()
+        self.monitor.record_failure.assert_called_once()
+        self.assertFalse(clock_sync.sync_lock.locked())
+
+    def test_skipped_while_another_sync_runs(self):
+        """If the sync lock is held the call returns None at once without connecting."""
+        with clock_sync.sync_lock:
+            self.assertIsNone(sync_local_to_server(self.conn))
+
+        clock_sync.connect_server.assert_not_called()
+        self.assertEqual(len(self._pending()), 5)
+
+    def test_skipped_when_server_unreachable(self):
+        """An unreachable server is not connected to."""
+        self.monitor.is_reachable.return_value = False
+
+        self.assertIsNone(sync_local_to_server(self.conn))
+        clock_sync.connect_server.assert_not_called()
+
+
+class TestSyncRequests(unittest.TestCase):
+
+    def test_triggers_during_a_sync_coalesce(self):
+        """Several triggers while a sync runs start exactly one follow-up sync."""
+        starts = []
+        requests = SyncRequests(lambda: starts.append(len(starts)))
+
+        self.assertTrue(requests.request())
+        self.assertFalse(requests.request())
+        self.assertFalse(requests.request())
+        self.assertEqual(len(starts), 1)
+
+        requests.finished()
+        self.assertEqual(len(starts), 2)
+        self.assertTrue(requests.running)
+
+        requests.finished()
+        self.assertEqual(len(starts), 2)
+        self.assertFalse(requests.running)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from connection_pool import ConnectionPool, PoolTimeout, close_all_pools
+from db_connection import get_connection, get_pool
+
+
+class StandInConnection:
+    """Connection whose health-check query can be made to hang or fail."""
+
+    def __init__(self):
+        self.hang = None
+        self.healthy = True
+        self.closed = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        if self.hang is not None:
+            self.hang.wait(5)
+        if not self.healthy:
+            raise sqlite3.OperationalError('server closed the connection unexpectedly')
+
+    def fetchone(self):
+        return (1,)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'pool_test.db')
+
+    def tearDown(self):
+        close_all_pools()
+        self.tmpdir.cleanup()
+
+    def _pool(self, **options):
+        return ConnectionPool(lambda: sqlite3.connect(self.db_name, check_same_thread=False), **options)
+
+    def test_connection_is_reused(self):
+        """A released connection is handed out again instead of opening a new one."""
+        pool = self._pool(max_size=2)
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+        pool.release(second)
+
+        self.assertIs(first, second)
+        stats = pool.stats()
+        self.assertEqual(stats['creations'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_pool_is_bounded(self):
+        """Checkout blocks once max_size connections are in use and times out."""
+        pool = self._pool(max_size=1, timeout=0.05)
+        conn = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['waits'], 1)
+        pool.release(conn)
+
+    def test_waiter_gets_released_connection(self):
+        """A thread waiting on a full pool receives the next released connection."""
+        pool = self._pool(max_size=1, timeout=5)
+        conn = pool.acquire()
+        result = {}
+
+        def waiter():
+            result['conn'] = pool.acquire()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        pool.release(conn)
+        thread.join(5)
+
+        self.assertIs(result['conn'], conn)
+        self.assertEqual(pool.stats()['creations'], 1)
+
+    def test_idle_connections_expire(self):
+        """Connections idle longer than max_idle_time are closed rather than reused."""
+        pool = self._pool(max_idle_time=0)
+        first = pool.acquire()
+        pool.release(first)
+        second = pool.acquire()
+
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()['discards'], 1)
+
+    def test_health_check_does_not_block_the_pool(self):
+        """While one checkout pings a hung server, other threads can still acquire and release."""
+        pool = ConnectionPool(StandInConnection, max_size=2, health_check_after=0)
+        first, second = pool.acquire(), pool.acquire()
+        second.hang = threading.Event()
+        pool.release(first)
+        pool.release(second)
+
+        thread = threading.Thread(target=pool.acquire)
+        thread.start()
+        while pool.stats()['idle'] == 2:
+            time.sleep(0.001)
+
+        conn = pool.acquire(timeout=1)
+        pool.release(conn)
+        self.assertIs(conn, first)
+        self.assertTrue(thread.is_alive())
+        second.hang.set()
+        thread.join(5)
+
+    def test_unhealthy_connection_is_replaced(self):
+        """A connection that fails its health check is closed and a new one is opened."""
+        pool = ConnectionPool(StandInConnection, max_size=1, health_check_after=0)
+        broken = pool.acquire()
+        broken.healthy = False
+        pool.release(broken)
+
+        conn = pool.acquire()
+
+        self.assertIsNot(conn, broken)
+        self.assertEqual(broken.closed, 1)
+        stats = pool.stats()
+        self.assertEqual((stats['discards'], stats['creations'], stats['size']), (1, 2, 1))
+
+    def test_get_connection_uses_pool(self):
+        """get_connection transparently checks connections in and out of a shared pool."""
+        with get_connection('sqlite', self.db_name) as (conn, cursor):
+            cursor.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+            cursor.execute("INSERT INTO t (name) VALUES ('a')")
+            conn.commit()
+        with get_connection('sqlite', self.db_name) as (conn, cursor):
+            cursor.execute("SELECT COUNT(*) FROM t")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        stats = get_pool('sqlite', self.db_name).stats()
+        self.assertEqual(stats['creations'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+from connectivity import CLOSED, HALF_OPEN, OPEN, ConnectivityMonitor
+
+
+class TestConnectivityMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('connectivity.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.monitor = ConnectivityMonitor({'host': 'server'}, ttl=5, failure_threshold=2, reset_timeout=30)
+
+    def test_successful_probe_is_cached(self):
+        """Within the TTL a reachable server is not probed again."""
+        with mock.patch.object(self.monitor, '_probe', return_value=True) as probe:
+            self.assertTrue(self.monitor.is_reachable())
+            self.now += 4
+            self.assertTrue(self.monitor.is_reachable())
+            self.now += 2
+            self.assertTrue(self.monitor.is_reachable())
+        self.assertEqual(probe.call_count, 2)
+
+    def test_circuit_opens_after_failures(self):
+        """Repeated failures open the circuit and later checks return without probing."""
+        with mock.patch.object(self.monitor, '_probe', return_value=False) as probe:
+            self.assertFalse(self.monitor.is_reachable())
+            self.assertFalse(self.monitor.is_reachable())
+            self.assertEqual(self.monitor.state, OPEN)
+            for _ in range(10):
+                self.assertFalse(self.monitor.is_reachable())
+        self.assertEqual(probe.call_count, 2)
+
+    def test_half_open_trial_closes_circuit(self):
+        """After the reset timeout one trial probe decides whether the circuit closes."""
+        self.monitor.record_failure()
+        self.monitor.record_failure()
+        self.now += 31
+
+        with mock.patch.object(self.monitor, '_probe', return_value=True):
+            self.assertTrue(self.monitor.is_reachable())
+        self.assertEqual(self.monitor.state, CLOSED)
+
+    def test_failed_trial_reopens_circuit(self):
+        """A failing half-open probe re-opens the circuit for another reset period."""
+        self.monitor.record_failure()
+        self.monitor.record_failure()
+        self.now += 31
+
+        with mock.patch.object(self.monitor, '_probe', return_value=False) as probe:
+            self.assertFalse(self.monitor.is_reachable())
+            self.assertEqual(self.monitor.state, OPEN)
+            self.now += 10
+            self.assertFalse(self.monitor.is_reachable())
+        self.assertEqual(probe.call_count, 1)
+
+    def test_reported_failure_skips_cache(self):
+        """A failed write reported by a caller forces the next check to probe."""
+        with mock.patch.object(self.monitor, '_probe', return_value=True) as probe:
+            self.monitor.is_reachable()
+            self.monitor.record_failure()
+            self.assertEqual(self.monitor.state, CLOSED)
+            self.monitor.is_reachable()
+        self.assertEqual(probe.call_count, 2)
+        self.assertNotEqual(self.monitor.state, HALF_OPEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
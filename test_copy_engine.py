@@ -0,0 +1,155 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import psycopg2
+
+import copy_engine
+from copy_engine import RowStream, upload_rows
+
+
+class StandInCursor:
+    """Cursor of a stand-in server that records what COPY and INSERT would receive."""
+
+    def __init__(self, server):
+        self.server = server
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql, params=None):
+        self.server.statements.append(sql)
+
+    def copy_expert(self, sql, file, size=8192):
+        if self.server.refuse_copy:
+            raise psycopg2.NotSupportedError("COPY is not supported")
+        self.server.copy_sql = sql
+        while True:
+            chunk = file.read(size)
+            if not chunk:
+                break
+            self.server.reads += 1
+            self.server.copy_payload += chunk
+
+    def close(self):
+        pass
+
+
+class StandInServer:
+
+    def __init__(self, refuse_copy=False):
+        self.refuse_copy = refuse_copy
+        self.copy_sql = None
+        self.copy_payload = ''
+        self.statements = []
+        self.reads = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def upsert_sql(server):
+    upsert, = [sql for sql in server.statements if sql.startswith('INSERT INTO "clock_in_out"')]
+    return upsert
+
+
+class TestCopyEngine(unittest.TestCase):
+
+    def test_row_stream_encodes_copy_text(self):
+        """Rows are encoded in COPY text format with NULLs, booleans and escapes."""
+        stream = RowStream([(1, None, True, 'a\tb\\c\n'), (2, datetime(2024, 1, 2, 3, 4, 5), False, 'x')])
+        payload = stream.read()
+
+        self.assertEqual(payload, '1\t\\N\tt\ta\\tb\\\\c\\n\n2\t2024-01-02T03:04:05\tf\tx\n')
+        self.assertEqual(stream.row_count, 2)
+
+    def test_row_stream_is_filled_incrementally(self):
+        """The stream only pulls as many rows as are needed for the requested chunk."""
+        pulled = []
+
+        def rows():
+            for i in range(1000):
+                pulled.append(i)
+                yield (i, 'employee')
+
+        stream = RowStream(rows())
+        first = stream.read(64)
+
+        self.assertEqual(len(first), 64)
+        self.assertLess(len(pulled), 10)
+
+    def test_upload_uses_copy(self):
+        """Tables configured for COPY stream their rows through copy_expert in chunks."""
+        server = StandInServer()
+        rows = [(i, f'2024-01-01 08:00:{i % 60:02d}', None, False) for i in range(5000)]
+
+        with mock.patch.object(copy_engine, 'COPY_READ_SIZE', 1024):
+            sent = upload_rows(server, 'clock_in_out', ['employee_id', 'clock_in', 'clock_out', 'synced'],
+                               lambda: iter(rows), engine='copy')
+
+        self.assertEqual(sent, 5000)
+        self.assertIn('COPY "clock_in_out"', server.copy_sql)
+        self.assertGreater(server.reads, 1)
+        self.assertEqual(server.copy_payload.count('\n'), 5000)
+
+    def test_upload_falls_back_to_insert(self):
+        """When the server refuses COPY the same rows are replayed through execute_values."""
+        server = StandInServer(refuse_copy=True)
+        rows = [(1, 'a'), (2, 'b')]
+
+        with mock.patch.object(copy_engine, 'execute_values') as execute_values:
+            sent = upload_rows(server, 'employees', ['id', 'name'], lambda: iter(rows), engine='copy')
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(execute_values.call_args[0][2], rows)
+        # Only the failed COPY is undone, not the caller's transaction
+        self.assertEqual(server.rollbacks, 0)
+        self.assertEqual(server.statements, ['SAVEPOINT copy_upload', 'ROLLBACK TO SAVEPOINT copy_upload'])
+
+    def test_copy_upserts_through_staging_table(self):
+        """With a conflict key, COPY fills a staging table that is upserted into the target."""
+        server = StandInServer()
+        rows = [(7, '2024-01-01 08:00:00', 'a' * 32), (8, '2024-01-01 09:00:00', 'b' * 32)]
+
+        sent = upload_rows(server, 'clock_in_out', ['employee_id', 'clock_in', 'uid'],
+                           lambda: iter(rows), engine='copy', conflict_key='uid')
+
+        self.assertEqual(sent, 2)
+        create, = [sql for sql in server.statements if sql.startswith('CREATE TEMP TABLE')]
+        stage = create.split('"')[1]
+        self.assertTrue(stage.startswith('_stage_clock_in_out_'))
+        # The stage has only the uploaded columns, so the server's NOT NULL serial id is not part of it
+        self.assertIn(f'"{stage}" AS SELECT "employee_id", "clock_in", "uid" FROM "clock_in_out" WITH NO DATA', create)
+        self.assertIn(f'COPY "{stage}" ("employee_id", "clock_in", "uid")', server.copy_sql)
+        self.assertIn(f'SELECT "employee_id", "clock_in", "uid" FROM "{stage}"', upsert_sql(server))
+        self.assertEqual(server.statements[-1], 'RELEASE SAVEPOINT copy_upload')
+        upsert = [sql for sql in server.statements if sql.startswith('INSERT INTO "clock_in_out"')]
+        self.assertEqual(len(upsert), 1)
+        self.assertIn('ON CONFLICT ("uid") DO UPDATE SET "employee_id" = EXCLUDED."employee_id"', upsert[0])
+        self.assertNotIn('"uid" = EXCLUDED', upsert[0])
+
+    def test_insert_upserts_on_conflict_key(self):
+        """The INSERT engine appends the ON CONFLICT clause to the execute_values statement."""
+        server = StandInServer()
+
+        with mock.patch.object(copy_engine, 'execute_values') as execute_values:
+            upload_rows(server, 'employees', ['uid', 'name'], lambda: iter([('u1', 'a')]), conflict_key='uid')
+
+        self.assertTrue(execute_values.call_args[0][1].endswith(
+            'VALUES %s ON CONFLICT ("uid") DO UPDATE SET "name" = EXCLUDED."name"'))
+
+    def test_engine_is_selected_per_table(self):
+        """Tables default to INSERT unless configured otherwise."""
+        self.assertEqual(copy_engine.engine_for('clock_in_out'), 'copy')
+        self.assertEqual(copy_engine.engine_for('employees'), 'insert')
+
+
+if __name__ == '__main__':
+    unittest.main()
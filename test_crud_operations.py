@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+
+from connection_pool import close_all_pools
+from crud_operations import get_all, get_paginated, iter_rows, store_many
+from db_connection import get_connection, get_pool
+
+
+class CrudTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'crud_test.db')
+        with get_connection('sqlite', self.db_name) as (conn, cursor):
+            cursor.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, rank INTEGER)")
+            conn.commit()
+
+    def tearDown(self):
+        close_all_pools()
+        self.tmpdir.cleanup()
+
+    def _fill(self, count):
+        rows = [{'id': i, 'name': f'item{i}', 'rank': count - i} for i in range(1, count + 1)]
+        store_many('items', rows, db_name=self.db_name)
+
+    def _in_use(self):
+        return get_pool('sqlite', self.db_name).stats()['in_use']
+
+
+class TestStoreMany(CrudTestCase):
+
+    def test_rows_are_stored_across_chunks(self):
+        """Rows from a generator are inserted in chunks and counted, including a short last chunk."""
+        rows = ({'id': i, 'name': f'item{i}', 'rank': i} for i in range(1, 8))
+
+        self.assertEqual(store_many('items', rows, chunk_size=3, db_name=self.db_name), 7)
+        self.assertEqual([row[0] for row in get_all('items', db_name=self.db_name)], list(range(1, 8)))
+
+    def test_mismatched_row_stops_at_its_chunk(self):
+        """A row with different columns raises ValueError; earlier chunks stay committed."""
+        rows = [{'id': 1, 'name': 'a', 'rank': 1}, {'id': 2, 'name': 'b', 'rank': 2},
+                {'id': 3, 'name': 'c', 'rank': 3}, {'id': 4, 'name': 'd'}]
+
+        with self.assertRaises(ValueError):
+            store_many('items', rows, chunk_size=2, db_name=self.db_name)
+
+        self.assertEqual([row[0] for row in get_all('items', db_name=self.db_name)], [1, 2])
+        self.assertEqual(self._in_use(), 0)
+
+    def test_row_with_other_keys_is_rejected(self):
+        """A row with as many keys as the first but different ones raises ValueError, not KeyError."""
+        rows = [{'id': 1, 'name': 'a', 'rank': 1}, {'id': 2, 'name': 'b', 'position': 2}]
+
+        with self.assertRaises(ValueError):
+            store_many('items', rows, db_name=self.db_name)
+
+        self.assertEqual(get_all('items', db_name=self.db_name), [])
+
+    def test_empty_input(self):
+        """Nothing to insert stores nothing."""
+        self.assertEqual(store_many('items', [], db_name=self.db_name), 0)
+
+
+class TestKeysetPagination(CrudTestCase):
+
+    def test_pages_cover_every_row_once(self):
+        """Following the last key of each page visits every row exactly once, ending on an empty page."""
+        self._fill(7)
+        seen, after = [], 0
+        while True:
+            page = get_paginated('items', limit=3, db_name=self.db_name, after=after)
+            if not page:
+                break
+            seen.extend(row[0] for row in page)
+            after = page[-1][0]
+
+        self.assertEqual(seen, list(range(1, 8)))
+
+    def test_after_last_key_is_empty(self):
+        """A key at or past the end returns no rows rather than wrapping around."""
+        self._fill(3)
+        self.assertEqual(get_paginated('items', limit=3, db_name=self.db_name, after=3), [])
+
+    def test_order_by_other_column(self):
+        """The keyset seeks on the requested column, not on id."""
+        self._fill(5)
+        page = get_paginated('items', limit=2, db_name=self.db_name, after=2, order_by='rank')
+        self.assertEqual([row[2] for row in page], [3, 4])
+
+    def test_unknown_order_column_is_rejected(self):
+        """An order_by that is not a column of the table raises before it reaches the query."""
+        self._fill(1)
+        with self.assertRaises(ValueError):
+            get_paginated('items', db_name=self.db_name, after=0, order_by='id; DROP TABLE items')
+
+
+class TestIterRows(CrudTestCase):
+
+    def test_exact_multiple_of_chunk(self):
+        """A table whose size is a multiple of the chunk is read completely, without duplicates."""
+        self._fill(6)
+        self.assertEqual([row[0] for row in iter_rows('items', chunk=3, db_name=self.db_name)], list(range(1, 7)))
+
+    def test_after_and_order_by(self):
+        """Iteration starts past `after` on the `order_by` column and follows its order."""
+        self._fill(5)
+        rows = list(iter_rows('items', order_by='rank', after=1, chunk=2, db_name=self.db_name))
+        self.assertEqual([row[2] for row in rows], [2, 3, 4])
+
+    def test_abandoned_iterator_holds_no_connection(self):
+        """Stopping part-way through leaves no connection checked out of the pool."""
+        self._fill(5)
+        rows = iter_rows('items', chunk=2, db_name=self.db_name)
+        self.assertEqual(next(rows)[0], 1)
+        self.assertEqual(self._in_use(), 0)
+
+    def test_unknown_order_column_is_rejected(self):
+        """An order_by that is not a column of the table raises ValueError."""
+        self._fill(1)
+        with self.assertRaises(ValueError):
+            list(iter_rows('items', order_by='missing', db_name=self.db_name))
+        self.assertEqual(self._in_use(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import db_connection
+from connection_pool import close_all_pools
+from db_connection import configure_sqlite, connect_sqlite, get_connection
+
+
+class TestSqliteProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'profile_test.db')
+
+    def tearDown(self):
+        close_all_pools()
+        self.tmpdir.cleanup()
+
+    def _pragma(self, conn, name):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_profile_is_applied(self):
+        """New connections run in WAL mode with the configured lock timeout and sync level."""
+        conn = connect_sqlite(self.db_name)
+        try:
+            self.assertEqual(self._pragma(conn, 'journal_mode'), 'wal')
+            self.assertEqual(self._pragma(conn, 'busy_timeout'), 5000)
+            self.assertEqual(self._pragma(conn, 'synchronous'), 1)  # NORMAL
+            self.assertEqual(self._pragma(conn, 'temp_store'), 2)   # MEMORY
+        finally:
+            conn.close()
+
+    def test_profile_override(self):
+        """An explicit profile replaces the shared one for that connection only."""
+        conn = connect_sqlite(self.db_name, profile={'busy_timeout': 100})
+        try:
+            self.assertEqual(self._pragma(conn, 'busy_timeout'), 100)
+            self.assertEqual(self._pragma(conn, 'journal_mode'), 'delete')
+        finally:
+            conn.close()
+
+    def test_configure_sqlite_changes_later_connections(self):
+        """configure_sqlite updates the profile used by connections opened afterwards."""
+        with mock.patch.dict(db_connection.SQLITE_PROFILE):
+            configure_sqlite(busy_timeout=250)
+            conn = connect_sqlite(self.db_name)
+            try:
+                self.assertEqual(self._pragma(conn, 'busy_timeout'), 250)
+            finally:
+                conn.close()
+        self.assertEqual(db_connection.SQLITE_PROFILE['busy_timeout'], 5000)
+
+    def test_pooled_connections_use_profile(self):
+        """Connections handed out by get_connection are opened with the profile."""
+        with get_connection('sqlite', self.db_name) as (conn, cursor):
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+
+if __name__ == '__main__':
+    unittest.main()
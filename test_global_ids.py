@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import global_ids
+from global_ids import UID_COLUMN, ensure_server_uid_column, ensure_uid_column, new_uid
+
+
+class TestGlobalIds(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, synced BOOLEAN DEFAULT 0)")
+        self.conn.executemany("INSERT INTO clock_in_out (employee_id) VALUES (?)", [(1,), (2,)])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def uids(self):
+        return [row[0] for row in self.conn.execute(f"SELECT {UID_COLUMN} FROM clock_in_out ORDER BY id")]
+
+    def test_new_uid_is_unique(self):
+        """Generated ids are 32 hex characters and do not repeat."""
+        uids = {new_uid() for _ in range(1000)}
+        self.assertEqual(len(uids), 1000)
+        self.assertTrue(all(len(uid) == 32 for uid in uids))
+
+    def test_existing_rows_are_backfilled(self):
+        """Adding the column gives every existing row its own uid, and is safe to repeat."""
+        ensure_uid_column(self.conn, 'clock_in_out')
+        first = self.uids()
+        ensure_uid_column(self.conn, 'clock_in_out')
+
+        self.assertEqual(self.uids(), first)
+        self.assertEqual(len(set(first)), 2)
+        self.assertNotIn(None, first)
+
+    def test_rows_inserted_without_uid_get_one(self):
+        """Writers that do not know about the column still produce rows with a uid."""
+        ensure_uid_column(self.conn, 'clock_in_out')
+        self.conn.execute("INSERT INTO clock_in_out (employee_id) VALUES (3)")
+        self.conn.execute(f"INSERT INTO clock_in_out (employee_id, {UID_COLUMN}) VALUES (4, 'given')")
+
+        uids = self.uids()
+        self.assertNotIn(None, uids)
+        self.assertEqual(uids[-1], 'given')
+
+    def test_uid_is_unique(self):
+        """The column is backed by a unique index."""
+        ensure_uid_column(self.conn, 'clock_in_out')
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute(f"INSERT INTO clock_in_out (employee_id, {UID_COLUMN}) VALUES (5, ?)", (self.uids()[0],))
+
+
+class TestSetupIsRemembered(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'ids.db'))
+        self.conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER)")
+        self.conn.commit()
+        self.statements = []
+        self.conn.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def test_local_setup_runs_once_per_schema_version(self):
+        """Repeated calls only read the schema version until the schema changes."""
+        ensure_uid_column(self.conn, 'clock_in_out')
+        self.statements.clear()
+
+        ensure_uid_column(self.conn, 'clock_in_out')
+        self.assertEqual(self.statements, ['PRAGMA database_list', 'PRAGMA schema_version'])
+
+        self.conn.execute("CREATE TABLE other (id INTEGER PRIMARY KEY)")
+        self.statements.clear()
+        ensure_uid_column(self.conn, 'clock_in_out')
+        self.assertTrue(any(sql.startswith('UPDATE clock_in_out') for sql in self.statements))
+
+    def _server(self, *catalog_rows):
+        server = mock.MagicMock()
+        server.dsn = f'dbname=test-{id(server)}'
+        cursor = server.cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = list(catalog_rows)
+        return server, cursor
+
+    def _ddl(self, cursor):
+        return [call.args[0] for call in cursor.execute.call_args_list if not call.args[0].startswith('SELECT')]
+
+    def test_prepared_server_table_gets_no_ddl(self):
+        """A server table that already has the column and unique index is only looked up, once per process."""
+        server, cursor = self._server((1,), (1,))
+
+        ensure_server_uid_column(server, 'clock_in_out')
+        ensure_server_uid_column(server, 'clock_in_out')
+
+        self.assertEqual(self._ddl(cursor), [])
+        self.assertEqual(cursor.execute.call_count, 2)
+
+    def test_missing_server_column_is_added(self):
+        """Without the column the ALTER TABLE and unique index are issued."""
+        server, cursor = self._server(None)
+
+        with self.assertLogs('root', 'INFO'):
+            ensure_server_uid_column(server, 'clock_in_out')
+
+        ddl = self._ddl(cursor)
+        self.assertEqual(len(ddl), 2)
+        self.assertIn('ADD COLUMN IF NOT EXISTS "uid"', ddl[0])
+        self.assertIn((server.dsn, 'clock_in_out'), global_ids._server_tables_ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import outbox
+from outbox import CHANGELOG_TABLE, get_high_water_mark, install_outbox, sync_changes
+from sync_ack import acknowledge_rows
+
+
+class StandInCursor:
+
+    def __init__(self, server):
+        self.server = server
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.server.statements.append((sql, params))
+
+
+class StandInServer:
+    """Records the upserts and deletes a change-log batch would send."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.statements = []
+        self.upserted = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def execute_values(self, cursor, sql, rows, page_size=100):
+        if self.fail:
+            raise RuntimeError("server rejected the batch")
+        self.upserted.extend(rows)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'local.db'))
+        self.conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, synced BOOLEAN, uid TEXT)")
+        self.conn.execute("INSERT INTO clock_in_out (employee_id, synced, uid) VALUES (1, 0, 'a')")
+        self.conn.execute("INSERT INTO clock_in_out (employee_id, synced, uid) VALUES (2, 1, 'b')")
+        self.conn.commit()
+        install_outbox(self.conn, 'clock_in_out', key_column='uid', ignore_columns=('synced', 'id'))
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _events(self):
+        return self.conn.execute(f"SELECT row_key, op FROM {CHANGELOG_TABLE} ORDER BY seq").fetchall()
+
+    def _sync(self, server):
+        with mock.patch.object(outbox, 'execute_values', server.execute_values):
+            return sync_changes(self.conn, server, 'clock_in_out', key_column='uid', ignore_columns=('synced', 'id'))
+
+    def test_install_queues_pending_rows(self):
+        """Rows pending before the outbox existed are queued once; synced rows are not."""
+        install_outbox(self.conn, 'clock_in_out', key_column='uid', ignore_columns=('synced', 'id'))
+
+        self.assertEqual(self._events(), [('a', 'I')])
+
+    def test_triggers_log_inserts_updates_and_deletes(self):
+        """Inserts, tracked updates and user deletes are logged; acknowledgement flags are not."""
+        self.conn.execute("INSERT INTO clock_in_out (employee_id, synced, uid) VALUES (3, 0, 'c')")
+        self.conn.execute("UPDATE clock_in_out SET employee_id = 4 WHERE uid = 'c'")
+        self.conn.execute("UPDATE clock_in_out SET synced = 1 WHERE uid = 'c'")
+        self.conn.execute("DELETE FROM clock_in_out WHERE uid = 'b'")
+        self.conn.commit()
+
+        self.assertEqual(self._events(), [('a', 'I'), ('c', 'I'), ('c', 'U'), ('b', 'D')])
+
+    def test_acknowledgement_purge_is_not_logged(self):
+        """Deleting uploaded rows through acknowledge_rows does not queue server deletes."""
+        for uid in ('c', 'd', 'e'):
+            self.conn.execute("INSERT INTO clock_in_out (employee_id, synced, uid) VALUES (5, 0, ?)", (uid,))
+        self.conn.commit()
+        ids = [row[0] for row in self.conn.execute("SELECT id FROM clock_in_out WHERE employee_id = 5")]
+
+        acknowledge_rows(self.conn, 'clock_in_out', ids, action='delete')
+
+        self.assertNotIn('D', [op for _, op in self._events()])
+        self.conn.execute("DELETE FROM clock_in_out WHERE uid = 'a'")
+        self.assertEqual(self._events()[-1], ('a', 'D'))
+
+    def test_sync_changes_collapses_events_and_prunes_the_log(self):
+        """Each row is sent once in its latest state, deletes are applied and the applied events pruned."""
+        self.conn.execute("UPDATE clock_in_out SET employee_id = 7 WHERE uid = 'a'")
+        self.conn.execute("DELETE FROM clock_in_out WHERE uid = 'b'")
+        self.conn.commit()
+        server = StandInServer()
+
+        applied = self._sync(server)
+
+        self.assertEqual(applied, 3)
+        self.assertEqual(server.upserted, [(7, 'a')])
+        self.assertEqual(server.statements, [('DELETE FROM "clock_in_out" WHERE "uid" = ANY(%s)', (['b'],))])
+        self.assertEqual(self._events(), [])
+        self.assertEqual(get_high_water_mark(self.conn, 'clock_in_out'), 3)
+        self.assertEqual(self._sync(server), 0)
+
+    def test_failed_batch_is_kept_for_retry(self):
+        """A batch the server rejects is rolled back and stays in the log."""
+        server = StandInServer(fail=True)
+
+        with self.assertLogs('root', level='ERROR'), self.assertRaises(RuntimeError):
+            self._sync(server)
+
+        self.assertEqual(server.rollbacks, 1)
+        self.assertEqual(self._events(), [('a', 'I')])
+        self.assertEqual(get_high_water_mark(self.conn, 'clock_in_out'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
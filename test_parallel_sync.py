@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import parallel_sync
+from parallel_sync import plan_partitions, sync_partition
+from schema_cache import get_table_schema
+
+
+class StandInServer:
+    """Server connection that counts commits; uploads are captured by upload()."""
+
+    def __init__(self):
+        self.uploaded = []
+        self.commits = 0
+        self.closed = False
+
+    def upload(self, conn, table_name, columns, rows_factory, conflict_key=None):
+        self.uploaded.extend(rows_factory())
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class TestParallelSync(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'local')
+        self.local = sqlite3.connect(f'{self.db_name}.db')
+        self.local.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, clock_in TIMESTAMP, "
+                           "clock_out TIMESTAMP, synced BOOLEAN)")
+        # Ids 1..100 with every tenth row already synced
+        self.local.executemany("INSERT INTO clock_in_out (id, employee_id, synced) VALUES (?, ?, ?)",
+                               [(i, i, int(i % 10 == 0)) for i in range(1, 101)])
+        self.local.commit()
+
+    def tearDown(self):
+        self.local.close()
+        self.tmpdir.cleanup()
+
+    def test_partitions_cover_pending_rows_once(self):
+        """Partitions hold about partition_rows pending rows each and do not overlap."""
+        partitions = plan_partitions(self.local, ['clock_in_out'], partition_rows=25)
+
+        self.assertEqual([(first, last) for _, first, last in partitions], [(1, 27), (28, 55), (56, 83), (84, 99)])
+        covered = sum(self.local.execute("SELECT COUNT(*) FROM clock_in_out WHERE synced = 0 AND id BETWEEN ? AND ?",
+                                         (first, last)).fetchone()[0] for _, first, last in partitions)
+        self.assertEqual(covered, 90)
+
+    def test_partition_is_uploaded_in_batches(self):
+        """A worker uploads only its own range, one transaction per batch, and reports the ids."""
+        server = StandInServer()
+        with mock.patch.object(parallel_sync, 'connect_postgres', return_value=server), \
+                mock.patch.object(parallel_sync, 'upload_rows', server.upload):
+            result = sync_partition(self.db_name, get_table_schema(self.local, 'clock_in_out'), 29, 56, batch_size=10)
+
+        self.assertIsNone(result['error'])
+        self.assertEqual(result['ids'], [i for i in range(29, 57) if i % 10])
+        self.assertEqual(len(server.uploaded), 25)
+        self.assertEqual(server.uploaded[0], (29, None, None, False))
+        self.assertEqual(server.commits, 3)
+        self.assertTrue(server.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
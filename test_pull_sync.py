@@ -0,0 +1,205 @@
+import sqlite3
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import psycopg2
+
+import pull_sync
+from pull_sync import ensure_server_modified_at, get_watermark, pull_changes
+
+COLUMNS = ['id', 'email', 'department', 'modified_at']
+
+
+class StandInServer:
+    """Server connection whose table is a list of rows; pages are served by fetch()."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def rollback(self):
+        pass
+
+    def fetch(self, server_conn, table_name, columns, after, batch_size, modified_column='modified_at', key_column='id'):
+        self.queries.append(after)
+        ordered = sorted(self.rows, key=lambda row: (row[3], row[0]))
+        if after is not None and after[1] is None:
+            since = datetime.fromisoformat(after[0]) if isinstance(after[0], str) else after[0]
+            ordered = [row for row in ordered if row[3] >= since]
+        elif after is not None:
+            ordered = [row for row in ordered if (row[3], row[0]) > after]
+        return ordered[:batch_size]
+
+
+class TestPullSync(unittest.TestCase):
+
+    def setUp(self):
+        self.local = sqlite3.connect(':memory:')
+        self.local.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, email TEXT, department TEXT, modified_at TIMESTAMP)")
+        self.server = StandInServer([
+            (i, f'employee{i}@example.com', 'IT', datetime(2024, 1, 1, 8, i, 0)) for i in range(1, 8)
+        ])
+        patches = [
+            mock.patch.object(pull_sync, 'fetch_server_changes', self.server.fetch),
+            mock.patch.object(pull_sync, '_pull_columns', lambda *args: COLUMNS),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.local.close()
+
+    def local_rows(self):
+        return self.local.execute("SELECT id, department FROM employees ORDER BY id").fetchall()
+
+    def test_initial_pull_copies_all_rows_in_pages(self):
+        """The first pull reads the whole table in keyset pages and stores the watermark."""
+        pulled = pull_changes(self.local, self.server, 'employees', batch_size=3)
+
+        self.assertEqual(pulled, 7)
+        self.assertEqual(len(self.local_rows()), 7)
+        self.assertEqual(self.server.queries[1], (datetime(2024, 1, 1, 8, 3, 0), 3))
+        self.assertEqual(get_watermark(self.local, 'employees'), '2024-01-01T08:07:00')
+
+    def test_next_pull_only_reads_recent_changes(self):
+        """Later pulls start from the watermark (minus the overlap window) instead of the beginning."""
+        pull_changes(self.local, self.server, 'employees')
+        self.server.rows.append((8, 'employee8@example.com', 'HR', datetime(2024, 1, 2, 9, 0, 0)))
+        self.server.queries.clear()
+
+        pulled = pull_changes(self.local, self.server, 'employees')
+
+        # The newest already-pulled row falls inside the overlap window and is read again
+        self.assertEqual(pulled, 2)
+        self.assertEqual(self.server.queries[0], ((datetime(2024, 1, 1, 8, 7, 0) - pull_sync.PULL_OVERLAP).isoformat(), None))
+        self.assertEqual(self.local_rows()[-1], (8, 'HR'))
+
+    def test_last_writer_wins(self):
+        """A newer local edit survives an older server version; an older one is overwritten."""
+        self.local.executemany("INSERT INTO employees VALUES (?, ?, ?, ?)", [
+            (1, 'employee1@example.com', 'Local', '2025-01-01T00:00:00'),
+            (2, 'employee2@example.com', 'Local', '2023-01-01T00:00:00'),
+        ])
+
+        pull_changes(self.local, self.server, 'employees')
+
+        rows = dict(self.local_rows())
+        self.assertEqual(rows[1], 'Local')
+        self.assertEqual(rows[2], 'IT')
+
+    def test_last_writer_wins_with_space_separated_timestamps(self):
+        """Local timestamps written as CURRENT_TIMESTAMP text are compared by time, not by separator."""
+        self.local.executemany("INSERT INTO employees VALUES (?, ?, ?, ?)", [
+            (1, 'employee1@example.com', 'Local', '2024-01-01 09:00:00'),
+            (2, 'employee2@example.com', 'Local', '2024-01-01 08:01:30.500000'),
+        ])
+
+        pull_changes(self.local, self.server, 'employees')
+
+        rows = dict(self.local_rows())
+        self.assertEqual(rows[1], 'Local')
+        self.assertEqual(rows[2], 'IT')
+
+    def test_space_separated_watermark(self):
+        """A space-separated watermark is compared as a time, so re-read overlap rows never move it back."""
+        get_watermark(self.local, 'employees')
+        pull_sync.set_watermark(self.local, 'employees', '2024-01-01 08:07:20')
+
+        self.assertEqual(pull_changes(self.local, self.server, 'employees'), 1)
+        self.assertEqual(get_watermark(self.local, 'employees'), '2024-01-01 08:07:20')
+
+    def test_server_wins(self):
+        """With server_wins the pulled row always replaces the local one."""
+        self.local.execute("INSERT INTO employees VALUES (1, 'employee1@example.com', 'Local', '2025-01-01T00:00:00')")
+
+        pull_changes(self.local, self.server, 'employees', conflict='server_wins')
+
+        self.assertEqual(dict(self.local_rows())[1], 'IT')
+
+
+
+class CatalogServer:
+    """Server connection that answers the catalog lookups from a set of existing objects and records DDL."""
+
+    def __init__(self, present=(), race_on=None):
+        self.present = set(present)
+        self.race_on = race_on
+        self.ddl = []
+        self.commits = 0
+        self._result = None
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        for kind, marker in (('column', 'information_schema.columns'), ('index', 'pg_indexes'), ('trigger', 'pg_trigger')):
+            if marker in sql:
+                self._result = (1,) if kind in self.present else None
+                return
+        self.ddl.append(' '.join(sql.split()[:3]))
+        for kind, marker in (('column', 'ADD COLUMN'), ('index', 'CREATE INDEX'), ('trigger', 'CREATE TRIGGER')):
+            if marker in sql:
+                if kind == self.race_on:
+                    # Another kiosk created it between our lookup and our DDL
+                    self.present.add(kind)
+                    raise psycopg2.ProgrammingError('trigger already exists')
+                self.present.add(kind)
+
+    def fetchone(self):
+        return self._result
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class TestEnsureServerModifiedAt(unittest.TestCase):
+
+    def test_prepared_table_gets_no_ddl(self):
+        """When the column, index and trigger exist, only catalog queries are run."""
+        server = CatalogServer(present={'column', 'index', 'trigger'})
+
+        ensure_server_modified_at(server, 'employees')
+
+        self.assertEqual((server.ddl, server.commits), ([], 0))
+
+    def test_only_missing_objects_are_created(self):
+        """A table that already has the column only gets the index and the trigger."""
+        server = CatalogServer(present={'column'})
+
+        ensure_server_modified_at(server, 'employees')
+
+        self.assertEqual(server.ddl, ['CREATE INDEX IF', 'CREATE OR REPLACE', 'CREATE TRIGGER "employees_touch_modified_at"'])
+        self.assertEqual(server.commits, 1)
+
+    def test_concurrent_creation_is_tolerated(self):
+        """Losing the race to another client that created the trigger is not an error."""
+        server = CatalogServer(present={'column', 'index'}, race_on='trigger')
+
+        ensure_server_modified_at(server, 'employees')
+
+        self.assertEqual(server.commits, 0)
+
+    def test_other_ddl_errors_are_raised(self):
+        """A DDL failure that leaves objects missing is raised."""
+        server = CatalogServer(race_on='trigger')
+        server.execute = mock.Mock(side_effect=[None, None, None, psycopg2.ProgrammingError('permission denied'),
+                                                None, None, None])
+        server.fetchone = mock.Mock(return_value=None)
+
+        with self.assertRaises(psycopg2.ProgrammingError):
+            ensure_server_modified_at(server, 'employees')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from quarantine import quarantine_rows, quarantined_rows, restore_rows
+
+COLUMNS = ['id', 'employee_id', 'clock_in', 'synced', 'uid']
+
+
+class TestQuarantine(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.tmpdir.name, 'local.db'))
+        self.conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, clock_in TIMESTAMP, "
+                          "synced BOOLEAN, uid TEXT)")
+        self.conn.executemany("INSERT INTO clock_in_out VALUES (?, ?, ?, 0, ?)",
+                              [(1, 5, '2024-01-01 08:00:00', 'a'), (2, None, '2024-01-01 09:00:00', 'b')])
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _pending(self):
+        return self.conn.execute("SELECT employee_id, uid FROM clock_in_out WHERE synced = 0 ORDER BY id").fetchall()
+
+    def test_rows_are_moved_out_of_the_pending_set(self):
+        """Quarantined rows are removed from their table and kept with the reason."""
+        row = self.conn.execute("SELECT * FROM clock_in_out WHERE id = 2").fetchone()
+
+        moved = quarantine_rows(self.conn, 'clock_in_out', COLUMNS, [(row, 'NULL in employee_id')])
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(self._pending(), [(5, 'a')])
+        entry, = quarantined_rows(self.conn, 'clock_in_out')
+        self.assertEqual((entry['row_id'], entry['reason']), (2, 'NULL in employee_id'))
+        self.assertEqual(entry['row']['uid'], 'b')
+
+    def test_restore_puts_fixed_rows_back(self):
+        """Restoring a fixed row makes it pending again and empties the quarantine."""
+        row = self.conn.execute("SELECT * FROM clock_in_out WHERE id = 2").fetchone()
+        quarantine_rows(self.conn, 'clock_in_out', COLUMNS, [(row, 'NULL in employee_id')])
+        entry, = quarantined_rows(self.conn)
+
+        self.assertEqual(restore_rows(self.conn, [entry['id']], employee_id=6), 1)
+
+        self.assertEqual(self._pending(), [(5, 'a'), (6, 'b')])
+        self.assertEqual(quarantined_rows(self.conn), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+
+import schema_cache
+from schema_cache import get_table_schema, to_bool, to_timestamp
+
+
+class StandInCursor:
+
+    def __init__(self, server):
+        self.server = server
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params=None):
+        self.server.queries += 1
+
+    def fetchall(self):
+        return list(self.server.types.items())
+
+
+class StandInServer:
+    """Answers information_schema queries with a fixed column -> data_type mapping."""
+
+    def __init__(self, types):
+        self.types = types
+        self.queries = 0
+
+    def cursor(self):
+        return StandInCursor(self)
+
+    def commit(self):
+        pass
+
+
+class TestSchemaCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.local = sqlite3.connect(os.path.join(self.tmpdir.name, 'local.db'))
+        self.local.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, clock_in TIMESTAMP, "
+                           "synced BOOLEAN, uid TEXT)")
+        self.server = StandInServer({'id': 'integer', 'employee_id': 'integer', 'clock_in': 'timestamp without time zone',
+                                     'synced': 'boolean', 'uid': 'text'})
+        schema_cache.invalidate()
+
+    def tearDown(self):
+        self.local.close()
+        self.tmpdir.cleanup()
+
+    def test_rows_are_converted_per_column(self):
+        """Booleans and unix timestamps are converted by column type, and 'id' is dropped."""
+        schema = get_table_schema(self.local, 'clock_in_out', self.server)
+
+        self.assertEqual(schema.upload_columns, ['employee_id', 'clock_in', 'synced', 'uid'])
+        self.assertEqual(schema.convert_rows([(1, 7, '2024-01-01T08:00:00', 0, 'a'), (2, 8, 0, 1, 'b')]),
+                         [(7, '2024-01-01T08:00:00', False, 'a'), (8, datetime.fromtimestamp(0), True, 'b')])
+
+    def test_schema_is_introspected_once(self):
+        """Repeated lookups reuse the cached schema without querying the server again."""
+        first = get_table_schema(self.local, 'clock_in_out', self.server)
+        second = get_table_schema(self.local, 'clock_in_out', self.server)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.server.queries, 1)
+
+    def test_schema_change_invalidates(self):
+        """A local schema change is picked up on the next lookup."""
+        get_table_schema(self.local, 'clock_in_out', self.server)
+        self.local.execute("ALTER TABLE clock_in_out ADD COLUMN clock_out TIMESTAMP")
+        self.server.types['clock_out'] = 'timestamp without time zone'
+
+        schema = get_table_schema(self.local, 'clock_in_out', self.server)
+
+        self.assertIn('clock_out', schema.upload_columns)
+        self.assertEqual(self.server.queries, 2)
+
+    def test_columns_missing_on_server_are_skipped(self):
+        """Local-only columns are not sent to the server."""
+        del self.server.types['uid']
+
+        self.assertNotIn('uid', get_table_schema(self.local, 'clock_in_out', self.server).upload_columns)
+
+    def test_converters(self):
+        """Converters leave NULLs alone and accept the usual boolean spellings."""
+        self.assertIsNone(to_bool(None))
+        self.assertTrue(to_bool('true'))
+        self.assertFalse(to_bool('0'))
+        self.assertIsNone(to_timestamp(None))
+        self.assertEqual(to_timestamp('2024-01-01 08:00:00'), '2024-01-01 08:00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
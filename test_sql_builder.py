@@ -0,0 +1,103 @@
+import unittest
+
+import sql_builder
+from sql_builder import build_prepared, build_sql, execute_prepared
+
+
+class StandInConnection:
+    """Weak-referenceable stand-in for a psycopg2 connection."""
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+
+
+class TestBuildSql(unittest.TestCase):
+
+    def setUp(self):
+        build_sql.cache_clear()
+        build_prepared.cache_clear()
+
+    def test_statements_per_dialect(self):
+        """Each operation uses the dialect's placeholder."""
+        self.assertEqual(build_sql('insert', 'employees', ('first_name', 'email')),
+                         "INSERT INTO employees (first_name, email) VALUES (?, ?)")
+        self.assertEqual(build_sql('update', 'employees', ('email',), 'postgres'),
+                         "UPDATE employees SET email = %s WHERE id = %s")
+        self.assertEqual(build_sql('select', 'employees'), "SELECT * FROM employees")
+        self.assertEqual(build_sql('select', 'employees', ('department', 'is_active'), 'postgres'),
+                         "SELECT * FROM employees WHERE department = %s AND is_active = %s")
+        self.assertEqual(build_sql('delete', 'employees'), "DELETE FROM employees WHERE id = ?")
+
+    def test_cache_key_includes_columns_and_dialect(self):
+        """The same columns hit the cache; other columns, column order or dialect are separate entries."""
+        build_sql('insert', 'employees', ('first_name', 'email'))
+        build_sql('insert', 'employees', ('first_name', 'email'))
+        self.assertEqual(build_sql.cache_info().hits, 1)
+
+        build_sql('insert', 'employees', ('email', 'first_name'))
+        build_sql('insert', 'employees', ('first_name', 'email'), 'postgres')
+        build_sql('insert', 'clock_in_out', ('first_name', 'email'))
+        info = build_sql.cache_info()
+        self.assertEqual((info.hits, info.currsize), (1, 4))
+
+    def test_columns_must_be_hashable(self):
+        """A list of columns cannot be cached and is rejected."""
+        with self.assertRaises(TypeError):
+            build_sql('insert', 'employees', ['first_name'])
+
+    def test_unknown_operation(self):
+        """An unsupported operation raises ValueError."""
+        with self.assertRaises(ValueError):
+            build_sql('upsert', 'employees', ('email',))
+
+
+class TestPreparedStatements(unittest.TestCase):
+
+    def setUp(self):
+        build_sql.cache_clear()
+        build_prepared.cache_clear()
+
+    def test_placeholders_are_numbered(self):
+        """PREPARE gets $n parameters and EXECUTE passes one %s per parameter."""
+        name, prepare_sql, execute_sql = build_prepared('update', 'employees', ('email', 'department'))
+
+        self.assertTrue(name.startswith('update_employees_'))
+        self.assertEqual(prepare_sql, f"PREPARE {name} AS UPDATE employees SET email = $1, department = $2 WHERE id = $3")
+        self.assertEqual(execute_sql, f"EXECUTE {name} (%s, %s, %s)")
+
+    def test_names_differ_by_columns(self):
+        """Statements for different column sets get different names."""
+        self.assertNotEqual(build_prepared('insert', 'employees', ('email',))[0],
+                            build_prepared('insert', 'employees', ('first_name',))[0])
+
+    def test_prepared_once_per_connection(self):
+        """A statement is PREPAREd the first time on each connection and only EXECUTEd afterwards."""
+        first, second = StandInConnection(), StandInConnection()
+        cursor = RecordingCursor()
+
+        execute_prepared(first, cursor, 'insert', 'employees', ['email'], ('a@example.com',))
+        execute_prepared(first, cursor, 'insert', 'employees', ['email'], ('b@example.com',))
+        execute_prepared(second, cursor, 'insert', 'employees', ['email'], ('c@example.com',))
+
+        verbs = [sql.split()[0] for sql, _ in cursor.statements]
+        self.assertEqual(verbs, ['PREPARE', 'EXECUTE', 'EXECUTE', 'PREPARE', 'EXECUTE'])
+        self.assertEqual(cursor.statements[-1][1], ('c@example.com',))
+
+    def test_closed_connection_is_forgotten(self):
+        """Prepared names are dropped with their connection."""
+        before = len(sql_builder._prepared_by_connection)
+        conn = StandInConnection()
+        execute_prepared(conn, RecordingCursor(), 'delete', 'employees', (), (1,))
+        self.assertIn(conn, sql_builder._prepared_by_connection)
+
+        del conn
+        self.assertEqual(len(sql_builder._prepared_by_connection), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import automatedsync
+from sync_ack import acknowledge_rows
+from sync_metrics import MetricsRegistry
+
+
+class TestAcknowledgeRows(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'local')
+        self.conn = sqlite3.connect(f'{self.db_name}.db')
+        self.conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, synced BOOLEAN)")
+        self.conn.executemany("INSERT INTO clock_in_out (id, employee_id, synced) VALUES (?, ?, 0)",
+                              [(i, i) for i in range(1, 11)])
+        self.conn.commit()
+        self.statements = []
+        self.conn.set_trace_callback(self.statements.append)
+
+    def tearDown(self):
+        self.conn.close()
+        self.tmpdir.cleanup()
+
+    def _ids(self, where):
+        return [row[0] for row in self.conn.execute(f"SELECT id FROM clock_in_out WHERE {where} ORDER BY id")]
+
+    def test_contiguous_ids_use_one_range(self):
+        """A contiguous run of ids (in any order, with duplicates) is marked with a single BETWEEN."""
+        marked = acknowledge_rows(self.conn, 'clock_in_out', [4, 2, 3, 3, 5])
+
+        self.assertEqual(marked, 4)
+        self.assertEqual(self._ids('synced = 1'), [2, 3, 4, 5])
+        self.assertTrue(any('BETWEEN' in sql for sql in self.statements))
+        self.assertFalse(any('sync_ack_ids' in sql for sql in self.statements))
+
+    def test_scattered_ids_are_joined_through_temp_table(self):
+        """Ids with gaps are staged in a temporary table and deleted with one join."""
+        deleted = acknowledge_rows(self.conn, 'clock_in_out', [1, 5, 9], action='delete')
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(self._ids('1 = 1'), [2, 3, 4, 6, 7, 8, 10])
+        self.assertTrue(any('IN (SELECT id FROM sync_ack_ids)' in sql for sql in self.statements))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM sync_ack_ids").fetchone()[0], 0)
+
+    def test_commit_can_be_left_to_the_caller(self):
+        """With commit=False the acknowledgement stays in the caller's open transaction."""
+        acknowledge_rows(self.conn, 'clock_in_out', [1, 2], commit=False)
+        self.conn.rollback()
+
+        self.assertEqual(self._ids('synced = 1'), [])
+
+    def test_empty_and_invalid_requests(self):
+        """No ids is a no-op; an unknown action is refused."""
+        self.assertEqual(acknowledge_rows(self.conn, 'clock_in_out', []), 0)
+        with self.assertRaises(ValueError):
+            acknowledge_rows(self.conn, 'clock_in_out', [1], action='archive')
+
+
+class TestFailedAcknowledgement(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.tmpdir.name, 'local')
+        conn = sqlite3.connect(f'{self.db_name}.db')
+        conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, synced BOOLEAN)")
+        conn.execute("INSERT INTO clock_in_out (employee_id, synced) VALUES (1, 0)")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_sync_does_not_report_unacknowledged_rows(self):
+        """If the local delete fails, the batch is counted as an error rather than as synced rows."""
+        registry = MetricsRegistry()
+        server = mock.MagicMock()
+        server.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+            ('employee_id', 'integer'), ('synced', 'boolean'), ('uid', 'text')]
+
+        with mock.patch.object(automatedsync, 'metrics', registry), \
+                mock.patch.object(automatedsync, 'connect_postgres', return_value=server), \
+                mock.patch.object(automatedsync, 'upload_rows'), \
+                mock.patch.object(automatedsync, 'acknowledge_rows', side_effect=sqlite3.OperationalError('locked')), \
+                self.assertLogs('root', 'ERROR'):
+            automatedsync.sync_data_to_postgres(self.db_name, 'clock_in_out')
+
+        counters = registry.snapshot()['counter']
+        self.assertNotIn('sync_rows_total', counters)
+        self.assertEqual(counters['sync_errors_total'][0]['value'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import sync_daemon
+from sync_daemon import ServerBackoff, parse_tables, run_daemon, run_table
+
+
+class ScriptedDrain:
+    """Stand-in for drain_data_to_postgres returning scripted results per table, then stopping the daemon."""
+
+    def __init__(self, results, stop_after):
+        self.results = results
+        self.stop_after = stop_after
+        self.calls = {table_name: 0 for table_name in results}
+        self.stop = None
+
+    def __call__(self, db_name, table_name, batch_size):
+        script = self.results[table_name]
+        result = script[min(self.calls[table_name], len(script) - 1)]
+        self.calls[table_name] += 1
+        if sum(self.calls.values()) >= self.stop_after:
+            self.stop()
+        return result
+
+
+class TestServerBackoff(unittest.TestCase):
+
+    def test_delay_doubles_up_to_the_cap_and_resets(self):
+        """Each failure doubles the wait up to max_delay; a success clears it."""
+        backoff = ServerBackoff(base_delay=10, max_delay=30, name='clock_in_out')
+        delays = []
+        with mock.patch.object(sync_daemon.random, 'uniform', return_value=1.0), \
+                mock.patch.object(sync_daemon.time, 'monotonic', return_value=100.0), \
+                self.assertLogs('root', 'WARNING'):
+            for _ in range(3):
+                backoff.record_failure()
+                delays.append(backoff.remaining())
+
+        self.assertEqual(delays, [10, 20, 30])
+        backoff.record_success()
+        self.assertEqual((backoff.failures, backoff.remaining()), (0, 0.0))
+
+    def test_parse_tables(self):
+        """Tables take the default interval unless they name their own."""
+        self.assertEqual(parse_tables(['clock_in_out', 'employees:60'], 10), {'clock_in_out': 10, 'employees': 60.0})
+
+
+class TestRunDaemon(unittest.TestCase):
+
+    def _run(self, coroutine_factory, drain):
+        async def main():
+            stop_event = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            drain.stop = lambda: loop.call_soon_threadsafe(stop_event.set)
+            await coroutine_factory(stop_event)
+
+        with mock.patch.object(sync_daemon, 'drain_data_to_postgres', drain):
+            asyncio.run(asyncio.wait_for(main(), 5))
+
+    def test_table_backs_off_and_recovers(self):
+        """Unreachable passes escalate the table's backoff; the next successful pass resets it."""
+        drain = ScriptedDrain({'clock_in_out': [None, None, 5]}, stop_after=3)
+        backoff = ServerBackoff(base_delay=0.001, name='clock_in_out')
+
+        with ThreadPoolExecutor(max_workers=1) as executor, self.assertLogs('root', 'WARNING') as log:
+            self._run(lambda stop: run_table('db', 'clock_in_out', 0.001, 100, executor, backoff, stop), drain)
+
+        self.assertEqual(drain.calls['clock_in_out'], 3)
+        self.assertEqual(len([line for line in log.output if 'unreachable' in line]), 2)
+        self.assertEqual(backoff.failures, 0)
+
+    def test_each_table_has_its_own_backoff(self):
+        """A failing table does not escalate or reset another table's backoff."""
+        drain = ScriptedDrain({'clock_in_out': [None], 'employees': [1]}, stop_after=8)
+        backoffs = []
+
+        class RecordingBackoff(ServerBackoff):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                backoffs.append(self)
+
+        with mock.patch.object(sync_daemon, 'ServerBackoff', RecordingBackoff), self.assertLogs('root', 'WARNING'):
+            self._run(lambda stop: run_daemon('db', {'clock_in_out': 0.001, 'employees': 0.001}, 2, 100, stop), drain)
+
+        by_table = {backoff.name: backoff for backoff in backoffs}
+        self.assertEqual(set(by_table), {'clock_in_out', 'employees'})
+        self.assertEqual(by_table['employees'].failures, 0)
+        self.assertEqual(by_table['clock_in_out'].failures, drain.calls['clock_in_out'])
+
+
+if __name__ == '__main__':
+    unittest.main()
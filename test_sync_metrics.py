@@ -0,0 +1,148 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import automatedsync
+import sync_metrics
+from sync_metrics import JsonExporter, MetricsRegistry, PrometheusTextExporter
+
+
+class TestSyncMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_counters_and_gauges_are_labelled(self):
+        """Counters accumulate per label set and gauges keep the last value."""
+        self.registry.inc('sync_rows_total', 10, table='clock_in_out')
+        self.registry.inc('sync_rows_total', 5, table='clock_in_out')
+        self.registry.inc('sync_rows_total', 1, table='employees')
+        self.registry.set_gauge('sync_backlog_rows', 40, table='clock_in_out')
+        self.registry.set_gauge('sync_backlog_rows', 25, table='clock_in_out')
+
+        snapshot = self.registry.snapshot()
+        rows = {item['labels']['table']: item['value'] for item in snapshot['counter']['sync_rows_total']}
+        self.assertEqual(rows, {'clock_in_out': 15, 'employees': 1})
+        self.assertEqual(snapshot['gauge']['sync_backlog_rows'][0]['value'], 25)
+
+    def test_stage_timer_fills_histogram(self):
+        """Each timed stage lands in a cumulative latency histogram."""
+        for _ in range(3):
+            with self.registry.stage('upload', 'clock_in_out'):
+                pass
+
+        histogram = self.registry.snapshot()['histogram']['sync_stage_seconds'][0]
+        self.assertEqual(histogram['labels'], {'stage': 'upload', 'table': 'clock_in_out'})
+        self.assertEqual(histogram['value']['count'], 3)
+        self.assertEqual(list(histogram['value']['buckets'].values())[-1], 3)
+
+    def test_prometheus_text_format(self):
+        """The Prometheus exporter writes TYPE lines, escaped labels and histogram series."""
+        self.registry.inc('sync_errors_total', table='a"b')
+        self.registry.observe('sync_batch_seconds', 0.02, table='clock_in_out')
+        path = os.path.join(self.tmpdir.name, 'sync.prom')
+
+        PrometheusTextExporter(path).export(self.registry.snapshot())
+
+        with open(path) as f:
+            text = f.read()
+        self.assertIn('# TYPE sync_errors_total counter\nsync_errors_total{table="a\\"b"} 1\n', text)
+        self.assertIn('sync_batch_seconds_bucket{table="clock_in_out",le="0.01"} 0\n', text)
+        self.assertIn('sync_batch_seconds_bucket{table="clock_in_out",le="0.025"} 1\n', text)
+        self.assertIn('sync_batch_seconds_count{table="clock_in_out"} 1\n', text)
+
+    def test_json_export(self):
+        """The JSON exporter writes the whole snapshot."""
+        self.registry.inc('sync_batches_total', table='clock_in_out')
+        path = os.path.join(self.tmpdir.name, 'sync.json')
+
+        JsonExporter(path).export(self.registry.snapshot())
+
+        with open(path) as f:
+            report = json.load(f)
+        self.assertEqual(report['counter']['sync_batches_total'][0]['value'], 1)
+        self.assertIn('exported_at', report)
+
+
+class TestMetricsExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'sync.json')
+        # automatedsync records into the same fresh registry that export_metrics writes
+        registry = MetricsRegistry()
+        self.patches = [mock.patch.object(sync_metrics, '_exporters', []),
+                        mock.patch.object(sync_metrics, 'REGISTRY', registry),
+                        mock.patch.object(automatedsync, 'metrics', registry),
+                        mock.patch.dict(os.environ, {'SYNC_METRICS_FILE': self.path})]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.tmpdir.cleanup()
+
+    def _report(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_exporter_is_configured_on_first_export(self):
+        """Entry points that never configure exporters still write SYNC_METRICS_FILE."""
+        sync_metrics.REGISTRY.inc('sync_rows_total', 3, table='clock_in_out')
+
+        sync_metrics.export_metrics()
+        sync_metrics.export_metrics()
+
+        self.assertEqual(len(sync_metrics._exporters), 1)
+        self.assertEqual(self._report()['counter']['sync_rows_total'][0]['value'], 3)
+
+    def test_concurrent_exports(self):
+        """Exports from several threads at once all succeed and leave one complete file and no temp files."""
+        errors = []
+
+        def export_repeatedly():
+            for _ in range(100):
+                try:
+                    sync_metrics.REGISTRY.inc('sync_rows_total', table='clock_in_out')
+                    sync_metrics.export_metrics()
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=export_repeatedly) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(sync_metrics._exporters), 1)
+        self.assertEqual(os.listdir(self.tmpdir.name), ['sync.json'])
+        self.assertEqual(self._report()['counter']['sync_rows_total'][0]['value'], 400)
+
+    def test_unreachable_server_is_counted(self):
+        """A sync that cannot reach PostgreSQL counts an error and still exports."""
+        db_name = os.path.join(self.tmpdir.name, 'local')
+        conn = sqlite3.connect(f'{db_name}.db')
+        conn.execute("CREATE TABLE clock_in_out (id INTEGER PRIMARY KEY, employee_id INTEGER, synced BOOLEAN)")
+        conn.execute("INSERT INTO clock_in_out (employee_id, synced) VALUES (1, 0)")
+        conn.commit()
+        conn.close()
+
+        with mock.patch.object(automatedsync, 'connect_postgres', return_value=None), self.assertLogs('root', 'ERROR'):
+            automatedsync.sync_data_to_postgres(db_name, 'clock_in_out')
+
+        errors = self._report()['counter']['sync_errors_total']
+        self.assertEqual(errors, [{'labels': {'table': 'clock_in_out'}, 'value': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
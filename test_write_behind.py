@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+
+from write_behind import WriteBehindFlusher
+
+
+class RecordingFlush:
+    """Flush callback that records each call and can be held open or made to fail."""
+
+    def __init__(self, result=1):
+        self.result = result
+        self.calls = 0
+        self.active = 0
+        self.overlapped = False
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.active += 1
+        self.overlapped = self.overlapped or self.active > 1
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        self.active -= 1
+        return self.result
+
+
+class TestWriteBehindFlusher(unittest.TestCase):
+
+    def _wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    def test_flushes_when_batch_is_full(self):
+        """Reaching max_pending flushes right away without waiting for the delay."""
+        flush = RecordingFlush()
+        flusher = WriteBehindFlusher(flush, max_pending=3, max_delay=60)
+        flusher.start()
+
+        flusher.notify(3)
+
+        self.assertTrue(self._wait_for(lambda: flush.calls == 1))
+        self.assertEqual(flusher.pending, 0)
+        self.assertTrue(flusher.stop())
+
+    def test_flushes_after_delay(self):
+        """A lone write is flushed once it has waited max_delay."""
+        flush = RecordingFlush()
+        flusher = WriteBehindFlusher(flush, max_pending=100, max_delay=0.05)
+        flusher.start()
+
+        flusher.notify()
+
+        self.assertTrue(self._wait_for(lambda: flush.calls == 1))
+        flusher.stop()
+
+    def test_failed_flush_keeps_items_queued(self):
+        """A flush that cannot deliver puts its items back for a retry."""
+        flush = RecordingFlush(result=None)
+        flusher = WriteBehindFlusher(flush, max_pending=2, max_delay=60)
+        flusher.start()
+
+        flusher.notify(2)
+
+        self.assertTrue(self._wait_for(lambda: flush.calls == 1 and flusher.pending == 2))
+        flusher.stop(flush_remaining=False)
+
+    def test_stop_flushes_remaining_items(self):
+        """Stopping an idle flusher delivers what is still queued."""
+        flush = RecordingFlush()
+        flusher = WriteBehindFlusher(flush, max_pending=100, max_delay=60)
+        flusher.start()
+        flusher.notify()
+
+        self.assertTrue(flusher.stop())
+        self.assertEqual(flush.calls, 1)
+        self.assertEqual(flusher.pending, 0)
+
+    def test_stop_does_not_flush_alongside_a_running_flush(self):
+        """If the thread is still flushing when stop times out, the caller does not flush concurrently."""
+        flush = RecordingFlush()
+        flush.release.clear()
+        flusher = WriteBehindFlusher(flush, max_pending=1, max_delay=60)
+        flusher.start()
+        flusher.notify()
+        self.assertTrue(flush.started.wait(2))
+        flusher.notify()
+
+        with self.assertLogs('root', level='WARNING'):
+            self.assertFalse(flusher.stop(timeout=0.05))
+
+        self.assertEqual(flush.calls, 1)
+        flush.release.set()
+        self.assertTrue(self._wait_for(lambda: not flusher._thread.is_alive()))
+        self.assertFalse(flush.overlapped)
+
+
+if __name__ == '__main__':
+    unittest.main()
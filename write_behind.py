@@ -0,0 +1,101 @@
+import time
+import logging
+import threading
+
+FLUSH_MAX_PENDING = 100   # flush as soon as this many writes are queued
+FLUSH_MAX_DELAY = 5.0     # ... or once the oldest queued write is this many seconds old
+
+
+class WriteBehindFlusher:
+    """Background thread that drains a durable local queue in batches.
+
+    Writers append to the queue themselves (e.g. an INSERT into a local SQLite table) and
+    call notify(); the flusher calls `flush()` once `max_pending` writes have accumulated or
+    the oldest one has waited `max_delay` seconds. `flush` returns the number of items it
+    delivered, or None if it could not deliver (the items stay queued and are retried).
+    """
+
+    def __init__(self, flush, max_pending=FLUSH_MAX_PENDING, max_delay=FLUSH_MAX_DELAY, name='write-behind'):
+        self.flush = flush
+        self.max_pending = max_pending
+        self.max_delay = max_delay
+        self.name = name
+
+        self.pending = 0
+        self.oldest_at = None
+        self.retry_at = 0.0
+        self._stopping = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def notify(self, count=1):
+        with self._cond:
+            first = not self.pending
+            if first:
+                self.oldest_at = time.monotonic()
+            self.pending += count
+            # Wake the flusher to start the delay timer, or to flush right away when full
+            if first or self.pending >= self.max_pending:
+                self._cond.notify()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, flush_remaining=True, timeout=10):
+        """Stop the thread and, optionally, flush what is still queued on the calling thread.
+
+        Returns False if the thread is still busy flushing after `timeout` seconds. Nothing is
+        flushed from here then, so two flushes never run at once on the same queue; whatever the
+        running flush does not deliver stays in the durable queue for a later sync.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logging.warning(f"{self.name}: still flushing after {timeout}s; remaining writes stay queued.")
+                return False
+            self._thread = None
+        if flush_remaining and self.pending:
+            self._flush_once()
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    now = time.monotonic()
+                    if now < self.retry_at:
+                        self._cond.wait(self.retry_at - now)
+                        continue
+                    if self.pending >= self.max_pending:
+                        break
+                    if self.pending and now - self.oldest_at >= self.max_delay:
+                        break
+                    self._cond.wait(self.oldest_at + self.max_delay - now if self.pending else None)
+                if self._stopping:
+                    return
+            if self._flush_once() is None:
+                # Delivery failed: the items stay queued; wait a full delay before retrying
+                with self._cond:
+                    self.retry_at = time.monotonic() + self.max_delay
+
+    def _flush_once(self):
+        with self._cond:
+            flushing = self.pending
+            self.pending = 0
+            self.oldest_at = None
+        try:
+            delivered = self.flush()
+        except Exception as e:
+            logging.error(f"{self.name}: flush failed: {e}")
+            delivered = None
+        if delivered is None:
+            with self._cond:
+                if not self.pending:
+                    self.oldest_at = time.monotonic()
+                self.pending += flushing
+        return delivered